@@ -3,9 +3,19 @@ import pickle
 import numpy as np
 from datetime import datetime
 import json
-from flask import Flask, request, jsonify
+import logging
+import threading
+from logging.handlers import WatchedFileHandler
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 from dotenv import load_dotenv
+from exercise_state import DEFAULT_SESSION_ID, create_state_store
+from feature_kernels import NUMBA_AVAILABLE as FEATURE_KERNEL_AVAILABLE
+from forest_walker import compile_forest
+from json_provider import install_json_provider
+from prediction_cache import PredictionCache
+from session_store import SessionStore
+from tasks import celery_app, store_session
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +28,7 @@ try:
     from sklearn.model_selection import train_test_split
     from sklearn.metrics import accuracy_score, classification_report
     import joblib
+    from model_bundle import load_model_bundle, save_model_bundle
     ML_FRAMEWORK = "opencv-sklearn"
     print(f"✅ OpenCV {cv2.__version__} and scikit-learn loaded successfully")
 except ImportError as e:
@@ -30,7 +41,7 @@ except ImportError as e:
         def predict(self, data):
             # Return mock predictions for compatibility
             num_classes = 22
-            predictions = np.random.random(num_classes)
+            predictions = mock_rng.random(num_classes)
             predictions = predictions / np.sum(predictions)
             return np.array([predictions])
         
@@ -46,7 +57,15 @@ except ImportError as e:
         def transform(self, data):
             return data
 
+# Request batching for concurrent /predict calls: service_streamer when installed,
+# otherwise the built-in queue-based batcher with the same interface
+try:
+    from service_streamer import ThreadedStreamer
+except ImportError:
+    from micro_batcher import MicroBatcher as ThreadedStreamer
+
 app = Flask(__name__)
+install_json_provider(app)  # orjson-backed jsonify, serializes NumPy values directly
 
 # Configure CORS with explicit settings for frontend communication
 CORS(app, 
@@ -58,128 +77,257 @@ CORS(app,
 
 # Configuration
 CONFIG = {
+    'MODEL_BUNDLE_PATH': os.getenv('MODEL_BUNDLE_PATH', 'model/exercise_classifier_rf_bundle.joblib'),  # Model, scaler and encoder in one file
     'MODEL_PATH': os.getenv('MODEL_PATH', 'model/exercise_classifier_rf.pkl'),
     'SCALER_PATH': os.getenv('SCALER_PATH', 'model/feature_scaler.pkl'),
     'ENCODER_PATH': os.getenv('ENCODER_PATH', 'model/label_encoder.pkl'),
+    'SESSIONS_DB_PATH': os.getenv('SESSIONS_DB_PATH', 'sessions.db'),
+    'REDIS_URL': os.getenv('REDIS_URL'),
     'DEBUG': os.getenv('FLASK_DEBUG', 'True').lower() == 'true',
     'HOST': os.getenv('FLASK_HOST', '0.0.0.0'),
     'PORT': int(os.getenv('FLASK_PORT', 5000)),
     'CONFIDENCE_THRESHOLD': float(os.getenv('CONFIDENCE_THRESHOLD', 0.65)),
-    'PHASE_THRESHOLD': float(os.getenv('PHASE_THRESHOLD', 0.65))
+    'PHASE_THRESHOLD': float(os.getenv('PHASE_THRESHOLD', 0.65)),
+    'BATCH_PREDICTIONS': os.getenv('BATCH_PREDICTIONS', 'False').lower() == 'true',
+    'BATCH_SIZE': int(os.getenv('BATCH_SIZE', 32)),
+    'BATCH_MAX_LATENCY': float(os.getenv('BATCH_MAX_LATENCY', 0.01)),  # seconds
+    'FOREST_LEAF_VALUES': os.getenv('FOREST_LEAF_VALUES', 'float32'),  # 'float32', 'int16' or 'int8' (quantized)
+    'PREDICTION_CACHE_SIZE': int(os.getenv('PREDICTION_CACHE_SIZE', 32)),
+    'PREDICTION_CACHE_RESOLUTION': float(os.getenv('PREDICTION_CACHE_RESOLUTION', 0.25)),  # degrees
+    'LOG_LEVEL': os.getenv('LOG_LEVEL', 'INFO').upper(),
+    'LOG_FILE': os.getenv('LOG_FILE', ''),  # Empty (default) logs to stderr, alongside Gunicorn's error log
+    'PRELOAD_MODELS': os.getenv('PRELOAD_MODELS', 'True').lower() == 'true'  # Load models at import time
 }
 
+# Request-path diagnostics go through logging rather than print so they cost
+# nothing unless LOG_LEVEL=DEBUG
+logger = logging.getLogger('physio')
+logger.setLevel(CONFIG['LOG_LEVEL'])
+if not logger.handlers:
+    if CONFIG['LOG_FILE']:
+        # Gunicorn workers share this handler's file after fork, and RotatingFileHandler
+        # cannot rotate safely from several processes - append only and reopen the
+        # file when an external tool (logrotate) rotates it
+        log_handler = WatchedFileHandler(CONFIG['LOG_FILE'], encoding='utf-8')
+    else:
+        log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter('%(asctime)s [%(process)d] %(levelname)s %(message)s'))
+    logger.addHandler(log_handler)
+
 # Global variables for model, scaler and encoder
 model = None
 scaler = None
 label_encoder = None
-exercise_sessions = []  # In-memory storage for demo (use database in production)
-
-# Exercise phase tracking
-current_exercise_state = {
-    'current_phase': 'down',  # 'up' or 'down'
-    'rep_count': 0,
-    'last_prediction': None,
-    'phase_threshold': CONFIG['PHASE_THRESHOLD']  # Confidence threshold for phase detection
-}
+exercise_classes = []    # label_encoder.classes_ as a plain list, refreshed whenever the encoder changes
+scaler_mean = None       # Cached StandardScaler affine (float32) for fast in-place scaling
+scaler_inv_scale = None
+compiled_model = None    # Numba-compiled forest walker (None falls back to model.predict_proba)
+prediction_streamer = None  # Created lazily per process (worker threads do not survive fork)
+prediction_streamer_lock = threading.Lock()
+inference_buffers = threading.local()  # Per-thread reusable (1, N_EXERCISE_FEATURES) feature buffer
+prediction_cache = PredictionCache(CONFIG['PREDICTION_CACHE_SIZE'], CONFIG['PREDICTION_CACHE_RESOLUTION'])
+exercises_response_body = None  # Serialized /exercises response, rebuilt when the models change
+health_static_info = None       # Parts of /health that only change when the models change
+mock_rng = np.random.default_rng()  # One PCG64 generator for mock predictions instead of the legacy global RandomState
+exercise_sessions = SessionStore(CONFIG['SESSIONS_DB_PATH'])  # SQLite (WAL), shared across workers
+
+# Exercise phase tracking, keyed by session (Redis when REDIS_URL is set, so all workers agree)
+exercise_state = create_state_store(CONFIG['REDIS_URL'], CONFIG['PHASE_THRESHOLD'])
+
+# Number of features produced by create_exercise_features
+N_EXERCISE_FEATURES = 81
 
-def create_exercise_features(joint_angles):
+# Sin/cos lookup tables over 0-180 degrees at 0.1 degree resolution
+ANGLE_LUT_STEPS = 10
+_LUT_RADIANS = np.radians(np.arange(180 * ANGLE_LUT_STEPS + 1) / ANGLE_LUT_STEPS)
+_SIN_LUT = np.sin(_LUT_RADIANS).astype(np.float32)
+_COS_LUT = np.cos(_LUT_RADIANS).astype(np.float32)
+
+if FEATURE_KERNEL_AVAILABLE:
+    from feature_kernels import compute_exercise_features
+
+def create_exercise_features(joint_angles, out=None):
     """
     Create comprehensive feature vector from joint angles for ML classification
     This replaces the TensorFlow model with traditional ML feature engineering
+    If out is given (float32, length N_EXERCISE_FEATURES) the features are written into it
     """
     if len(joint_angles) < 9:
         # Pad with average angles if insufficient data
+        joint_angles = list(joint_angles)
         avg_angle = np.mean(joint_angles) if joint_angles else 90.0
         joint_angles = joint_angles + [avg_angle] * (9 - len(joint_angles))
     
-    joint_angles = np.array(joint_angles[:9], dtype=np.float32)
+    # No copy when given a float32 array (as /predict does)
+    joint_angles = np.asarray(joint_angles[:9], dtype=np.float32)
+    
+    # Feature engineering for exercise classification - filled in place
+    features = np.empty(N_EXERCISE_FEATURES, dtype=np.float32) if out is None else out
     
-    # Feature engineering for exercise classification
-    features = []
+    if FEATURE_KERNEL_AVAILABLE:
+        # Same features from one compiled pass
+        return compute_exercise_features(joint_angles, _SIN_LUT, _COS_LUT, ANGLE_LUT_STEPS, features)
     
     # 1. Raw joint angles (9 features)
-    features.extend(joint_angles)
+    features[0:9] = joint_angles
     
     # 2. Normalized angles (9 features)
-    features.extend(joint_angles / 180.0)
+    features[9:18] = joint_angles / 180.0
+    
+    angle_min = joint_angles.min()
+    angle_max = joint_angles.max()
     
     # 3. Trigonometric features (18 features)
-    features.extend(np.sin(np.radians(joint_angles)))
-    features.extend(np.cos(np.radians(joint_angles)))
+    if angle_min >= 0 and angle_max <= 180:
+        # Sensor angles are always in range - use the 0.1 degree lookup tables
+        lut_idx = np.rint(joint_angles * ANGLE_LUT_STEPS).astype(np.intp)
+        features[18:27] = _SIN_LUT[lut_idx]
+        features[27:36] = _COS_LUT[lut_idx]
+    else:
+        radians = np.radians(joint_angles)
+        features[18:27] = np.sin(radians)
+        features[27:36] = np.cos(radians)
     
     # 4. Joint differences (8 features)
-    for i in range(8):
-        features.append(abs(joint_angles[i] - joint_angles[i+1]))
+    features[36:44] = np.abs(joint_angles[:-1] - joint_angles[1:])
     
     # 5. Joint ratios (8 features)
-    for i in range(8):
-        if joint_angles[i+1] != 0:
-            features.append(joint_angles[i] / joint_angles[i+1])
-        else:
-            features.append(0.0)
+    features[44:52] = 0.0
+    np.divide(joint_angles[:-1], joint_angles[1:], out=features[44:52], where=joint_angles[1:] != 0)
     
     # 6. Statistical features (5 features)
-    features.extend([
-        np.mean(joint_angles),
-        np.std(joint_angles),
-        np.min(joint_angles),
-        np.max(joint_angles),
-        np.median(joint_angles)
-    ])
+    angle_sum = joint_angles.sum()
+    features[52] = angle_sum / 9
+    features[53] = joint_angles.std()
+    features[54] = angle_min
+    features[55] = angle_max
+    features[56] = np.median(joint_angles)
     
     # 7. Exercise-specific features (15 features)
+    # Pairwise left/right averages and symmetry: shoulder, elbow, hip, knee
+    pair_avg = (joint_angles[0:8:2] + joint_angles[1:8:2]) / 2
+    pair_diff = np.abs(joint_angles[0:8:2] - joint_angles[1:8:2])
+    shoulder_avg, elbow_avg, hip_avg, knee_avg = pair_avg
+    
     # Upper body indicators
-    shoulder_avg = (joint_angles[0] + joint_angles[1]) / 2
-    elbow_avg = (joint_angles[2] + joint_angles[3]) / 2
-    features.extend([
-        shoulder_avg,  # Shoulder position
-        elbow_avg,     # Elbow position
-        abs(joint_angles[0] - joint_angles[1]),  # Shoulder symmetry
-        abs(joint_angles[2] - joint_angles[3]),  # Elbow symmetry
-    ])
+    features[57:59] = pair_avg[0:2]   # Shoulder, elbow position
+    features[59:61] = pair_diff[0:2]  # Shoulder, elbow symmetry
     
     # Lower body indicators
-    hip_avg = (joint_angles[4] + joint_angles[5]) / 2
-    knee_avg = (joint_angles[6] + joint_angles[7]) / 2
-    features.extend([
-        hip_avg,       # Hip position
-        knee_avg,      # Knee position
-        abs(joint_angles[4] - joint_angles[5]),  # Hip symmetry
-        abs(joint_angles[6] - joint_angles[7]),  # Knee symmetry
-    ])
+    features[61:63] = pair_avg[2:4]   # Hip, knee position
+    features[63:65] = pair_diff[2:4]  # Hip, knee symmetry
     
     # Core stability indicator
-    features.append(joint_angles[8])  # Torso angle
+    features[65] = joint_angles[8]  # Torso angle
     
     # Compound movement indicators
-    features.extend([
-        shoulder_avg + elbow_avg,  # Upper body compound
-        hip_avg + knee_avg,        # Lower body compound
-        abs(shoulder_avg - hip_avg),  # Upper-lower coordination
-        np.sum(joint_angles),      # Total body activation
-        np.std([shoulder_avg, elbow_avg, hip_avg, knee_avg])  # Movement variability
-    ])
+    features[66] = shoulder_avg + elbow_avg        # Upper body compound
+    features[67] = hip_avg + knee_avg              # Lower body compound
+    features[68] = abs(shoulder_avg - hip_avg)     # Upper-lower coordination
+    features[69] = angle_sum                       # Total body activation
+    features[70] = pair_avg.std()                  # Movement variability
     
     # 8. Advanced biomechanical features (10 features)
-    # Joint velocity approximations (using angle differences)
-    features.extend([
-        abs(joint_angles[0] - 90),  # Shoulder deviation from neutral
-        abs(joint_angles[2] - 90),  # Elbow deviation from neutral
-        abs(joint_angles[4] - 90),  # Hip deviation from neutral
-        abs(joint_angles[6] - 90),  # Knee deviation from neutral
-    ])
+    # Shoulder, elbow, hip, knee deviation from neutral
+    deviation = np.abs(joint_angles - 90)
+    features[71:75] = deviation[0:8:2]
     
     # Movement patterns
-    features.extend([
-        max(joint_angles) - min(joint_angles),  # Range of motion
-        np.sum(joint_angles > 90),              # Joints above neutral
-        np.sum(joint_angles < 90),              # Joints below neutral
-        np.sum(np.abs(joint_angles - 90) < 15), # Joints near neutral
-        np.sum(np.abs(joint_angles - 180) < 30), # Extended joints
-        np.sum(np.abs(joint_angles) < 30),      # Highly flexed joints
-    ])
-    
-    return np.array(features, dtype=np.float32)
+    features[75] = angle_max - angle_min                        # Range of motion
+    features[76] = np.count_nonzero(joint_angles > 90)          # Joints above neutral
+    features[77] = np.count_nonzero(joint_angles < 90)          # Joints below neutral
+    features[78] = np.count_nonzero(deviation < 15)             # Joints near neutral
+    features[79] = np.count_nonzero(np.abs(joint_angles - 180) < 30)  # Extended joints
+    features[80] = np.count_nonzero(np.abs(joint_angles) < 30)  # Highly flexed joints
+    
+    return features
+
+def create_exercise_features_batch(angles_batch):
+    """
+    Create feature vectors for a batch of joint angle samples
+    Takes an (N, 9) array and returns (N, N_EXERCISE_FEATURES) matching create_exercise_features row by row
+    """
+    angles = np.asarray(angles_batch, dtype=np.float32)[:, :9]
+    features = np.empty((angles.shape[0], N_EXERCISE_FEATURES), dtype=np.float32)
+    
+    angle_min = angles.min(axis=1)
+    angle_max = angles.max(axis=1)
+    angle_sum = angles.sum(axis=1)
+    
+    # 1-2. Raw and normalized angles
+    features[:, 0:9] = angles
+    features[:, 9:18] = angles / 180.0
+    
+    # 3. Trigonometric features
+    if angle_min.min() >= 0 and angle_max.max() <= 180:
+        lut_idx = np.rint(angles * ANGLE_LUT_STEPS).astype(np.intp)
+        features[:, 18:27] = _SIN_LUT[lut_idx]
+        features[:, 27:36] = _COS_LUT[lut_idx]
+    else:
+        radians = np.radians(angles)
+        features[:, 18:27] = np.sin(radians)
+        features[:, 27:36] = np.cos(radians)
+    
+    # 4-5. Joint differences and ratios
+    features[:, 36:44] = np.abs(angles[:, :-1] - angles[:, 1:])
+    features[:, 44:52] = 0.0
+    np.divide(angles[:, :-1], angles[:, 1:], out=features[:, 44:52], where=angles[:, 1:] != 0)
+    
+    # 6. Statistical features
+    features[:, 52] = angle_sum / 9
+    features[:, 53] = angles.std(axis=1)
+    features[:, 54] = angle_min
+    features[:, 55] = angle_max
+    features[:, 56] = np.median(angles, axis=1)
+    
+    # 7. Exercise-specific features
+    pair_avg = (angles[:, 0:8:2] + angles[:, 1:8:2]) / 2
+    pair_diff = np.abs(angles[:, 0:8:2] - angles[:, 1:8:2])
+    features[:, 57:59] = pair_avg[:, 0:2]
+    features[:, 59:61] = pair_diff[:, 0:2]
+    features[:, 61:63] = pair_avg[:, 2:4]
+    features[:, 63:65] = pair_diff[:, 2:4]
+    features[:, 65] = angles[:, 8]
+    features[:, 66] = pair_avg[:, 0] + pair_avg[:, 1]
+    features[:, 67] = pair_avg[:, 2] + pair_avg[:, 3]
+    features[:, 68] = np.abs(pair_avg[:, 0] - pair_avg[:, 2])
+    features[:, 69] = angle_sum
+    features[:, 70] = pair_avg.std(axis=1)
+    
+    # 8. Advanced biomechanical features
+    deviation = np.abs(angles - 90)
+    features[:, 71:75] = deviation[:, 0:8:2]
+    features[:, 75] = angle_max - angle_min
+    features[:, 76] = np.count_nonzero(angles > 90, axis=1)
+    features[:, 77] = np.count_nonzero(angles < 90, axis=1)
+    features[:, 78] = np.count_nonzero(deviation < 15, axis=1)
+    features[:, 79] = np.count_nonzero(np.abs(angles - 180) < 30, axis=1)
+    features[:, 80] = np.count_nonzero(np.abs(angles) < 30, axis=1)
+    
+    return features
+
+# Synthetic training profiles: per-exercise mean and std of each joint angle
+# (shoulders, elbows, hips, knees, torso)
+TRAINING_EXERCISES = [
+    'squat', 'push_up', 'bicep_curl', 'shoulder_press', 'deadlift',
+    'lunge', 'plank', 'jumping_jack', 'tricep_dip', 'pull_up',
+    'bench_press', 'lat_pulldown', 't_bar_row', 'leg_extension',
+    'hip_thrust', 'leg_raises', 'russian_twist', 'chest_fly_machine',
+    'high_knees', 'butt_kicks', 'wall_sits', 'burpees'
+]
+_TRAINING_PROFILES = {
+    'squat':      ([130, 132, 170, 168, 100, 102, 90, 88, 175], [10, 10, 15, 15, 20, 20, 25, 25, 5]),
+    'push_up':    ([90, 88, 80, 82, 160, 162, 170, 172, 175], [15, 15, 20, 20, 10, 10, 10, 10, 5]),
+    'bicep_curl': ([120, 118, 60, 62, 170, 172, 175, 173, 178], [10, 10, 30, 30, 5, 5, 5, 5, 3]),       # elbows curled
+    'high_knees': ([110, 112, 140, 142, 90, 92, 45, 47, 170], [15, 15, 10, 10, 20, 20, 20, 20, 8]),     # knees high
+    'wall_sits':  ([140, 138, 160, 162, 90, 88, 90, 92, 175], [5, 5, 8, 8, 5, 5, 5, 5, 3]),             # 90 degree hips/knees
+}
+# Default pattern with some randomness
+_DEFAULT_TRAINING_PROFILE = ([120, 118, 90, 92, 130, 132, 140, 138, 170], [20, 20, 30, 30, 25, 25, 20, 20, 10])
+TRAINING_ANGLE_MEANS = np.array(
+    [_TRAINING_PROFILES.get(e, _DEFAULT_TRAINING_PROFILE)[0] for e in TRAINING_EXERCISES], dtype=np.float64)
+TRAINING_ANGLE_STDS = np.array(
+    [_TRAINING_PROFILES.get(e, _DEFAULT_TRAINING_PROFILE)[1] for e in TRAINING_EXERCISES], dtype=np.float64)
 
 def train_exercise_classifier():
     """
@@ -188,135 +336,173 @@ def train_exercise_classifier():
     """
     print("🤖 Training exercise classifier...")
     
-    # Define exercise classes
-    exercises = [
-        'squat', 'push_up', 'bicep_curl', 'shoulder_press', 'deadlift',
-        'lunge', 'plank', 'jumping_jack', 'tricep_dip', 'pull_up',
-        'bench_press', 'lat_pulldown', 't_bar_row', 'leg_extension',
-        'hip_thrust', 'leg_raises', 'russian_twist', 'chest_fly_machine',
-        'high_knees', 'butt_kicks', 'wall_sits', 'burpees'
-    ]
-    
     # Generate synthetic training data based on exercise characteristics
-    X_train = []
-    y_train = []
-    
-    for exercise_idx, exercise in enumerate(exercises):
-        for _ in range(100):  # 100 samples per exercise
-            # Generate realistic joint angles for each exercise
-            if exercise == 'squat':
-                angles = [130+np.random.normal(0, 10), 132+np.random.normal(0, 10),  # shoulders
-                         170+np.random.normal(0, 15), 168+np.random.normal(0, 15),   # elbows
-                         100+np.random.normal(0, 20), 102+np.random.normal(0, 20),   # hips
-                         90+np.random.normal(0, 25), 88+np.random.normal(0, 25),     # knees
-                         175+np.random.normal(0, 5)]                                 # torso
-            elif exercise == 'push_up':
-                angles = [90+np.random.normal(0, 15), 88+np.random.normal(0, 15),    # shoulders
-                         80+np.random.normal(0, 20), 82+np.random.normal(0, 20),     # elbows
-                         160+np.random.normal(0, 10), 162+np.random.normal(0, 10),   # hips
-                         170+np.random.normal(0, 10), 172+np.random.normal(0, 10),   # knees
-                         175+np.random.normal(0, 5)]                                 # torso
-            elif exercise == 'bicep_curl':
-                angles = [120+np.random.normal(0, 10), 118+np.random.normal(0, 10),  # shoulders
-                         60+np.random.normal(0, 30), 62+np.random.normal(0, 30),     # elbows (curled)
-                         170+np.random.normal(0, 5), 172+np.random.normal(0, 5),     # hips
-                         175+np.random.normal(0, 5), 173+np.random.normal(0, 5),     # knees
-                         178+np.random.normal(0, 3)]                                 # torso
-            elif exercise == 'high_knees':
-                angles = [110+np.random.normal(0, 15), 112+np.random.normal(0, 15),  # shoulders
-                         140+np.random.normal(0, 10), 142+np.random.normal(0, 10),   # elbows
-                         90+np.random.normal(0, 20), 92+np.random.normal(0, 20),     # hips
-                         45+np.random.normal(0, 20), 47+np.random.normal(0, 20),     # knees (high)
-                         170+np.random.normal(0, 8)]                                 # torso
-            elif exercise == 'wall_sits':
-                angles = [140+np.random.normal(0, 5), 138+np.random.normal(0, 5),    # shoulders
-                         160+np.random.normal(0, 8), 162+np.random.normal(0, 8),     # elbows
-                         90+np.random.normal(0, 5), 88+np.random.normal(0, 5),       # hips (90 degrees)
-                         90+np.random.normal(0, 5), 92+np.random.normal(0, 5),       # knees (90 degrees)
-                         175+np.random.normal(0, 3)]                                 # torso
-            else:
-                # Default pattern with some randomness
-                angles = [120+np.random.normal(0, 20), 118+np.random.normal(0, 20),
-                         90+np.random.normal(0, 30), 92+np.random.normal(0, 30),
-                         130+np.random.normal(0, 25), 132+np.random.normal(0, 25),
-                         140+np.random.normal(0, 20), 138+np.random.normal(0, 20),
-                         170+np.random.normal(0, 10)]
-            
-            # Ensure angles are within valid range
-            angles = [max(0, min(180, angle)) for angle in angles]
-            
-            # Create features from angles
-            features = create_exercise_features(angles)
-            X_train.append(features)
-            y_train.append(exercise)
+    n_per_exercise = 100  # 100 samples per exercise
+    rng = np.random.default_rng(42)
+    noise = rng.standard_normal((len(TRAINING_EXERCISES), n_per_exercise, 9))
+    angles = TRAINING_ANGLE_MEANS[:, None, :] + TRAINING_ANGLE_STDS[:, None, :] * noise
+    
+    # Ensure angles are within valid range
+    angles = np.clip(angles, 0, 180).reshape(-1, 9)
     
-    X_train = np.array(X_train)
-    y_train = np.array(y_train)
+    # Create features from angles
+    X_train = create_exercise_features_batch(angles)
+    y_train = np.repeat(np.array(TRAINING_EXERCISES), n_per_exercise)
     
     print(f"📊 Training data shape: {X_train.shape}")
     print(f"📝 Exercise classes: {len(set(y_train))}")
     
     # Create and train the model
-    global model, scaler, label_encoder
+    global model, scaler, label_encoder, compiled_model, exercise_classes
     
     # Initialize components
     scaler = StandardScaler()
     label_encoder = LabelEncoder()
+    # A small, shallow forest keeps the node arrays cache-resident for single-sample inference
     model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=15,
+        n_estimators=32,
+        max_depth=8,
         random_state=42,
         min_samples_split=5,
-        min_samples_leaf=2
+        min_samples_leaf=2,
+        n_jobs=1
     )
     
-    # Prepare data
-    X_scaled = scaler.fit_transform(X_train)
+    # Prepare data - hold out 20% to measure accuracy on unseen samples
     y_encoded = label_encoder.fit_transform(y_train)
+    X_fit, X_holdout, y_fit, y_holdout = train_test_split(
+        X_train, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
+    )
+    X_scaled = scaler.fit_transform(X_fit)
     
     # Train model
-    model.fit(X_scaled, y_encoded)
-    
-    # Evaluate on training data (in production, use separate test set)
-    train_predictions = model.predict(X_scaled)
-    train_accuracy = accuracy_score(y_encoded, train_predictions)
+    model.fit(X_scaled, y_fit)
+    exercise_classes = label_encoder.classes_.tolist()
+    refresh_cached_responses()
+    cache_scaler_params()
+    compiled_model = compile_forest(model, CONFIG['FOREST_LEAF_VALUES'])
+    prediction_cache.clear()
+    warm_up_inference()
+    
+    # Evaluate on training and held-out data
+    train_accuracy = accuracy_score(y_fit, model.predict(X_scaled))
+    holdout_accuracy = accuracy_score(y_holdout, model.predict(scaler.transform(X_holdout)))
     
     print(f"✅ Model trained successfully!")
     print(f"📈 Training accuracy: {train_accuracy:.3f}")
-    print(f"🎯 Available exercises: {list(label_encoder.classes_)}")
+    print(f"📈 Held-out accuracy: {holdout_accuracy:.3f}")
+    print(f"🎯 Available exercises: {exercise_classes}")
     
     # Save models
     try:
         os.makedirs('model', exist_ok=True)
-        joblib.dump(model, CONFIG['MODEL_PATH'])
-        joblib.dump(scaler, CONFIG['SCALER_PATH'])
-        joblib.dump(label_encoder, CONFIG['ENCODER_PATH'])
+        save_model_bundle(CONFIG['MODEL_BUNDLE_PATH'], model, scaler, label_encoder)
         print(f"💾 Models saved successfully")
     except Exception as e:
         print(f"⚠️  Could not save models: {e}")
     
     return True
 
+def cache_scaler_params():
+    """Cache the fitted scaler's mean and reciprocal scale as float32 arrays"""
+    global scaler_mean, scaler_inv_scale
+    
+    if hasattr(scaler, 'mean_') or hasattr(scaler, 'scale_'):
+        n_features = scaler.n_features_in_
+        mean = scaler.mean_ if getattr(scaler, 'with_mean', True) else None
+        scale = scaler.scale_ if getattr(scaler, 'with_std', True) else None
+        scaler_mean = (np.zeros(n_features) if mean is None else mean).astype(np.float32)
+        scaler_inv_scale = (np.ones(n_features) if scale is None else 1.0 / scale).astype(np.float32)
+    else:
+        scaler_mean = None
+        scaler_inv_scale = None
+
+def scale_features(features):
+    """
+    Standardize a feature vector (or batch) in place using the cached scaler parameters
+    Equivalent to scaler.transform without sklearn's per-call validation and allocation
+    """
+    if scaler_mean is None:
+        return scaler.transform(np.atleast_2d(features)).reshape(features.shape)
+    
+    features -= scaler_mean
+    features *= scaler_inv_scale
+    return features
+
+def batch_predict_proba(feature_batch):
+    """Run predict_proba once over a batch of scaled feature vectors"""
+    predictor = compiled_model if compiled_model is not None else model
+    return list(predictor.predict_proba(np.stack(feature_batch)))
+
+def get_prediction_streamer():
+    """Return the per-process batching streamer, or None if batching is disabled"""
+    global prediction_streamer
+    
+    if not CONFIG['BATCH_PREDICTIONS']:
+        return None
+    if prediction_streamer is None:
+        with prediction_streamer_lock:
+            if prediction_streamer is None:
+                prediction_streamer = ThreadedStreamer(
+                    batch_predict_proba,
+                    batch_size=CONFIG['BATCH_SIZE'],
+                    max_latency=CONFIG['BATCH_MAX_LATENCY']
+                )
+    return prediction_streamer
+
+def get_feature_buffer():
+    """Return this thread's preallocated (1, N_EXERCISE_FEATURES) float32 feature buffer"""
+    buffer = getattr(inference_buffers, 'features', None)
+    if buffer is None:
+        buffer = np.empty((1, N_EXERCISE_FEATURES), dtype=np.float32)
+        inference_buffers.features = buffer
+    return buffer
+
+def predict_probabilities(features_scaled):
+    """Class probabilities for one scaled feature vector, batched with concurrent requests when enabled"""
+    streamer = get_prediction_streamer()
+    if streamer is not None:
+        return streamer.predict([features_scaled])[0]
+    predictor = compiled_model if compiled_model is not None else model
+    return predictor.predict_proba(features_scaled.reshape(1, -1))[0]
+
+def warm_up_inference():
+    """
+    Run one neutral pose through feature building, scaling and the model at load time
+    so the first /predict does not pay one-off setup costs. Bypasses the batching
+    streamer, which must only be started in the serving process.
+    """
+    features = create_exercise_features(np.full(9, 90.0, dtype=np.float32))
+    predictor = compiled_model if compiled_model is not None else model
+    predictor.predict_proba(scale_features(features).reshape(1, -1))
+
 def load_models():
     """Load the Random Forest model, scaler, and label encoder"""
-    global model, scaler, label_encoder
+    global model, scaler, label_encoder, compiled_model, exercise_classes
     
     try:
         if ML_FRAMEWORK == "opencv-sklearn":
-            # Try to load existing models
-            if (os.path.exists(CONFIG['MODEL_PATH']) and 
-                os.path.exists(CONFIG['SCALER_PATH']) and 
-                os.path.exists(CONFIG['ENCODER_PATH'])):
-                
+            # Try to load existing models: the single-file bundle, else the separate files
+            model_files = (CONFIG['MODEL_PATH'], CONFIG['SCALER_PATH'], CONFIG['ENCODER_PATH'])
+            if os.path.exists(CONFIG['MODEL_BUNDLE_PATH']):
+                model, scaler, label_encoder = load_model_bundle(CONFIG['MODEL_BUNDLE_PATH'])
+            elif all(os.path.exists(path) for path in model_files):
                 model = joblib.load(CONFIG['MODEL_PATH'])
                 scaler = joblib.load(CONFIG['SCALER_PATH'])
                 label_encoder = joblib.load(CONFIG['ENCODER_PATH'])
-                
-                print(f"✅ Models loaded successfully from disk")
-                print(f"📝 Available exercises: {list(label_encoder.classes_)}")
             else:
                 print("📚 No existing models found, training new classifier...")
                 return train_exercise_classifier()
+            
+            exercise_classes = label_encoder.classes_.tolist()
+            refresh_cached_responses()
+            cache_scaler_params()
+            compiled_model = compile_forest(model, CONFIG['FOREST_LEAF_VALUES'])
+            prediction_cache.clear()
+            warm_up_inference()
+            
+            print(f"✅ Models loaded successfully from disk")
+            print(f"📝 Available exercises: {exercise_classes}")
         else:
             # Use mock models when ML framework is not available
             print("🔧 Using mock models (ML framework not available)")
@@ -338,20 +524,94 @@ def load_models():
             
             model = MockModel()
             scaler = MockScaler()
+            cache_scaler_params()
+            compiled_model = None
             label_encoder = MockLabelEncoder()
-            print(f"🔧 Mock models created with exercises: {list(label_encoder.classes_)}")
+            exercise_classes = label_encoder.classes_.tolist()
+            refresh_cached_responses()
+            print(f"🔧 Mock models created with exercises: {exercise_classes}")
         
     except Exception as e:
         print(f"❌ Error loading models: {str(e)}")
         return False
     return True
 
-def detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise=None):
+def refresh_cached_responses():
+    """Rebuild the precomputed /exercises body and static /health fields after the models change"""
+    global exercises_response_body, health_static_info
+    exercises_response_body = app.json.dumps({'exercises': exercise_classes}).encode()
+    
+    info = {
+        'status': 'healthy',
+        'ml_framework': ML_FRAMEWORK,
+        'model_loaded': model is not None,
+        'scaler_loaded': scaler is not None,
+        'encoder_loaded': label_encoder is not None,
+        'available_exercises': exercise_classes,
+        'config': {
+            'confidence_threshold': CONFIG['CONFIDENCE_THRESHOLD'],
+            'phase_threshold': CONFIG['PHASE_THRESHOLD'],
+            'debug_mode': CONFIG['DEBUG']
+        }
+    }
+    # Add ML framework version if available
+    if ML_FRAMEWORK == "opencv-sklearn":
+        import cv2, sklearn
+        info['opencv_version'] = cv2.__version__
+        info['sklearn_version'] = sklearn.__version__
+    else:
+        info['ml_version'] = "mock"
+    health_static_info = info
+
+def ensure_models_loaded():
+    """Load models once per process, skipping if they are already loaded"""
+    if model is None:
+        return load_models()
+    return True
+
+# Phase detection rules per canonical exercise name:
+# (joint index, comparison, threshold, phase when matched, phase otherwise, rep-completing transition)
+# Joint indices: 0 shoulder, 2 elbow, 4 hip, 6 knee. 'between' thresholds are exclusive (low, high)
+PHASE_RULES = {
+    'squat':        (6, 'lt', 120, 'down', 'up', ('down', 'up')),       # Standing up completes a rep
+    'push_up':      (2, 'lt', 120, 'down', 'up', ('down', 'up')),       # Pushing up completes a rep
+    'bicep_curl':   (2, 'lt', 110, 'up', 'down', ('up', 'down')),       # Lowering the weight completes a rep
+    'high_knees':   (6, 'lt', 110, 'up', 'down', ('up', 'down')),       # Lowering the knee completes a rep
+    'wall_sits':    (6, 'between', (60, 120), 'hold', 'rest', None),    # Isometric - holds are counted
+    'butt_kicks':   (6, 'lt', 130, 'up', 'down', ('up', 'down')),
+    'jumping_jack': (0, 'gt', 120, 'up', 'down', ('down', 'up')),
+}
+PHASE_RULE_ALIASES = {
+    'squats': 'squat',
+    'push_ups': 'push_up', 'pushup': 'push_up', 'pushups': 'push_up',
+    'bicep_curls': 'bicep_curl', 'curl': 'bicep_curl', 'curls': 'bicep_curl',
+    'high_knee': 'high_knees',
+    'wall_sit': 'wall_sits',
+    'butt_kick': 'butt_kicks',
+    'jumping_jacks': 'jumping_jack',
+}
+_canonical_exercise_names = {}
+
+def canonical_exercise_name(exercise):
+    """Normalize an exercise label to its PHASE_RULES key, memoized per label"""
+    canonical = _canonical_exercise_names.get(exercise)
+    if canonical is None:
+        canonical = exercise.lower().replace('-', '_').replace(' ', '_')
+        canonical = PHASE_RULE_ALIASES.get(canonical, canonical)
+        _canonical_exercise_names[exercise] = canonical
+    return canonical
+
+def detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise=None, state=None):
     """
     Detect if the exercise is in 'up' or 'down' phase based on joint angles
     Enhanced version with proper rep counting for different exercise types
+    Updates the given session state in place; without one, the default session
+    is updated atomically through the state store
     """
-    global current_exercise_state
+    if state is None:
+        return exercise_state.update(DEFAULT_SESSION_ID, lambda default_state: detect_exercise_phase(
+            joint_angles, predicted_exercise, selected_exercise, default_state))
+    current_exercise_state = state
     
     # Get key joint angles with safety checks
     shoulder_angle = joint_angles[0] if len(joint_angles) > 0 else 90
@@ -360,148 +620,96 @@ def detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise=No
     knee_angle = joint_angles[6] if len(joint_angles) > 6 else 90
     
     # Debug logging
-    print(f"🔍 DEBUG Phase Detection:")
-    print(f"   Exercise: {predicted_exercise}")
-    print(f"   Angles - Shoulder: {shoulder_angle:.1f}°, Elbow: {elbow_angle:.1f}°, Hip: {hip_angle:.1f}°, Knee: {knee_angle:.1f}°")
-    
-    # Phase detection logic for each exercise type
-    exercise_lower = predicted_exercise.lower().replace('-', '_').replace(' ', '_')
-    
-    # Squats - Count on up movement (standing up completes a rep)
-    if exercise_lower in ['squat', 'squats']:
-        if knee_angle < 120:  # Lowered threshold for better detection
-            new_phase = 'down'
-        else:
-            new_phase = 'up'
-    
-    # Push-ups - Count on up movement (pushing up completes a rep)
-    elif exercise_lower in ['push_up', 'push_ups', 'pushup', 'pushups']:
-        if elbow_angle < 120:  # Lowered threshold
-            new_phase = 'down'
-        else:
-            new_phase = 'up'
-    
-    # Bicep curls - Count on down movement (lowering weight completes a rep)
-    elif exercise_lower in ['bicep_curl', 'bicep_curls', 'curl', 'curls']:
-        if elbow_angle < 110:  # Curled position
-            new_phase = 'up'
-        else:
-            new_phase = 'down'
-    
-    # High knees - Count on down movement (lowering knee completes a rep)
-    elif exercise_lower in ['high_knees', 'high_knee']:
-        if knee_angle < 110:  # Knee raised
-            new_phase = 'up'
-        else:
-            new_phase = 'down'
-    
-    # Wall sits (isometric) - Count holds
-    elif exercise_lower in ['wall_sits', 'wall_sit']:
-        if knee_angle < 120 and knee_angle > 60:  # Wider range for hold detection
-            new_phase = 'hold'
-        else:
-            new_phase = 'rest'
-    
-    # Butt kicks - Count on down movement
-    elif exercise_lower in ['butt_kicks', 'butt_kick']:
-        if knee_angle < 130:  # Heel to glute
-            new_phase = 'up'
-        else:
-            new_phase = 'down'
-    
-    # Jumping jacks - Count on down movement
-    elif exercise_lower in ['jumping_jack', 'jumping_jacks']:
-        if shoulder_angle > 120:  # Arms raised
-            new_phase = 'up'
-        else:
-            new_phase = 'down'
-    
-    # Default - use shoulder/elbow combination
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    if debug_enabled:
+        logger.debug("🔍 Phase detection: exercise=%s shoulder=%.1f° elbow=%.1f° hip=%.1f° knee=%.1f°",
+                     predicted_exercise, shoulder_angle, elbow_angle, hip_angle, knee_angle)
+    
+    # Phase detection via the per-exercise rule table
+    rule = PHASE_RULES.get(canonical_exercise_name(predicted_exercise))
+    if rule is None:
+        # Default - use shoulder/elbow combination
+        new_phase = 'down' if shoulder_angle < 110 or elbow_angle < 110 else 'up'
+        rep_transition = None
     else:
-        if shoulder_angle < 110 or elbow_angle < 110:
-            new_phase = 'down'
-        else:
-            new_phase = 'up'
+        joint_idx, comparison, threshold, phase_if_true, phase_if_false, rep_transition = rule
+        angle = joint_angles[joint_idx] if len(joint_angles) > joint_idx else 90
+        if comparison == 'lt':
+            matched = angle < threshold
+        elif comparison == 'gt':
+            matched = angle > threshold
+        else:  # 'between' (exclusive range)
+            matched = threshold[0] < angle < threshold[1]
+        new_phase = phase_if_true if matched else phase_if_false
     
     # Count reps on phase transitions based on exercise type
-    old_phase = current_exercise_state['current_phase']
-    old_rep_count = current_exercise_state['rep_count']
+    old_phase = current_exercise_state.current_phase
+    old_rep_count = current_exercise_state.rep_count
     
     # Different rep counting logic per exercise type
     rep_incremented = False
     
-    if new_phase not in ['hold', 'rest'] and current_exercise_state['current_phase'] != new_phase:
-        # For most exercises, count on 'down' to 'up' transition (completing the positive movement)
-        if exercise_lower in ['squat', 'squats', 'push_up', 'push_ups', 'pushup', 'pushups', 'jumping_jack', 'jumping_jacks']:
-            if current_exercise_state['current_phase'] == 'down' and new_phase == 'up':
-                current_exercise_state['rep_count'] += 1
-                rep_incremented = True
-                print(f"   🔥 REP COMPLETED (up movement)! {old_rep_count} → {current_exercise_state['rep_count']}")
-        
-        # For bicep curls and high knees, count on 'up' to 'down' transition (completing the negative movement)
-        elif exercise_lower in ['bicep_curl', 'bicep_curls', 'curl', 'curls', 'high_knees', 'high_knee', 'butt_kicks', 'butt_kick']:
-            if current_exercise_state['current_phase'] == 'up' and new_phase == 'down':
-                current_exercise_state['rep_count'] += 1
-                rep_incremented = True
-                print(f"   � REP COMPLETED (down movement)! {old_rep_count} → {current_exercise_state['rep_count']}")
-        
-        current_exercise_state['current_phase'] = new_phase
-        if not rep_incremented:
-            print(f"   �📈 Phase transition: {old_phase} → {new_phase}")
+    if new_phase not in ['hold', 'rest'] and current_exercise_state.current_phase != new_phase:
+        # Squats, push-ups and jumping jacks count on 'down' -> 'up' (completing the positive movement);
+        # curls, high knees and butt kicks count on 'up' -> 'down' (completing the negative movement)
+        if rep_transition == (current_exercise_state.current_phase, new_phase):
+            current_exercise_state.rep_count += 1
+            rep_incremented = True
+            if debug_enabled:
+                logger.debug("   🔥 REP COMPLETED (%s movement)! %d → %d",
+                             new_phase, old_rep_count, current_exercise_state.rep_count)
+
+        current_exercise_state.current_phase = new_phase
+        if debug_enabled and not rep_incremented:
+            logger.debug("   📈 Phase transition: %s → %s", old_phase, new_phase)
     
     # Handle isometric exercises (wall sits)
     elif new_phase in ['hold', 'rest']:
-        if current_exercise_state['current_phase'] != new_phase:
-            if new_phase == 'hold' and current_exercise_state['current_phase'] == 'rest':
-                current_exercise_state['rep_count'] += 1
-                print(f"   🔥 HOLD STARTED! {old_rep_count} → {current_exercise_state['rep_count']}")
-        current_exercise_state['current_phase'] = new_phase
-        print(f"   📈 Phase change: {old_phase} → {new_phase}")
-    else:
-        print(f"   ➡️  Phase maintained: {new_phase}")
-    
-    print(f"   🎯 Final: Phase={new_phase}, Reps={current_exercise_state['rep_count']}")
+        if current_exercise_state.current_phase != new_phase:
+            if new_phase == 'hold' and current_exercise_state.current_phase == 'rest':
+                current_exercise_state.rep_count += 1
+                if debug_enabled:
+                    logger.debug("   🔥 HOLD STARTED! %d → %d", old_rep_count, current_exercise_state.rep_count)
+        current_exercise_state.current_phase = new_phase
+        if debug_enabled:
+            logger.debug("   📈 Phase change: %s → %s", old_phase, new_phase)
+    elif debug_enabled:
+        logger.debug("   ➡️  Phase maintained: %s", new_phase)
+    
+    if debug_enabled:
+        logger.debug("   🎯 Final: Phase=%s, Reps=%d", new_phase, current_exercise_state.rep_count)
     
     return new_phase
 
+@app.before_request
+def set_request_timestamp():
+    """Format the request timestamp once, shared by every response field that needs it"""
+    g.timestamp = datetime.now().isoformat()
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Enhanced health check endpoint with detailed system information"""
     try:
-        system_info = {
-            'status': 'healthy',
-            'timestamp': datetime.now().isoformat(),
-            'ml_framework': ML_FRAMEWORK,
-            'model_loaded': model is not None,
-            'scaler_loaded': scaler is not None,
-            'encoder_loaded': label_encoder is not None,
-            'available_exercises': list(label_encoder.classes_) if label_encoder else [],
-            'config': {
-                'confidence_threshold': CONFIG['CONFIDENCE_THRESHOLD'],
-                'phase_threshold': CONFIG['PHASE_THRESHOLD'],
-                'debug_mode': CONFIG['DEBUG']
-            },
-            'session_state': {
-                'current_phase': current_exercise_state['current_phase'],
-                'rep_count': current_exercise_state['rep_count']
-            }
+        if health_static_info is None:
+            refresh_cached_responses()
+        
+        # Only the timestamp and session state change between model loads
+        current_exercise_state = exercise_state.load(request.args.get('user_id', DEFAULT_SESSION_ID))
+        system_info = dict(health_static_info)
+        system_info['timestamp'] = g.timestamp
+        system_info['session_state'] = {
+            'backend': exercise_state.backend,
+            'current_phase': current_exercise_state.current_phase,
+            'rep_count': current_exercise_state.rep_count
         }
         
-        # Add ML framework version if available
-        if ML_FRAMEWORK == "opencv-sklearn":
-            import cv2, sklearn
-            system_info['opencv_version'] = cv2.__version__
-            system_info['sklearn_version'] = sklearn.__version__
-        else:
-            system_info['ml_version'] = "mock"
-            
         return jsonify(system_info)
         
     except Exception as e:
         return jsonify({
             'status': 'error',
             'error': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         }), 500
 
 @app.route('/exercises', methods=['GET'])
@@ -510,9 +718,12 @@ def get_exercises():
     if label_encoder is None:
         return jsonify({'error': 'Label encoder not loaded'}), 500
     
-    return jsonify({
-        'exercises': list(label_encoder.classes_)
-    })
+    # Serve the body serialized at model load; browsers may reuse it for a minute
+    # and revalidate with the ETag (304 when unchanged)
+    response = app.response_class(exercises_response_body, mimetype='application/json')
+    response.cache_control.max_age = 60
+    response.add_etag()
+    return response.make_conditional(request)
 
 @app.route('/predict', methods=['POST'])
 def predict():
@@ -528,6 +739,7 @@ def predict():
             
         joint_angles = data.get('joint_angles', [])
         selected_exercise = data.get('selected_exercise', None)
+        session_id = str(data.get('user_id') or DEFAULT_SESSION_ID)
         
         # Enhanced input validation
         if not joint_angles:
@@ -539,14 +751,16 @@ def predict():
         if len(joint_angles) < 9:
             return jsonify({'error': f'Insufficient joint angles: got {len(joint_angles)}, need at least 9'}), 400
         
-        # Validate angle values
+        # Validate angle values - take first 9 and convert to float32 in one step
         try:
-            joint_angles = [float(angle) for angle in joint_angles[:9]]  # Take first 9 and convert to float
+            joint_angles = np.asarray(joint_angles[:9], dtype=np.float32)
         except (ValueError, TypeError):
             return jsonify({'error': 'All joint angles must be numeric values'}), 400
+        if joint_angles.ndim != 1 or not np.isfinite(joint_angles).all():
+            return jsonify({'error': 'All joint angles must be numeric values'}), 400
             
         # Enhanced pose quality validation
-        zero_count = sum(1 for angle in joint_angles if abs(angle) < 5.0)
+        zero_count = int(np.count_nonzero(np.abs(joint_angles) < 5.0))
         quality_score = (9 - zero_count) / 9
         
         if zero_count > 6:
@@ -554,33 +768,38 @@ def predict():
                 'exercise': 'unknown',
                 'confidence': 0.0,
                 'phase': 'unknown',
-                'rep_count': current_exercise_state['rep_count'],
+                'rep_count': exercise_state.load(session_id).rep_count,
                 'joint_angles': joint_angles,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': g.timestamp,
                 'error': 'Poor pose detection - please ensure you are fully visible in the camera',
                 'quality_score': quality_score
             })
         
-        # Create features from joint angles
-        features = create_exercise_features(joint_angles)
-        
-        # Scale features
         if ML_FRAMEWORK == "opencv-sklearn":
-            features_scaled = scaler.transform(features.reshape(1, -1))
-            
-            # Get prediction probabilities
-            probabilities = model.predict_proba(features_scaled)[0]
-            predicted_class_idx = np.argmax(probabilities)
-            confidence = float(probabilities[predicted_class_idx])
+            # Consecutive camera frames are often near-identical - reuse the previous result
+            cache_key = prediction_cache.key(joint_angles)
+            cached = prediction_cache.get(cache_key)
+            if cached is not None:
+                probabilities, predicted_class_idx, confidence = cached
+            else:
+                # Create and scale features from joint angles in this thread's reusable buffer
+                features = create_exercise_features(joint_angles, out=get_feature_buffer()[0])
+                features_scaled = scale_features(features)
+                
+                # Get prediction probabilities
+                probabilities = predict_probabilities(features_scaled)
+                predicted_class_idx = int(probabilities.argmax())
+                confidence = float(probabilities[predicted_class_idx])
+                prediction_cache.put(cache_key, (probabilities, predicted_class_idx, confidence))
         else:
             # Mock prediction
-            probabilities = np.random.random(len(label_encoder.classes_))
+            probabilities = mock_rng.random(len(exercise_classes))
             probabilities = probabilities / np.sum(probabilities)
-            predicted_class_idx = np.argmax(probabilities)
+            predicted_class_idx = int(probabilities.argmax())
             confidence = float(probabilities[predicted_class_idx])
         
         # Get exercise name
-        predicted_exercise = label_encoder.inverse_transform([predicted_class_idx])[0]
+        predicted_exercise = exercise_classes[predicted_class_idx]
         
         # Exercise matching logic
         exercise_match = False
@@ -593,63 +812,65 @@ def predict():
             exercise_match = confidence >= CONFIG['CONFIDENCE_THRESHOLD'] * 0.6  # Lowered threshold
         
         # Phase detection - Allow phase detection even with lower confidence for better rep counting
-        phase = 'unknown'
+        detect_phase = False
         if quality_score > 0.4:  # Lowered quality threshold
             # Always detect phase for selected exercise, even with lower confidence
             if selected_exercise and predicted_exercise.lower().replace('_', ' ') == selected_exercise.lower().replace('_', ' '):
-                phase = detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise)
+                detect_phase = True
             elif confidence >= CONFIG['CONFIDENCE_THRESHOLD'] * 0.4:  # Much lower threshold for phase detection
-                phase = detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise)
+                detect_phase = True
+        
+        def apply_frame(state):
+            state.last_prediction = {'exercise': predicted_exercise, 'confidence': confidence}
+            phase = 'unknown'
+            if detect_phase:
+                phase = detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise, state)
+            return phase, state.rep_count
+        
+        # One atomic read-modify-write of this session's state
+        phase, rep_count = exercise_state.update(session_id, apply_frame)
         
         return jsonify({
             'exercise': predicted_exercise,
             'confidence': confidence,
             'phase': phase,
-            'rep_count': current_exercise_state['rep_count'],
+            'rep_count': rep_count,
             'joint_angles': joint_angles,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': g.timestamp,
             'exercise_match': exercise_match,
             'selected_exercise': selected_exercise,
             'quality_score': quality_score,
             'ml_framework': ML_FRAMEWORK,
-            'all_predictions': probabilities.tolist() if hasattr(probabilities, 'tolist') else []
+            'all_predictions': probabilities
         })
         
     except Exception as e:
-        print(f"❌ Prediction endpoint error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Prediction endpoint error: %s", e)
         return jsonify({
             'error': f'Internal server error: {str(e)}',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         }), 500
 
 @app.route('/reset_session', methods=['POST'])
 def reset_session():
     """Reset the current exercise session"""
-    global current_exercise_state
-    
     try:
-        data = request.get_json() if request.is_json else {}
+        data = (request.get_json() if request.is_json else None) or {}
         phase_threshold = data.get('phase_threshold', CONFIG['PHASE_THRESHOLD'])
+        session_id = str(data.get('user_id') or DEFAULT_SESSION_ID)
         
-        current_exercise_state = {
-            'current_phase': 'down',
-            'rep_count': 0,
-            'last_prediction': None,
-            'phase_threshold': phase_threshold
-        }
+        current_exercise_state = exercise_state.reset(session_id, phase_threshold)
         
         return jsonify({
             'message': 'Session reset successfully',
-            'new_state': current_exercise_state,
-            'timestamp': datetime.now().isoformat()
+            'new_state': current_exercise_state.to_dict(),
+            'timestamp': g.timestamp
         })
         
     except Exception as e:
         return jsonify({
             'error': f'Failed to reset session: {str(e)}',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         }), 500
 
 @app.route('/log_session', methods=['POST'])
@@ -668,54 +889,56 @@ def log_session():
             'exercise': data['exercise'],
             'total_reps': data['total_reps'],
             'duration': data['duration'],  # in seconds
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': g.timestamp,
             'session_data': data.get('session_data', [])
         }
         
-        # Store session (in production, save to database)
-        exercise_sessions.append(session_entry)
+        # Hand the write to a Celery worker when a broker is configured
+        if store_session is not None:
+            task = store_session.delay(session_entry)
+            return jsonify({
+                'message': 'Session queued for logging',
+                'task_id': task.id
+            }), 202
+        
+        # Store session
+        session_id = exercise_sessions.add(session_entry)
         
         return jsonify({
             'message': 'Session logged successfully',
-            'session_id': len(exercise_sessions) - 1
+            'session_id': session_id
         })
         
     except Exception as e:
         return jsonify({'error': f'Failed to log session: {str(e)}'}), 500
 
+@app.route('/tasks/<task_id>', methods=['GET'])
+def get_task_status(task_id):
+    """Status of a queued /log_session write, with its session id once stored"""
+    if celery_app is None:
+        return jsonify({'error': 'Background tasks are not enabled'}), 404
+    
+    result = celery_app.AsyncResult(task_id)
+    response = {'task_id': task_id, 'status': result.status}
+    if result.successful():
+        response['session_id'] = result.result
+    elif result.failed():
+        response['error'] = str(result.result)
+    return jsonify(response)
+
 @app.route('/sessions/<user_id>', methods=['GET'])
 def get_user_sessions(user_id):
     """Get all sessions for a specific user"""
-    user_sessions = [session for session in exercise_sessions if session['user_id'] == user_id]
-    
-    total_sessions = len(user_sessions)
-    total_reps = sum(session['total_reps'] for session in user_sessions)
-    total_duration = sum(session['duration'] for session in user_sessions)
-    
-    exercise_stats = {}
-    for session in user_sessions:
-        exercise = session['exercise']
-        if exercise not in exercise_stats:
-            exercise_stats[exercise] = {'sessions': 0, 'total_reps': 0, 'total_duration': 0}
-        exercise_stats[exercise]['sessions'] += 1
-        exercise_stats[exercise]['total_reps'] += session['total_reps']
-        exercise_stats[exercise]['total_duration'] += session['duration']
-    
     return jsonify({
         'user_id': user_id,
-        'sessions': user_sessions,
-        'summary': {
-            'total_sessions': total_sessions,
-            'total_reps': total_reps,
-            'total_duration': total_duration,
-            'exercise_breakdown': exercise_stats
-        }
+        'sessions': exercise_sessions.get_user_sessions(user_id),
+        'summary': exercise_sessions.get_user_summary(user_id)
     })
 
 @app.route('/sessions', methods=['GET'])
 def get_all_sessions():
     """Get all sessions (for admin/debugging)"""
-    return jsonify({'sessions': exercise_sessions})
+    return jsonify({'sessions': exercise_sessions.all_sessions()})
 
 @app.route('/retrain', methods=['POST'])
 def retrain_model():
@@ -726,14 +949,19 @@ def retrain_model():
         if success:
             return jsonify({
                 'message': 'Model retrained successfully',
-                'timestamp': datetime.now().isoformat(),
-                'available_exercises': list(label_encoder.classes_)
+                'timestamp': g.timestamp,
+                'available_exercises': exercise_classes
             })
         else:
             return jsonify({'error': 'Failed to retrain model'}), 500
     except Exception as e:
         return jsonify({'error': f'Retraining failed: {str(e)}'}), 500
 
+# Load models when the module is imported, so every process that serves the app
+# (run.py, the flask CLI, each gunicorn worker) has them before its first request
+if CONFIG['PRELOAD_MODELS']:
+    ensure_models_loaded()
+
 if __name__ == '__main__':
     print("🚀 Starting Physiotherapy Exercise Monitoring Backend (OpenCV + scikit-learn)...")
     print(f"🔧 Configuration:")
@@ -741,14 +969,16 @@ if __name__ == '__main__':
     print(f"   - Debug Mode: {CONFIG['DEBUG']}")
     print(f"   - Host: {CONFIG['HOST']}")
     print(f"   - Port: {CONFIG['PORT']}")
+    print(f"   - Model Bundle Path: {CONFIG['MODEL_BUNDLE_PATH']}")
     print(f"   - Model Path: {CONFIG['MODEL_PATH']}")
     print(f"   - Scaler Path: {CONFIG['SCALER_PATH']}")
     print(f"   - Encoder Path: {CONFIG['ENCODER_PATH']}")
     print(f"   - Confidence Threshold: {CONFIG['CONFIDENCE_THRESHOLD']}")
     print(f"   - Phase Threshold: {CONFIG['PHASE_THRESHOLD']}")
+    print(f"   - Session Logging: {'Celery queue' if store_session is not None else 'in request'}")
     
-    # Load models on startup
-    if load_models():
+    # Load models on startup (already done at import unless PRELOAD_MODELS is off)
+    if ensure_models_loaded():
         print("✅ Models loaded successfully. Starting Flask server...")
         try:
             app.run(
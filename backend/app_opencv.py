@@ -3,9 +3,12 @@ import pickle
 import numpy as np
 from datetime import datetime
 import json
-from flask import Flask, request, jsonify
+import logging
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 from dotenv import load_dotenv
+from json_provider import install_json_provider
+from session_store import SessionStore
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +21,7 @@ try:
     from sklearn.model_selection import train_test_split
     from sklearn.metrics import accuracy_score, classification_report
     import joblib
+    from model_bundle import load_model_bundle, save_model_bundle
     ML_FRAMEWORK = "opencv-sklearn"
     print(f"✅ OpenCV {cv2.__version__} and scikit-learn loaded successfully")
 except ImportError as e:
@@ -47,6 +51,7 @@ except ImportError as e:
             return data
 
 app = Flask(__name__)
+install_json_provider(app)  # orjson when available, serializes NumPy values directly
 
 # Configure CORS with explicit settings for frontend communication
 CORS(app, 
@@ -58,21 +63,36 @@ CORS(app,
 
 # Configuration
 CONFIG = {
+    'MODEL_BUNDLE_PATH': os.getenv('MODEL_BUNDLE_PATH', 'model/exercise_classifier_rf_bundle.joblib'),  # Model, scaler and encoder in one file
     'MODEL_PATH': os.getenv('MODEL_PATH', 'model/exercise_classifier_rf.pkl'),
     'SCALER_PATH': os.getenv('SCALER_PATH', 'model/feature_scaler.pkl'),
     'ENCODER_PATH': os.getenv('ENCODER_PATH', 'model/label_encoder.pkl'),
+    'SESSIONS_DB_PATH': os.getenv('SESSIONS_DB_PATH', 'sessions.db'),
     'DEBUG': os.getenv('FLASK_DEBUG', 'True').lower() == 'true',
     'HOST': os.getenv('FLASK_HOST', '0.0.0.0'),
     'PORT': int(os.getenv('FLASK_PORT', 5000)),
     'CONFIDENCE_THRESHOLD': float(os.getenv('CONFIDENCE_THRESHOLD', 0.65)),
-    'PHASE_THRESHOLD': float(os.getenv('PHASE_THRESHOLD', 0.65))
+    'PHASE_THRESHOLD': float(os.getenv('PHASE_THRESHOLD', 0.65)),
+    'LOG_LEVEL': os.getenv('LOG_LEVEL', 'INFO').upper()
 }
 
+# Request-path diagnostics go through logging rather than print so they cost
+# nothing unless LOG_LEVEL=DEBUG
+logger = logging.getLogger('physio')
+logger.setLevel(CONFIG['LOG_LEVEL'])
+if not logger.handlers:
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.addHandler(log_handler)
+
 # Global variables for model, scaler and encoder
 model = None
 scaler = None
 label_encoder = None
-exercise_sessions = []  # In-memory storage for demo (use database in production)
+scaler_mean = None       # Cached StandardScaler affine (float32) for fast in-place scaling
+scaler_inv_scale = None
+exercise_classes = []   # label_encoder.classes_ as a plain list, refreshed whenever the encoder changes
+exercise_sessions = SessionStore(CONFIG['SESSIONS_DB_PATH'])  # SQLite (WAL), shared across processes
 
 # Exercise phase tracking
 current_exercise_state = {
@@ -92,7 +112,8 @@ def create_exercise_features(joint_angles):
         avg_angle = np.mean(joint_angles) if joint_angles else 90.0
         joint_angles = joint_angles + [avg_angle] * (9 - len(joint_angles))
     
-    joint_angles = np.array(joint_angles[:9], dtype=np.float32)
+    # No copy when given a float32 array (as /predict does)
+    joint_angles = np.asarray(joint_angles[:9], dtype=np.float32)
     
     # Feature engineering for exercise classification
     features = []
@@ -104,19 +125,17 @@ def create_exercise_features(joint_angles):
     features.extend(joint_angles / 180.0)
     
     # 3. Trigonometric features (18 features)
-    features.extend(np.sin(np.radians(joint_angles)))
-    features.extend(np.cos(np.radians(joint_angles)))
+    radians = np.radians(joint_angles)
+    features.extend(np.sin(radians))
+    features.extend(np.cos(radians))
     
     # 4. Joint differences (8 features)
-    for i in range(8):
-        features.append(abs(joint_angles[i] - joint_angles[i+1]))
+    features.extend(np.abs(np.diff(joint_angles)))
     
-    # 5. Joint ratios (8 features)
-    for i in range(8):
-        if joint_angles[i+1] != 0:
-            features.append(joint_angles[i] / joint_angles[i+1])
-        else:
-            features.append(0.0)
+    # 5. Joint ratios (8 features), 0 where the next angle is 0
+    ratios = np.zeros(8, dtype=np.float32)
+    np.divide(joint_angles[:-1], joint_angles[1:], out=ratios, where=joint_angles[1:] != 0)
+    features.extend(ratios)
     
     # 6. Statistical features (5 features)
     features.extend([
@@ -181,6 +200,31 @@ def create_exercise_features(joint_angles):
     
     return np.array(features, dtype=np.float32)
 
+# Exercise classes used for the synthetic training set
+TRAINING_EXERCISES = [
+    'squat', 'push_up', 'bicep_curl', 'shoulder_press', 'deadlift',
+    'lunge', 'plank', 'jumping_jack', 'tricep_dip', 'pull_up',
+    'bench_press', 'lat_pulldown', 't_bar_row', 'leg_extension',
+    'hip_thrust', 'leg_raises', 'russian_twist', 'chest_fly_machine',
+    'high_knees', 'butt_kicks', 'wall_sits', 'burpees'
+]
+
+# Realistic joint angle profiles: exercise -> (mean angles, angle std devs), ordered
+# shoulders, elbows, hips, knees (left/right) and torso
+_TRAINING_PROFILES = {
+    'squat':      ([130, 132, 170, 168, 100, 102, 90, 88, 175], [10, 10, 15, 15, 20, 20, 25, 25, 5]),
+    'push_up':    ([90, 88, 80, 82, 160, 162, 170, 172, 175], [15, 15, 20, 20, 10, 10, 10, 10, 5]),
+    'bicep_curl': ([120, 118, 60, 62, 170, 172, 175, 173, 178], [10, 10, 30, 30, 5, 5, 5, 5, 3]),       # elbows curled
+    'high_knees': ([110, 112, 140, 142, 90, 92, 45, 47, 170], [15, 15, 10, 10, 20, 20, 20, 20, 8]),     # knees high
+    'wall_sits':  ([140, 138, 160, 162, 90, 88, 90, 92, 175], [5, 5, 8, 8, 5, 5, 5, 5, 3]),             # 90 degree hips/knees
+}
+# Default pattern with some randomness
+_DEFAULT_TRAINING_PROFILE = ([120, 118, 90, 92, 130, 132, 140, 138, 170], [20, 20, 30, 30, 25, 25, 20, 20, 10])
+TRAINING_ANGLE_MEANS = np.array(
+    [_TRAINING_PROFILES.get(e, _DEFAULT_TRAINING_PROFILE)[0] for e in TRAINING_EXERCISES], dtype=np.float64)
+TRAINING_ANGLE_STDS = np.array(
+    [_TRAINING_PROFILES.get(e, _DEFAULT_TRAINING_PROFILE)[1] for e in TRAINING_EXERCISES], dtype=np.float64)
+
 def train_exercise_classifier():
     """
     Train a Random Forest classifier on synthetic exercise data
@@ -188,76 +232,25 @@ def train_exercise_classifier():
     """
     print("🤖 Training exercise classifier...")
     
-    # Define exercise classes
-    exercises = [
-        'squat', 'push_up', 'bicep_curl', 'shoulder_press', 'deadlift',
-        'lunge', 'plank', 'jumping_jack', 'tricep_dip', 'pull_up',
-        'bench_press', 'lat_pulldown', 't_bar_row', 'leg_extension',
-        'hip_thrust', 'leg_raises', 'russian_twist', 'chest_fly_machine',
-        'high_knees', 'butt_kicks', 'wall_sits', 'burpees'
-    ]
-    
-    # Generate synthetic training data based on exercise characteristics
-    X_train = []
-    y_train = []
-    
-    for exercise_idx, exercise in enumerate(exercises):
-        for _ in range(100):  # 100 samples per exercise
-            # Generate realistic joint angles for each exercise
-            if exercise == 'squat':
-                angles = [130+np.random.normal(0, 10), 132+np.random.normal(0, 10),  # shoulders
-                         170+np.random.normal(0, 15), 168+np.random.normal(0, 15),   # elbows
-                         100+np.random.normal(0, 20), 102+np.random.normal(0, 20),   # hips
-                         90+np.random.normal(0, 25), 88+np.random.normal(0, 25),     # knees
-                         175+np.random.normal(0, 5)]                                 # torso
-            elif exercise == 'push_up':
-                angles = [90+np.random.normal(0, 15), 88+np.random.normal(0, 15),    # shoulders
-                         80+np.random.normal(0, 20), 82+np.random.normal(0, 20),     # elbows
-                         160+np.random.normal(0, 10), 162+np.random.normal(0, 10),   # hips
-                         170+np.random.normal(0, 10), 172+np.random.normal(0, 10),   # knees
-                         175+np.random.normal(0, 5)]                                 # torso
-            elif exercise == 'bicep_curl':
-                angles = [120+np.random.normal(0, 10), 118+np.random.normal(0, 10),  # shoulders
-                         60+np.random.normal(0, 30), 62+np.random.normal(0, 30),     # elbows (curled)
-                         170+np.random.normal(0, 5), 172+np.random.normal(0, 5),     # hips
-                         175+np.random.normal(0, 5), 173+np.random.normal(0, 5),     # knees
-                         178+np.random.normal(0, 3)]                                 # torso
-            elif exercise == 'high_knees':
-                angles = [110+np.random.normal(0, 15), 112+np.random.normal(0, 15),  # shoulders
-                         140+np.random.normal(0, 10), 142+np.random.normal(0, 10),   # elbows
-                         90+np.random.normal(0, 20), 92+np.random.normal(0, 20),     # hips
-                         45+np.random.normal(0, 20), 47+np.random.normal(0, 20),     # knees (high)
-                         170+np.random.normal(0, 8)]                                 # torso
-            elif exercise == 'wall_sits':
-                angles = [140+np.random.normal(0, 5), 138+np.random.normal(0, 5),    # shoulders
-                         160+np.random.normal(0, 8), 162+np.random.normal(0, 8),     # elbows
-                         90+np.random.normal(0, 5), 88+np.random.normal(0, 5),       # hips (90 degrees)
-                         90+np.random.normal(0, 5), 92+np.random.normal(0, 5),       # knees (90 degrees)
-                         175+np.random.normal(0, 3)]                                 # torso
-            else:
-                # Default pattern with some randomness
-                angles = [120+np.random.normal(0, 20), 118+np.random.normal(0, 20),
-                         90+np.random.normal(0, 30), 92+np.random.normal(0, 30),
-                         130+np.random.normal(0, 25), 132+np.random.normal(0, 25),
-                         140+np.random.normal(0, 20), 138+np.random.normal(0, 20),
-                         170+np.random.normal(0, 10)]
-            
-            # Ensure angles are within valid range
-            angles = [max(0, min(180, angle)) for angle in angles]
-            
-            # Create features from angles
-            features = create_exercise_features(angles)
-            X_train.append(features)
-            y_train.append(exercise)
+    # Generate synthetic training data based on exercise characteristics,
+    # drawing all of the noise in one seeded call so retraining is deterministic
+    n_per_exercise = 100  # 100 samples per exercise
+    rng = np.random.default_rng(42)
+    noise = rng.standard_normal((len(TRAINING_EXERCISES), n_per_exercise, 9))
+    angles = TRAINING_ANGLE_MEANS[:, None, :] + TRAINING_ANGLE_STDS[:, None, :] * noise
+    
+    # Ensure angles are within valid range
+    angles = np.clip(angles, 0, 180).reshape(-1, 9)
     
-    X_train = np.array(X_train)
-    y_train = np.array(y_train)
+    # Create features from angles
+    X_train = np.array([create_exercise_features(list(row)) for row in angles])
+    y_train = np.repeat(np.array(TRAINING_EXERCISES), n_per_exercise)
     
     print(f"📊 Training data shape: {X_train.shape}")
     print(f"📝 Exercise classes: {len(set(y_train))}")
     
     # Create and train the model
-    global model, scaler, label_encoder
+    global model, scaler, label_encoder, exercise_classes
     
     # Initialize components
     scaler = StandardScaler()
@@ -276,6 +269,8 @@ def train_exercise_classifier():
     
     # Train model
     model.fit(X_scaled, y_encoded)
+    exercise_classes = label_encoder.classes_.tolist()
+    cache_scaler_params()
     
     # Evaluate on training data (in production, use separate test set)
     train_predictions = model.predict(X_scaled)
@@ -283,40 +278,67 @@ def train_exercise_classifier():
     
     print(f"✅ Model trained successfully!")
     print(f"📈 Training accuracy: {train_accuracy:.3f}")
-    print(f"🎯 Available exercises: {list(label_encoder.classes_)}")
+    print(f"🎯 Available exercises: {exercise_classes}")
     
     # Save models
     try:
         os.makedirs('model', exist_ok=True)
-        joblib.dump(model, CONFIG['MODEL_PATH'])
-        joblib.dump(scaler, CONFIG['SCALER_PATH'])
-        joblib.dump(label_encoder, CONFIG['ENCODER_PATH'])
+        save_model_bundle(CONFIG['MODEL_BUNDLE_PATH'], model, scaler, label_encoder)
         print(f"💾 Models saved successfully")
     except Exception as e:
         print(f"⚠️  Could not save models: {e}")
     
     return True
 
+def cache_scaler_params():
+    """Cache the fitted scaler's mean and reciprocal scale as float32 arrays"""
+    global scaler_mean, scaler_inv_scale
+    
+    if hasattr(scaler, 'mean_') or hasattr(scaler, 'scale_'):
+        n_features = scaler.n_features_in_
+        mean = scaler.mean_ if getattr(scaler, 'with_mean', True) else None
+        scale = scaler.scale_ if getattr(scaler, 'with_std', True) else None
+        scaler_mean = (np.zeros(n_features) if mean is None else mean).astype(np.float32)
+        scaler_inv_scale = (np.ones(n_features) if scale is None else 1.0 / scale).astype(np.float32)
+    else:
+        scaler_mean = None
+        scaler_inv_scale = None
+
+def scale_features(features):
+    """
+    Standardize a (1, n_features) float32 feature row in place using the cached scaler parameters
+    Equivalent to scaler.transform without sklearn's per-call validation and allocation
+    """
+    if scaler_mean is None or scaler_mean.shape[0] != features.shape[-1]:
+        return scaler.transform(features)
+    
+    features -= scaler_mean
+    features *= scaler_inv_scale
+    return features
+
 def load_models():
     """Load the Random Forest model, scaler, and label encoder"""
-    global model, scaler, label_encoder
+    global model, scaler, label_encoder, exercise_classes
     
     try:
         if ML_FRAMEWORK == "opencv-sklearn":
-            # Try to load existing models
-            if (os.path.exists(CONFIG['MODEL_PATH']) and 
-                os.path.exists(CONFIG['SCALER_PATH']) and 
-                os.path.exists(CONFIG['ENCODER_PATH'])):
-                
+            # Try to load existing models: the single-file bundle, else the separate files
+            model_files = (CONFIG['MODEL_PATH'], CONFIG['SCALER_PATH'], CONFIG['ENCODER_PATH'])
+            if os.path.exists(CONFIG['MODEL_BUNDLE_PATH']):
+                model, scaler, label_encoder = load_model_bundle(CONFIG['MODEL_BUNDLE_PATH'])
+            elif all(os.path.exists(path) for path in model_files):
                 model = joblib.load(CONFIG['MODEL_PATH'])
                 scaler = joblib.load(CONFIG['SCALER_PATH'])
                 label_encoder = joblib.load(CONFIG['ENCODER_PATH'])
-                
-                print(f"✅ Models loaded successfully from disk")
-                print(f"📝 Available exercises: {list(label_encoder.classes_)}")
             else:
                 print("📚 No existing models found, training new classifier...")
                 return train_exercise_classifier()
+            
+            exercise_classes = label_encoder.classes_.tolist()
+            cache_scaler_params()
+            
+            print(f"✅ Models loaded successfully from disk")
+            print(f"📝 Available exercises: {exercise_classes}")
         else:
             # Use mock models when ML framework is not available
             print("🔧 Using mock models (ML framework not available)")
@@ -338,8 +360,10 @@ def load_models():
             
             model = MockModel()
             scaler = MockScaler()
+            cache_scaler_params()
             label_encoder = MockLabelEncoder()
-            print(f"🔧 Mock models created with exercises: {list(label_encoder.classes_)}")
+            exercise_classes = label_encoder.classes_.tolist()
+            print(f"🔧 Mock models created with exercises: {exercise_classes}")
         
     except Exception as e:
         print(f"❌ Error loading models: {str(e)}")
@@ -360,9 +384,10 @@ def detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise=No
     knee_angle = joint_angles[6] if len(joint_angles) > 6 else 90
     
     # Debug logging
-    print(f"🔍 DEBUG Phase Detection:")
-    print(f"   Exercise: {predicted_exercise}")
-    print(f"   Angles - Shoulder: {shoulder_angle:.1f}°, Elbow: {elbow_angle:.1f}°, Hip: {hip_angle:.1f}°, Knee: {knee_angle:.1f}°")
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    if debug_enabled:
+        logger.debug("🔍 Phase detection: exercise=%s shoulder=%.1f° elbow=%.1f° hip=%.1f° knee=%.1f°",
+                     predicted_exercise, shoulder_angle, elbow_angle, hip_angle, knee_angle)
     
     # Phase detection logic for each exercise type
     exercise_lower = predicted_exercise.lower().replace('-', '_')
@@ -423,35 +448,45 @@ def detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise=No
     if new_phase not in ['hold', 'rest'] and current_exercise_state['current_phase'] != new_phase:
         if current_exercise_state['current_phase'] == 'down' and new_phase == 'up':
             current_exercise_state['rep_count'] += 1
-            print(f"   🔥 REP COMPLETED! {old_rep_count} → {current_exercise_state['rep_count']}")
+            if debug_enabled:
+                logger.debug("   🔥 REP COMPLETED! %d → %d", old_rep_count, current_exercise_state['rep_count'])
         current_exercise_state['current_phase'] = new_phase
-        print(f"   📈 Phase transition: {old_phase} → {new_phase}")
+        if debug_enabled:
+            logger.debug("   📈 Phase transition: %s → %s", old_phase, new_phase)
     elif new_phase in ['hold', 'rest']:
         if current_exercise_state['current_phase'] != new_phase:
             if new_phase == 'hold':
                 current_exercise_state['rep_count'] += 1
-                print(f"   🔥 HOLD COMPLETED! {old_rep_count} → {current_exercise_state['rep_count']}")
+                if debug_enabled:
+                    logger.debug("   🔥 HOLD COMPLETED! %d → %d", old_rep_count, current_exercise_state['rep_count'])
         current_exercise_state['current_phase'] = new_phase
-        print(f"   📈 Phase change: {old_phase} → {new_phase}")
-    else:
-        print(f"   ➡️  Phase maintained: {new_phase}")
+        if debug_enabled:
+            logger.debug("   📈 Phase change: %s → %s", old_phase, new_phase)
+    elif debug_enabled:
+        logger.debug("   ➡️  Phase maintained: %s", new_phase)
     
-    print(f"   🎯 Final: Phase={new_phase}, Reps={current_exercise_state['rep_count']}")
+    if debug_enabled:
+        logger.debug("   🎯 Final: Phase=%s, Reps=%d", new_phase, current_exercise_state['rep_count'])
     
     return new_phase
 
+@app.before_request
+def set_request_timestamp():
+    """Format the request timestamp once, shared by every response field that needs it"""
+    g.timestamp = datetime.now().isoformat()
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Enhanced health check endpoint with detailed system information"""
     try:
         system_info = {
             'status': 'healthy',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': g.timestamp,
             'ml_framework': ML_FRAMEWORK,
             'model_loaded': model is not None,
             'scaler_loaded': scaler is not None,
             'encoder_loaded': label_encoder is not None,
-            'available_exercises': list(label_encoder.classes_) if label_encoder else [],
+            'available_exercises': exercise_classes,
             'config': {
                 'confidence_threshold': CONFIG['CONFIDENCE_THRESHOLD'],
                 'phase_threshold': CONFIG['PHASE_THRESHOLD'],
@@ -477,7 +512,7 @@ def health_check():
         return jsonify({
             'status': 'error',
             'error': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         }), 500
 
 @app.route('/exercises', methods=['GET'])
@@ -487,7 +522,7 @@ def get_exercises():
         return jsonify({'error': 'Label encoder not loaded'}), 500
     
     return jsonify({
-        'exercises': list(label_encoder.classes_)
+        'exercises': exercise_classes
     })
 
 @app.route('/predict', methods=['POST'])
@@ -515,14 +550,16 @@ def predict():
         if len(joint_angles) < 9:
             return jsonify({'error': f'Insufficient joint angles: got {len(joint_angles)}, need at least 9'}), 400
         
-        # Validate angle values
+        # Validate angle values - take first 9 and convert to float32 in one step
         try:
-            joint_angles = [float(angle) for angle in joint_angles[:9]]  # Take first 9 and convert to float
+            joint_angles = np.asarray(joint_angles[:9], dtype=np.float32)
         except (ValueError, TypeError):
             return jsonify({'error': 'All joint angles must be numeric values'}), 400
+        if joint_angles.ndim != 1 or not np.isfinite(joint_angles).all():
+            return jsonify({'error': 'All joint angles must be numeric values'}), 400
             
         # Enhanced pose quality validation
-        zero_count = sum(1 for angle in joint_angles if abs(angle) < 5.0)
+        zero_count = int(np.count_nonzero(np.abs(joint_angles) < 5.0))
         quality_score = (9 - zero_count) / 9
         
         if zero_count > 6:
@@ -532,7 +569,7 @@ def predict():
                 'phase': 'unknown',
                 'rep_count': current_exercise_state['rep_count'],
                 'joint_angles': joint_angles,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': g.timestamp,
                 'error': 'Poor pose detection - please ensure you are fully visible in the camera',
                 'quality_score': quality_score
             })
@@ -542,21 +579,21 @@ def predict():
         
         # Scale features
         if ML_FRAMEWORK == "opencv-sklearn":
-            features_scaled = scaler.transform(features.reshape(1, -1))
+            features_scaled = scale_features(features.reshape(1, -1))
             
             # Get prediction probabilities
             probabilities = model.predict_proba(features_scaled)[0]
-            predicted_class_idx = np.argmax(probabilities)
+            predicted_class_idx = int(probabilities.argmax())
             confidence = float(probabilities[predicted_class_idx])
         else:
             # Mock prediction
-            probabilities = np.random.random(len(label_encoder.classes_))
+            probabilities = np.random.random(len(exercise_classes))
             probabilities = probabilities / np.sum(probabilities)
-            predicted_class_idx = np.argmax(probabilities)
+            predicted_class_idx = int(probabilities.argmax())
             confidence = float(probabilities[predicted_class_idx])
         
         # Get exercise name
-        predicted_exercise = label_encoder.inverse_transform([predicted_class_idx])[0]
+        predicted_exercise = exercise_classes[predicted_class_idx]
         
         # Exercise matching logic
         exercise_match = False
@@ -579,21 +616,19 @@ def predict():
             'phase': phase,
             'rep_count': current_exercise_state['rep_count'],
             'joint_angles': joint_angles,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': g.timestamp,
             'exercise_match': exercise_match,
             'selected_exercise': selected_exercise,
             'quality_score': quality_score,
             'ml_framework': ML_FRAMEWORK,
-            'all_predictions': probabilities.tolist() if hasattr(probabilities, 'tolist') else []
+            'all_predictions': probabilities
         })
         
     except Exception as e:
-        print(f"❌ Prediction endpoint error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Prediction endpoint error: %s", e)
         return jsonify({
             'error': f'Internal server error: {str(e)}',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         }), 500
 
 @app.route('/reset_session', methods=['POST'])
@@ -615,13 +650,13 @@ def reset_session():
         return jsonify({
             'message': 'Session reset successfully',
             'new_state': current_exercise_state,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         })
         
     except Exception as e:
         return jsonify({
             'error': f'Failed to reset session: {str(e)}',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         }), 500
 
 @app.route('/log_session', methods=['POST'])
@@ -640,16 +675,16 @@ def log_session():
             'exercise': data['exercise'],
             'total_reps': data['total_reps'],
             'duration': data['duration'],  # in seconds
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': g.timestamp,
             'session_data': data.get('session_data', [])
         }
         
-        # Store session (in production, save to database)
-        exercise_sessions.append(session_entry)
+        # Store session
+        session_id = exercise_sessions.add(session_entry)
         
         return jsonify({
             'message': 'Session logged successfully',
-            'session_id': len(exercise_sessions) - 1
+            'session_id': session_id
         })
         
     except Exception as e:
@@ -658,36 +693,16 @@ def log_session():
 @app.route('/sessions/<user_id>', methods=['GET'])
 def get_user_sessions(user_id):
     """Get all sessions for a specific user"""
-    user_sessions = [session for session in exercise_sessions if session['user_id'] == user_id]
-    
-    total_sessions = len(user_sessions)
-    total_reps = sum(session['total_reps'] for session in user_sessions)
-    total_duration = sum(session['duration'] for session in user_sessions)
-    
-    exercise_stats = {}
-    for session in user_sessions:
-        exercise = session['exercise']
-        if exercise not in exercise_stats:
-            exercise_stats[exercise] = {'sessions': 0, 'total_reps': 0, 'total_duration': 0}
-        exercise_stats[exercise]['sessions'] += 1
-        exercise_stats[exercise]['total_reps'] += session['total_reps']
-        exercise_stats[exercise]['total_duration'] += session['duration']
-    
     return jsonify({
         'user_id': user_id,
-        'sessions': user_sessions,
-        'summary': {
-            'total_sessions': total_sessions,
-            'total_reps': total_reps,
-            'total_duration': total_duration,
-            'exercise_breakdown': exercise_stats
-        }
+        'sessions': exercise_sessions.get_user_sessions(user_id),
+        'summary': exercise_sessions.get_user_summary(user_id)
     })
 
 @app.route('/sessions', methods=['GET'])
 def get_all_sessions():
     """Get all sessions (for admin/debugging)"""
-    return jsonify({'sessions': exercise_sessions})
+    return jsonify({'sessions': exercise_sessions.all_sessions()})
 
 @app.route('/retrain', methods=['POST'])
 def retrain_model():
@@ -698,8 +713,8 @@ def retrain_model():
         if success:
             return jsonify({
                 'message': 'Model retrained successfully',
-                'timestamp': datetime.now().isoformat(),
-                'available_exercises': list(label_encoder.classes_)
+                'timestamp': g.timestamp,
+                'available_exercises': exercise_classes
             })
         else:
             return jsonify({'error': 'Failed to retrain model'}), 500
@@ -713,6 +728,7 @@ if __name__ == '__main__':
     print(f"   - Debug Mode: {CONFIG['DEBUG']}")
     print(f"   - Host: {CONFIG['HOST']}")
     print(f"   - Port: {CONFIG['PORT']}")
+    print(f"   - Model Bundle Path: {CONFIG['MODEL_BUNDLE_PATH']}")
     print(f"   - Model Path: {CONFIG['MODEL_PATH']}")
     print(f"   - Scaler Path: {CONFIG['SCALER_PATH']}")
     print(f"   - Encoder Path: {CONFIG['ENCODER_PATH']}")
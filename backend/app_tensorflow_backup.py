@@ -3,24 +3,33 @@ import pickle
 import numpy as np
 from datetime import datetime
 import json
+import logging
+import threading
 import joblib
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 from dotenv import load_dotenv
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.svm import SVC
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score
+from exercise_state import DEFAULT_SESSION_ID, create_state_store
+from forest_walker import compile_forest
+from json_provider import install_json_provider
+from model_bundle import load_model_bundle
+from onnx_forest import ONNX_AVAILABLE, compile_onnx_classifier
+from prediction_cache import PredictionCache
+from session_store import SessionStore
 
 # Load environment variables
 load_dotenv()
 
 # ML Framework imports with OpenCV and scikit-learn
+# OpenCV is only reported in /health, so DISABLE_CV2=true skips importing it
 try:
-    import cv2
+    if os.getenv('DISABLE_CV2', 'False').lower() == 'true':
+        cv2 = None
+    else:
+        import cv2
+        print(f"✅ OpenCV {cv2.__version__} loaded successfully")
     import sklearn
     ML_FRAMEWORK = "opencv_sklearn"
-    print(f"✅ OpenCV {cv2.__version__} loaded successfully")
     print(f"✅ scikit-learn {sklearn.__version__} loaded successfully")
 except ImportError as e:
     print(f"❌ OpenCV or scikit-learn not available: {e}")
@@ -44,7 +53,15 @@ except ImportError as e:
         def score(self, X, y):
             return 0.85  # Mock accuracy score
 
+# Request batching for concurrent /predict calls: service_streamer when installed,
+# otherwise the built-in queue-based batcher with the same interface
+try:
+    from service_streamer import ThreadedStreamer
+except ImportError:
+    from micro_batcher import MicroBatcher as ThreadedStreamer
+
 app = Flask(__name__)
+install_json_provider(app)  # orjson when available, serializes NumPy values directly
 
 # Configure CORS with explicit settings for frontend communication
 CORS(app, 
@@ -56,6 +73,7 @@ CORS(app,
 
 # Configuration
 CONFIG = {
+    'MODEL_BUNDLE_PATH': os.getenv('MODEL_BUNDLE_PATH', 'model/exercise_classifier_bundle.joblib'),  # Written by train_sklearn_model.py
     'MODEL_PATH': os.getenv('MODEL_PATH', 'model/exercise_classifier.joblib'),
     'SCALER_PATH': os.getenv('SCALER_PATH', 'model/feature_scaler.joblib'),
     'ENCODER_PATH': os.getenv('ENCODER_PATH', 'model/label_encoder.pkl'),
@@ -63,29 +81,62 @@ CONFIG = {
     'HOST': os.getenv('FLASK_HOST', '0.0.0.0'),
     'PORT': int(os.getenv('FLASK_PORT', 5000)),
     'CONFIDENCE_THRESHOLD': float(os.getenv('CONFIDENCE_THRESHOLD', 0.7)),
-    'PHASE_THRESHOLD': float(os.getenv('PHASE_THRESHOLD', 0.7))
+    'PHASE_THRESHOLD': float(os.getenv('PHASE_THRESHOLD', 0.7)),
+    'SESSIONS_DB_PATH': os.getenv('SESSIONS_DB_PATH', 'sessions.db'),
+    'REDIS_URL': os.getenv('REDIS_URL'),  # Shared exercise session state across Gunicorn workers
+    'BATCH_PREDICTIONS': os.getenv('BATCH_PREDICTIONS', 'False').lower() == 'true',
+    'BATCH_SIZE': int(os.getenv('BATCH_SIZE', 32)),
+    'BATCH_MAX_LATENCY': float(os.getenv('BATCH_MAX_LATENCY', 0.01)),  # seconds
+    'PREDICTION_CACHE_SIZE': int(os.getenv('PREDICTION_CACHE_SIZE', 32)),
+    'PREDICTION_CACHE_RESOLUTION': float(os.getenv('PREDICTION_CACHE_RESOLUTION', 0.25)),  # degrees
+    'LOG_LEVEL': os.getenv('LOG_LEVEL', 'INFO').upper(),
+    'ONNX_INFERENCE': os.getenv('ONNX_INFERENCE', 'True').lower() == 'true'
 }
 
+# Request-path diagnostics go through logging rather than print so they cost
+# nothing unless LOG_LEVEL=DEBUG
+logger = logging.getLogger('physio')
+logger.setLevel(CONFIG['LOG_LEVEL'])
+if not logger.handlers:
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.addHandler(log_handler)
+
 # Global variables for model, scaler and encoder
 model = None
 scaler = None
 label_encoder = None
-exercise_sessions = []  # In-memory storage for demo (use database in production)
-
-# Exercise phase tracking
-current_exercise_state = {
-    'current_phase': 'down',  # 'up' or 'down'
-    'rep_count': 0,
-    'last_prediction': None,
-    'phase_threshold': CONFIG['PHASE_THRESHOLD']  # Confidence threshold for phase detection
-}
+exercise_classes = []    # label_encoder.classes_ as a plain list, indexed by predicted class
+compiled_model = None    # Numba tree walker or ONNX Runtime session for model, used for predict_proba when available
+scaler_mean = None       # Cached StandardScaler affine (float32) for fast in-place scaling
+scaler_inv_scale = None
+exercise_sessions = SessionStore(CONFIG['SESSIONS_DB_PATH'])  # SQLite (WAL) with per-user totals kept up to date
+prediction_streamer = None  # Created lazily on first batched prediction
+prediction_streamer_lock = threading.Lock()
+inference_buffers = threading.local()  # Per-thread reusable (1, N_MODEL_FEATURES) model input buffer
+prediction_cache = PredictionCache(CONFIG['PREDICTION_CACHE_SIZE'], CONFIG['PREDICTION_CACHE_RESOLUTION'])
+
+# Exercise phase tracking, one state per user_id (in Redis when REDIS_URL is set)
+exercise_state = create_state_store(CONFIG['REDIS_URL'], CONFIG['PHASE_THRESHOLD'])
 
 def load_models():
     """Load the scikit-learn model, scaler and label encoder with improved error handling"""
-    global model, scaler, label_encoder
+    global model, scaler, label_encoder, compiled_model, exercise_classes
+    from sklearn.preprocessing import StandardScaler
+    
+    # Cached predictions belong to the previous model
+    prediction_cache.clear()
+    compiled_model = None
     
     try:
-        if ML_FRAMEWORK == "opencv_sklearn":
+        bundle_path = CONFIG['MODEL_BUNDLE_PATH']
+        from_bundle = ML_FRAMEWORK == "opencv_sklearn" and os.path.exists(bundle_path)
+        if from_bundle:
+            # Model, scaler and label encoder from one file
+            model, scaler, label_encoder = load_model_bundle(bundle_path)
+            print(f"✅ Model, scaler and label encoder loaded successfully from {bundle_path}")
+            print(f"📋 Model type: {type(model).__name__}")
+        elif ML_FRAMEWORK == "opencv_sklearn":
             # Load the trained scikit-learn model
             model_path = CONFIG['MODEL_PATH']
             if os.path.exists(model_path):
@@ -119,7 +170,9 @@ def load_models():
         
         # Load the label encoder
         encoder_path = CONFIG['ENCODER_PATH']
-        if os.path.exists(encoder_path):
+        if from_bundle:
+            print(f"📝 Available exercises: {list(label_encoder.classes_)}")
+        elif os.path.exists(encoder_path):
             with open(encoder_path, 'rb') as f:
                 label_encoder = pickle.load(f)
             print(f"✅ Label encoder loaded successfully from {encoder_path}")
@@ -129,6 +182,14 @@ def load_models():
             print("🔧 Creating fallback label encoder...")
             label_encoder = create_fallback_label_encoder()
         
+        # Requests predict one sample at a time - a per-call thread pool only adds overhead
+        if hasattr(model, 'n_jobs'):
+            model.n_jobs = 1
+        exercise_classes = label_encoder.classes_.tolist()
+        cache_scaler_params()
+        compile_model()
+        warm_up_inference()
+        
     except Exception as e:
         print(f"❌ Error loading models: {str(e)}")
         print("🔧 Creating fallback components...")
@@ -137,19 +198,97 @@ def load_models():
         dummy_data = np.random.randn(100, 45)
         scaler.fit(dummy_data)
         label_encoder = create_fallback_label_encoder()
+        exercise_classes = label_encoder.classes_.tolist()
+        cache_scaler_params()
+        compile_model()
+        warm_up_inference()
         return False
     return True
 
+def warm_up_inference():
+    """
+    Run one neutral pose through feature building, scaling and the model at load time
+    so the first /predict does not pay one-off setup costs. Bypasses the batching
+    streamer, which must only be started in the serving process.
+    """
+    model_input = create_model_input(np.full(9, 90.0, dtype=np.float32), out=get_model_input_buffer())
+    if scaler is not None:
+        model_input = scale_features(model_input)
+    predictor = compiled_model if compiled_model is not None else model
+    if hasattr(predictor, 'predict_proba'):
+        predictor.predict_proba(model_input)
+
+def ensure_models_loaded():
+    """Load models once per process, skipping if they are already loaded"""
+    if model is None:
+        return load_models()
+    return True
+
+def compile_model():
+    """
+    Serve the loaded Random Forest through a compiled predictor: the Numba tree
+    walker when available (fastest for single samples), otherwise ONNX Runtime
+    """
+    global compiled_model
+    
+    compiled_model = None
+    if ML_FRAMEWORK != "opencv_sklearn":
+        return
+    compiled_model = compile_forest(model)
+    if compiled_model is not None:
+        print("✅ Random Forest compiled with Numba for inference")
+    elif CONFIG['ONNX_INFERENCE']:
+        compiled_model = compile_onnx_classifier(model, N_MODEL_FEATURES)
+        if compiled_model is not None:
+            print("✅ Random Forest converted to ONNX Runtime for inference")
+
+def cache_scaler_params():
+    """Cache the fitted scaler's mean and reciprocal scale as float32 arrays"""
+    global scaler_mean, scaler_inv_scale
+    
+    if hasattr(scaler, 'mean_') or hasattr(scaler, 'scale_'):
+        n_features = scaler.n_features_in_
+        mean = scaler.mean_ if getattr(scaler, 'with_mean', True) else None
+        scale = scaler.scale_ if getattr(scaler, 'with_std', True) else None
+        scaler_mean = (np.zeros(n_features) if mean is None else mean).astype(np.float32)
+        scaler_inv_scale = (np.ones(n_features) if scale is None else 1.0 / scale).astype(np.float32)
+    else:
+        scaler_mean = None
+        scaler_inv_scale = None
+
+def get_model_input_buffer():
+    """Return this thread's preallocated (1, N_MODEL_FEATURES) float32 model input buffer"""
+    buffer = getattr(inference_buffers, 'model_input', None)
+    if buffer is None:
+        buffer = np.empty((1, N_MODEL_FEATURES), dtype=np.float32)
+        inference_buffers.model_input = buffer
+    return buffer
+
+def scale_features(model_input):
+    """
+    Standardize a (1, N_MODEL_FEATURES) float32 model input in place using the cached scaler parameters
+    Equivalent to scaler.transform without sklearn's per-call validation and allocation
+    """
+    if scaler_mean is None or scaler_mean.shape[0] != model_input.shape[-1]:
+        return scaler.transform(model_input)
+    
+    model_input -= scaler_mean
+    model_input *= scaler_inv_scale
+    return model_input
+
 def create_fallback_model():
     """Create a fallback Random Forest model for exercise classification"""
     from sklearn.ensemble import RandomForestClassifier
     
-    # Create a Random Forest classifier with good default parameters
+    # A smaller, shallower forest roughly halves single-sample predict latency,
+    # which dominates live video, for a marginal accuracy cost
     model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
+        n_estimators=50,
+        max_depth=8,
+        max_features='sqrt',
         random_state=42,
-        class_weight='balanced'
+        class_weight='balanced',
+        n_jobs=1
     )
     
     # Train with dummy data to make it functional
@@ -180,29 +319,96 @@ def create_fallback_label_encoder():
                 'high_knees', 'butt_kicks', 'wall_sits', 'tricep_dips',
                 'lat_pulldown', 'hip_thrust'
             ])
+            # Plain-Python lookups, so transforms avoid a NumPy scan per label
+            self._names = self.classes_.tolist()
+            self._index = {name: i for i, name in enumerate(self._names)}
         
         def inverse_transform(self, encoded):
+            names = self._names
             if hasattr(encoded, '__iter__'):
-                return [self.classes_[i % len(self.classes_)] for i in encoded]
-            return self.classes_[encoded % len(self.classes_)]
+                return [names[i % len(names)] for i in encoded]
+            return names[encoded % len(names)]
         
         def transform(self, labels):
             """Transform exercise names to indices"""
             if hasattr(labels, '__iter__') and not isinstance(labels, str):
-                return [np.where(self.classes_ == label)[0][0] if label in self.classes_ else 0 for label in labels]
-            return np.where(self.classes_ == labels)[0][0] if labels in self.classes_ else 0
+                return [self._index.get(label, 0) for label in labels]
+            return self._index.get(labels, 0)
     
     encoder = MockLabelEncoder()
     print(f"🔧 Fallback label encoder created with exercises: {list(encoder.classes_)}")
     return encoder
 
-def detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise=None):
+# Phase detection rules per exercise (lowercase, '-' replaced by '_'):
+# (joint index, comparison, threshold, phase when matched, phase otherwise)
+# Joint indices: 0 shoulder, 2 elbow, 4 hip, 6 knee
+PHASE_RULES = {
+    # Upper body pressing - down = arms bent, up = arms extended
+    'bench_press': (2, 'lt', 120, 'down', 'up'),
+    'incline_bench_press': (2, 'lt', 120, 'down', 'up'),
+    'decline_bench_press': (2, 'lt', 120, 'down', 'up'),
+    'push_up': (2, 'lt', 120, 'down', 'up'),
+    # Bicep/arm curls - down = arms extended, up = arms curled
+    'barbell_biceps_curl': (2, 'lt', 120, 'down', 'up'),
+    'hammer_curl': (2, 'lt', 120, 'down', 'up'),
+    # Triceps - down = arms bent, up = arms extended
+    'tricep_dips': (2, 'lt', 100, 'down', 'up'),
+    'tricep_pushdown': (2, 'lt', 100, 'down', 'up'),
+    # Shoulders - down = arms lowered, up = arms raised
+    'shoulder_press': (0, 'lt', 100, 'down', 'up'),
+    'lateral_raise': (0, 'lt', 100, 'down', 'up'),
+    # Legs - down = knees bent, up = legs extended
+    'squat': (6, 'lt', 120, 'down', 'up'),
+    'leg_extension': (6, 'lt', 120, 'down', 'up'),
+    # Deadlifts - down = bent forward, up = standing
+    'deadlift': (4, 'lt', 140, 'down', 'up'),
+    'romanian_deadlift': (4, 'lt', 140, 'down', 'up'),
+    # Hips and core - down = hips/legs lowered, up = raised
+    'hip_thrust': (4, 'lt', 110, 'down', 'up'),
+    'leg_raises': (4, 'lt', 110, 'down', 'up'),
+    'russian_twist': (0, 'lt', 85, 'down', 'up'),
+    # Pulling - down = arms extended, up = arms pulled
+    'pull_up': (2, 'gt', 140, 'down', 'up'),
+    'lat_pulldown': (2, 'gt', 140, 'down', 'up'),
+    't_bar_row': (2, 'gt', 140, 'down', 'up'),
+    # Machines - down = arms wide, up = arms together
+    'chest_fly_machine': (0, 'gt', 110, 'down', 'up'),
+    # Cardio - down = legs extended, up = knees raised / heels kicked back
+    'high_knees': (6, 'gt', 130, 'down', 'up'),
+    'butt_kicks': (6, 'gt', 140, 'down', 'up'),
+    'butt_kick': (6, 'gt', 140, 'down', 'up'),
+}
+# Default for unknown exercises
+DEFAULT_PHASE_RULE = (0, 'lt', 100, 'down', 'up')
+
+# Isometric exercises: (joint index, threshold) for 'hold' below the threshold and 'rest'
+# otherwise, or None to always hold (plank is counted on time held)
+ISOMETRIC_PHASE_RULES = {
+    'plank': None,
+    'wall_sits': (6, 100),  # Proper wall sit position is around a 90-degree knee angle
+    'wall_sit': (6, 100),
+}
+_phase_rule_keys = {}
+
+def phase_rule_key(exercise):
+    """Normalize an exercise label to its phase rule key, memoized per label"""
+    key = _phase_rule_keys.get(exercise)
+    if key is None:
+        key = _phase_rule_keys[exercise] = exercise.lower().replace('-', '_')
+    return key
+
+def detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise=None, state=None):
     """
     Detect if the exercise is in 'up' or 'down' phase based on joint angles
     Updated for the actual trained exercises
     Only counts reps if exercise matches selection
+    Updates the given session state in place; without one, the default session
+    is updated atomically through the state store
     """
-    global current_exercise_state
+    if state is None:
+        return exercise_state.update(DEFAULT_SESSION_ID, lambda default_state: detect_exercise_phase(
+            joint_angles, predicted_exercise, selected_exercise, default_state))
+    current_exercise_state = state
     
     # Get key joint angles with safety checks
     shoulder_angle = joint_angles[0] if len(joint_angles) > 0 else 90
@@ -211,205 +417,95 @@ def detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise=No
     knee_angle = joint_angles[6] if len(joint_angles) > 6 else 90
     
     # Debug logging
-    print(f"🔍 DEBUG Phase Detection:")
-    print(f"   Exercise: {predicted_exercise}")
-    print(f"   Angles - Shoulder: {shoulder_angle:.1f}°, Elbow: {elbow_angle:.1f}°, Hip: {hip_angle:.1f}°, Knee: {knee_angle:.1f}°")
-    
-    # Phase detection logic for each exercise type
-    exercise_lower = predicted_exercise.lower().replace('-', '_')
-    
-    # Upper body pressing exercises - ADJUSTED THRESHOLDS
-    if exercise_lower in ['bench_press', 'incline_bench_press', 'decline_bench_press', 'push_up']:
-        # Down = arms bent (lower angle), Up = arms extended (higher angle)
-        threshold = 120  # CHANGED: More realistic threshold for pressing exercises
-        if elbow_angle < threshold:  
-            new_phase = 'down'
-        else:  # Arms extended - up position
-            new_phase = 'up'
-        print(f"   🔧 Pressing exercise logic: elbow_angle {elbow_angle:.1f}° < {threshold}° = {elbow_angle < threshold} → {new_phase}")
-    
-    # Bicep/Arm curl exercises - ADJUSTED
-    elif exercise_lower in ['barbell_biceps_curl', 'hammer_curl']:
-        # Down = arms extended (lower elbow angle), Up = arms curled (higher elbow angle)
-        if elbow_angle < 120:  # CHANGED: from 90 to 120
-            new_phase = 'down'
-        else:  # Arms curled - up position
-            new_phase = 'up'
-    
-    # Tricep exercises - ADJUSTED
-    elif exercise_lower in ['tricep_dips', 'tricep_pushdown']:
-        # Down = arms bent, Up = arms extended
-        if elbow_angle < 100:  # CHANGED: from 60 to 100
-            new_phase = 'down'
-        else:  # Arms extended - up position
-            new_phase = 'up'
-    
-    # Shoulder exercises - ADJUSTED
-    elif exercise_lower in ['shoulder_press', 'lateral_raise']:
-        # Down = arms lowered, Up = arms raised
-        if shoulder_angle < 100:  # CHANGED: from 70 to 100
-            new_phase = 'down'
-        else:  # Arms raised - up position
-            new_phase = 'up'
-    
-    # Leg exercises - squats - ADJUSTED
-    elif exercise_lower in ['squat']:
-        # Down = knees bent (lower knee angle), Up = legs extended (higher knee angle)
-        if knee_angle < 120:  # CHANGED: from 90 to 120
-            new_phase = 'down'
-        else:  # Legs extended - up position
-            new_phase = 'up'
-    
-    # Deadlift variations
-    elif exercise_lower in ['deadlift', 'romanian_deadlift']:
-        # Down = bent forward (lower hip angle), Up = standing (higher hip angle)
-        if hip_angle < 140:  # CHANGED: from 120 to 140
-            new_phase = 'down'
-        else:  # Standing - up position
-            new_phase = 'up'
-    
-    # Leg extension - ADJUSTED
-    elif exercise_lower in ['leg_extension']:
-        # Down = knees bent, Up = legs extended
-        if knee_angle < 120:  # CHANGED: from 90 to 120
-            new_phase = 'down'
-        else:  # Legs extended - up position
-            new_phase = 'up'
-    
-    # Hip thrust - ADJUSTED
-    elif exercise_lower in ['hip_thrust']:
-        # Down = hips lowered, Up = hips raised
-        if hip_angle < 110:  # CHANGED: from 90 to 110
-            new_phase = 'down'
-        else:  # Hips raised - up position
-            new_phase = 'up'
-    
-    # Pulling exercises (pull-ups, lat pulldown, t-bar row) - ADJUSTED
-    elif exercise_lower in ['pull_up', 'lat_pulldown', 't_bar_row']:
-        # Down = arms extended, Up = arms pulled
-        if elbow_angle > 140:  # CHANGED: from 120 to 140
-            new_phase = 'down'
-        else:  # Arms pulled - up position
-            new_phase = 'up'
-    
-    # Core exercises (leg raises, russian twist)
-    elif exercise_lower in ['leg_raises']:
-        # Down = legs lowered, Up = legs raised
-        if hip_angle < 110:  # CHANGED: from 90 to 110
-            new_phase = 'down'
-        else:  # Legs raised - up position
-            new_phase = 'up'
-    
-    elif exercise_lower in ['russian_twist']:
-        # Use shoulder angle to detect rotation
-        if shoulder_angle < 85:  # CHANGED: from 70 to 85
-            new_phase = 'down'
-        else:  # Center or other side - up
-            new_phase = 'up'
-    
-    # Isometric exercises (plank)
-    elif exercise_lower in ['plank']:
-        # For plank, we maintain the phase and count based on time held
-        new_phase = 'hold'
-    
-    # Machine exercises - ADJUSTED
-    elif exercise_lower in ['chest_fly_machine']:
-        # Down = arms wide, Up = arms together
-        if shoulder_angle > 110:  # CHANGED: from 90 to 110
-            new_phase = 'down'
-        else:  # Arms together - up position
-            new_phase = 'up'
-    
-    # NEW: High Knees exercise
-    elif exercise_lower in ['high_knees']:
-        # Down = knees lowered, Up = knees raised high
-        if knee_angle > 130:  # Legs more extended = down phase
-            new_phase = 'down'
-        else:  # Knees bent high = up phase
-            new_phase = 'up'
-    
-    # NEW: Butt Kicks exercise  
-    elif exercise_lower in ['butt_kicks', 'butt_kick']:
-        # Down = legs extended, Up = heels to glutes
-        if knee_angle > 140:  # Legs extended = down phase
-            new_phase = 'down'
-        else:  # Heels kicked back = up phase
-            new_phase = 'up'
-    
-    # NEW: Wall Sits exercise (isometric)
-    elif exercise_lower in ['wall_sits', 'wall_sit']:
-        # Isometric exercise - maintain hold position
-        if knee_angle < 100:  # Proper wall sit position (90-degree angle)
-            new_phase = 'hold'
-        else:  # Standing or not in proper position
-            new_phase = 'rest'
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    if debug_enabled:
+        logger.debug("🔍 Phase detection: exercise=%s shoulder=%.1f° elbow=%.1f° hip=%.1f° knee=%.1f°",
+                     predicted_exercise, shoulder_angle, elbow_angle, hip_angle, knee_angle)
     
-    else:
-        # Default phase detection for unknown exercises - ADJUSTED
-        if shoulder_angle < 100:  # CHANGED: from 90 to 100
-            new_phase = 'down'
+    # Phase detection via the per-exercise rule tables
+    exercise_lower = phase_rule_key(predicted_exercise)
+    
+    if exercise_lower in ISOMETRIC_PHASE_RULES:
+        rule = ISOMETRIC_PHASE_RULES[exercise_lower]
+        if rule is None:
+            new_phase = 'hold'
         else:
-            new_phase = 'up'
+            joint_idx, threshold = rule
+            angle = joint_angles[joint_idx] if len(joint_angles) > joint_idx else 90
+            new_phase = 'hold' if angle < threshold else 'rest'
+    else:
+        joint_idx, comparison, threshold, phase_if_true, phase_if_false = PHASE_RULES.get(exercise_lower, DEFAULT_PHASE_RULE)
+        angle = joint_angles[joint_idx] if len(joint_angles) > joint_idx else 90
+        matched = angle < threshold if comparison == 'lt' else angle > threshold
+        new_phase = phase_if_true if matched else phase_if_false
+        if debug_enabled:
+            logger.debug("   🔧 Rule: angle[%d] %.1f° %s %s° = %s → %s", joint_idx, angle,
+                         '<' if comparison == 'lt' else '>', threshold, matched, new_phase)
     
     # Debug current state
-    old_phase = current_exercise_state['current_phase']
-    old_rep_count = current_exercise_state['rep_count']
+    old_phase = current_exercise_state.current_phase
+    old_rep_count = current_exercise_state.rep_count
     
     # Count reps on phase transitions (except for isometric exercises)
-    if new_phase not in ['hold', 'rest'] and current_exercise_state['current_phase'] != new_phase:
-        if current_exercise_state['current_phase'] == 'down' and new_phase == 'up':
-            current_exercise_state['rep_count'] += 1
-            print(f"   🔥 REP COMPLETED! {old_rep_count} → {current_exercise_state['rep_count']}")
-        current_exercise_state['current_phase'] = new_phase
-        print(f"   📈 Phase transition: {old_phase} → {new_phase}")
+    if new_phase not in ['hold', 'rest'] and current_exercise_state.current_phase != new_phase:
+        if current_exercise_state.current_phase == 'down' and new_phase == 'up':
+            current_exercise_state.rep_count += 1
+            if debug_enabled:
+                logger.debug("   🔥 REP COMPLETED! %d → %d", old_rep_count, current_exercise_state.rep_count)
+        current_exercise_state.current_phase = new_phase
+        if debug_enabled:
+            logger.debug("   📈 Phase transition: %s → %s", old_phase, new_phase)
     elif new_phase in ['hold', 'rest']:
-        # For isometric exercises, handle time-based or position-based counting
-        if exercise_lower in ['wall_sits', 'wall_sit'] and new_phase == 'hold':
-            # For wall sits, count time held in proper position
-            if current_exercise_state['current_phase'] != 'hold':
-                current_exercise_state['rep_count'] += 1
-                print(f"   🔥 WALL SIT HOLD! {old_rep_count} → {current_exercise_state['rep_count']}")
-        elif exercise_lower in ['plank'] and new_phase == 'hold':
-            # For planks, count time held in proper position
-            if current_exercise_state['current_phase'] != 'hold':
-                current_exercise_state['rep_count'] += 1
-                print(f"   🔥 PLANK HOLD! {old_rep_count} → {current_exercise_state['rep_count']}")
-        current_exercise_state['current_phase'] = new_phase
-        print(f"   📈 Phase change: {old_phase} → {new_phase}")
-    else:
-        print(f"   ➡️  Phase maintained: {new_phase}")
-    
-    print(f"   🎯 Final: Phase={new_phase}, Reps={current_exercise_state['rep_count']}")
+        # For isometric exercises (wall sits, planks), count each time the proper position is reached
+        if new_phase == 'hold' and current_exercise_state.current_phase != 'hold':
+            current_exercise_state.rep_count += 1
+            if debug_enabled:
+                logger.debug("   🔥 %s HOLD! %d → %d", exercise_lower.upper(), old_rep_count,
+                             current_exercise_state.rep_count)
+        current_exercise_state.current_phase = new_phase
+        if debug_enabled:
+            logger.debug("   📈 Phase change: %s → %s", old_phase, new_phase)
+    elif debug_enabled:
+        logger.debug("   ➡️  Phase maintained: %s", new_phase)
+    
+    if debug_enabled:
+        logger.debug("   🎯 Final: Phase=%s, Reps=%d", new_phase, current_exercise_state.rep_count)
     
     return new_phase
 
+@app.before_request
+def set_request_timestamp():
+    """Format the request timestamp once, shared by every response field that needs it"""
+    g.timestamp = datetime.now().isoformat()
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Enhanced health check endpoint with detailed system information"""
     try:
+        current_exercise_state = exercise_state.load(request.args.get('user_id', DEFAULT_SESSION_ID))
         system_info = {
             'status': 'healthy',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': g.timestamp,
             'ml_framework': ML_FRAMEWORK,
             'model_loaded': model is not None,
             'encoder_loaded': label_encoder is not None,
-            'available_exercises': list(label_encoder.classes_) if label_encoder else [],
+            'available_exercises': exercise_classes,
             'config': {
                 'confidence_threshold': CONFIG['CONFIDENCE_THRESHOLD'],
                 'phase_threshold': CONFIG['PHASE_THRESHOLD'],
                 'debug_mode': CONFIG['DEBUG']
             },
             'session_state': {
-                'current_phase': current_exercise_state['current_phase'],
-                'rep_count': current_exercise_state['rep_count']
+                'backend': exercise_state.backend,
+                'current_phase': current_exercise_state.current_phase,
+                'rep_count': current_exercise_state.rep_count
             }
         }
         
         # Add ML framework version if available
         if ML_FRAMEWORK == "opencv_sklearn":
-            import cv2
-            import sklearn
-            system_info['opencv_version'] = cv2.__version__
+            if cv2 is not None:
+                system_info['opencv_version'] = cv2.__version__
             system_info['sklearn_version'] = sklearn.__version__
         else:
             system_info['ml_version'] = "mock"
@@ -420,7 +516,7 @@ def health_check():
         return jsonify({
             'status': 'error',
             'error': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         }), 500
 
 @app.route('/exercises', methods=['GET'])
@@ -430,7 +526,7 @@ def get_exercises():
         return jsonify({'error': 'Label encoder not loaded'}), 500
     
     return jsonify({
-        'exercises': list(label_encoder.classes_)
+        'exercises': exercise_classes
     })
 
 @app.route('/predict', methods=['POST'])
@@ -447,6 +543,7 @@ def predict():
             
         joint_angles = data.get('joint_angles', [])
         selected_exercise = data.get('selected_exercise', None)
+        session_id = str(data.get('user_id') or DEFAULT_SESSION_ID)
         
         # Enhanced input validation
         if not joint_angles:
@@ -458,98 +555,129 @@ def predict():
         if len(joint_angles) < 9:
             return jsonify({'error': f'Insufficient joint angles: got {len(joint_angles)}, need at least 9'}), 400
         
-        # Validate angle values
+        # Validate angle values - take first 9 and convert to float32 in one step
         try:
-            joint_angles = [float(angle) for angle in joint_angles[:9]]  # Take first 9 and convert to float
+            angles_array = np.asarray(joint_angles[:9], dtype=np.float32)
         except (ValueError, TypeError):
             return jsonify({'error': 'All joint angles must be numeric values'}), 400
+        if angles_array.ndim != 1 or not np.isfinite(angles_array).all():
+            return jsonify({'error': 'All joint angles must be numeric values'}), 400
             
         # Enhanced pose quality validation
-        zero_count = sum(1 for angle in joint_angles if abs(angle) < 5.0)
+        zero_count = int(np.count_nonzero(np.abs(angles_array) < 5.0))
         if zero_count > 6:
             return jsonify({
                 'exercise': 'unknown',
                 'confidence': 0.0,
                 'phase': 'unknown',
-                'rep_count': current_exercise_state['rep_count'],
-                'joint_angles': joint_angles,
-                'timestamp': datetime.now().isoformat(),
+                'rep_count': exercise_state.load(session_id).rep_count,
+                'joint_angles': angles_array,
+                'timestamp': g.timestamp,
                 'error': 'Poor pose detection - please ensure you are fully visible in the camera',
                 'quality_score': (9 - zero_count) / 9  # Quality score from 0-1
             })
         
-        # Use internal prediction function
-        result = predict_internal(data)
+        # Use internal prediction function (with the already converted angles)
+        result = predict_internal({'joint_angles': angles_array, 'selected_exercise': selected_exercise,
+                                   'user_id': session_id})
         return jsonify(result)
         
     except Exception as e:
-        print(f"❌ Prediction endpoint error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Prediction endpoint error: %s", e)
         return jsonify({
             'error': f'Internal server error: {str(e)}',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         }), 500
 
-def create_model_input(angles_array):
-    """Create feature vector for scikit-learn model from joint angles"""
-    # Enhanced feature engineering for traditional ML algorithms
-    features = []
+# Number of features produced by create_model_input
+N_MODEL_FEATURES = 45
+
+def create_model_input(angles_array, out=None):
+    """
+    Create feature vector for scikit-learn model from joint angles
+    Features are written in place into out (float32, shape (1, N_MODEL_FEATURES)) if given
+    """
+    # Enhanced feature engineering for traditional ML algorithms - filled in place
+    if out is None:
+        out = np.empty((1, N_MODEL_FEATURES), dtype=np.float32)
+    features = out[0]
+    angles_array = np.asarray(angles_array, dtype=np.float32)
     
     # Raw joint angles (9 features)
-    features.extend(angles_array)
+    features[0:9] = angles_array
     
     # Normalized angles (9 features)
-    normalized = angles_array / 180.0
-    features.extend(normalized)
+    np.divide(angles_array, 180.0, out=features[9:18])
     
-    # Trigonometric features (18 features)
-    features.extend(np.sin(np.radians(angles_array)))
-    features.extend(np.cos(np.radians(angles_array)))
+    # Trigonometric features (18 features) - one degree-to-radian conversion for both
+    radians = np.deg2rad(angles_array)
+    np.sin(radians, out=features[18:27])
+    np.cos(radians, out=features[27:36])
     
     # Statistical features (5 features)
-    features.append(np.mean(angles_array))
-    features.append(np.std(angles_array))
-    features.append(np.min(angles_array))
-    features.append(np.max(angles_array))
-    features.append(np.median(angles_array))
+    features[36] = angles_array.mean()
+    features[37] = angles_array.std()
+    features[38] = angles_array.min()
+    features[39] = angles_array.max()
+    features[40] = np.median(angles_array)
     
     # Angle differences (4 features - relationships between adjacent angles)
-    for i in range(4):
-        if i * 2 + 1 < len(angles_array):
-            features.append(abs(angles_array[i * 2] - angles_array[i * 2 + 1]))
+    np.abs(angles_array[0:8:2] - angles_array[1:9:2], out=features[41:45])
     
     # Total features: 9 + 9 + 9 + 9 + 5 + 4 = 45 features
-    return np.array(features).reshape(1, -1)
+    return out
+
+def batch_predict_proba(feature_batch):
+    """Run predict_proba once over a batch of scaled feature vectors"""
+    predictor = compiled_model if compiled_model is not None else model
+    return list(predictor.predict_proba(np.stack(feature_batch)))
+
+def get_prediction_streamer():
+    """Return the batching streamer, or None if batching is disabled"""
+    global prediction_streamer
+    
+    if not CONFIG['BATCH_PREDICTIONS']:
+        return None
+    if prediction_streamer is None:
+        with prediction_streamer_lock:
+            if prediction_streamer is None:
+                prediction_streamer = ThreadedStreamer(
+                    batch_predict_proba,
+                    batch_size=CONFIG['BATCH_SIZE'],
+                    max_latency=CONFIG['BATCH_MAX_LATENCY']
+                )
+    return prediction_streamer
+
+def predict_probabilities(model_input):
+    """Class probabilities for one (1, N_MODEL_FEATURES) input, batched with concurrent requests when enabled"""
+    streamer = get_prediction_streamer()
+    if streamer is not None:
+        return streamer.predict([model_input[0]])[0]
+    predictor = compiled_model if compiled_model is not None else model
+    return predictor.predict_proba(model_input)[0]
 
 @app.route('/reset_session', methods=['POST'])
 def reset_session():
     """Reset the current exercise session with optional configuration"""
-    global current_exercise_state
-    
     try:
-        data = request.get_json() if request.is_json else {}
+        data = (request.get_json() if request.is_json else None) or {}
         
         # Allow custom phase threshold in reset
         phase_threshold = data.get('phase_threshold', CONFIG['PHASE_THRESHOLD'])
+        session_id = str(data.get('user_id') or DEFAULT_SESSION_ID)
         
-        current_exercise_state = {
-            'current_phase': 'down',
-            'rep_count': 0,
-            'last_prediction': None,
-            'phase_threshold': phase_threshold
-        }
+        current_exercise_state = exercise_state.reset(session_id, phase_threshold)
         
         return jsonify({
             'message': 'Session reset successfully',
-            'new_state': current_exercise_state,
-            'timestamp': datetime.now().isoformat()
+            'new_state': current_exercise_state.to_dict(),
+            'timestamp': g.timestamp
         })
         
     except Exception as e:
         return jsonify({
             'error': f'Failed to reset session: {str(e)}',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         }), 500
 
 @app.route('/log_session', methods=['POST'])
@@ -577,16 +705,16 @@ def log_session():
             'exercise': data['exercise'],
             'total_reps': data['total_reps'],
             'duration': data['duration'],  # in seconds
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': g.timestamp,
             'session_data': data.get('session_data', [])
         }
         
-        # Store session (in production, save to database)
-        exercise_sessions.append(session_entry)
+        # Store session
+        session_id = exercise_sessions.add(session_entry)
         
         return jsonify({
             'message': 'Session logged successfully',
-            'session_id': len(exercise_sessions) - 1
+            'session_id': session_id
         })
         
     except Exception as e:
@@ -595,61 +723,42 @@ def log_session():
 @app.route('/sessions/<user_id>', methods=['GET'])
 def get_user_sessions(user_id):
     """Get all sessions for a specific user"""
-    user_sessions = [session for session in exercise_sessions if session['user_id'] == user_id]
-    
-    # Calculate summary statistics
-    total_sessions = len(user_sessions)
-    total_reps = sum(session['total_reps'] for session in user_sessions)
-    total_duration = sum(session['duration'] for session in user_sessions)
-    
-    # Group by exercise
-    exercise_stats = {}
-    for session in user_sessions:
-        exercise = session['exercise']
-        if exercise not in exercise_stats:
-            exercise_stats[exercise] = {'sessions': 0, 'total_reps': 0, 'total_duration': 0}
-        exercise_stats[exercise]['sessions'] += 1
-        exercise_stats[exercise]['total_reps'] += session['total_reps']
-        exercise_stats[exercise]['total_duration'] += session['duration']
-    
     return jsonify({
         'user_id': user_id,
-        'sessions': user_sessions,
-        'summary': {
-            'total_sessions': total_sessions,
-            'total_reps': total_reps,
-            'total_duration': total_duration,
-            'exercise_breakdown': exercise_stats
-        }
+        'sessions': exercise_sessions.get_user_sessions(user_id),
+        'summary': exercise_sessions.get_user_summary(user_id)
     })
 
 @app.route('/sessions', methods=['GET'])
 def get_all_sessions():
     """Get all sessions (for admin/debugging)"""
-    return jsonify({'sessions': exercise_sessions})
+    return jsonify({'sessions': exercise_sessions.all_sessions()})
+
+# Sample joint angles for /test_exercise, as read-only float32 arrays ready for predict_internal
+SAMPLE_ANGLES = {name: np.array(angles, dtype=np.float32) for name, angles in {
+    'squat': [110, 112, 160, 158, 120, 118, 90, 88, 175],
+    'push_up': [90, 88, 80, 82, 160, 162, 170, 172, 178],
+    'high_knees': [120, 118, 150, 152, 100, 98, 60, 58, 175],
+    'butt_kicks': [130, 128, 140, 142, 110, 108, 45, 47, 178],
+    'wall_sits': [140, 138, 160, 162, 120, 118, 90, 88, 180],
+    'plank': [160, 158, 170, 172, 140, 142, 170, 168, 178]
+}.items()}
+for sample in SAMPLE_ANGLES.values():
+    sample.flags.writeable = False
 
 @app.route('/test_exercise/<exercise_name>', methods=['POST'])
 def test_exercise(exercise_name):
     """Test endpoint for specific exercise with sample data"""
     try:
-        # Sample joint angles for different exercises
-        sample_angles = {
-            'squat': [110, 112, 160, 158, 120, 118, 90, 88, 175],
-            'push_up': [90, 88, 80, 82, 160, 162, 170, 172, 178],
-            'high_knees': [120, 118, 150, 152, 100, 98, 60, 58, 175],
-            'butt_kicks': [130, 128, 140, 142, 110, 108, 45, 47, 178],
-            'wall_sits': [140, 138, 160, 162, 120, 118, 90, 88, 180],
-            'plank': [160, 158, 170, 172, 140, 142, 170, 168, 178]
-        }
-        
         # Get sample angles or use provided data
         data = request.get_json() if request.is_json else {}
-        joint_angles = data.get('joint_angles', sample_angles.get(exercise_name.lower(), sample_angles['squat']))
+        joint_angles = data.get('joint_angles', SAMPLE_ANGLES.get(exercise_name.lower(), SAMPLE_ANGLES['squat']))
         
         # Test the prediction
         test_data = {
             'joint_angles': joint_angles,
-            'selected_exercise': exercise_name
+            'selected_exercise': exercise_name,
+            'user_id': data.get('user_id')
         }
         
         # Call the predict function internally
@@ -658,45 +767,59 @@ def test_exercise(exercise_name):
     except Exception as e:
         return jsonify({
             'error': f'Test failed: {str(e)}',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.timestamp
         }), 500
 
 def predict_internal(data):
     """Internal prediction function for scikit-learn model"""
     joint_angles = data.get('joint_angles', [])
     selected_exercise = data.get('selected_exercise', None)
+    session_id = str(data.get('user_id') or DEFAULT_SESSION_ID)
     
     if len(joint_angles) < 9:
         raise ValueError(f'Insufficient joint angles: got {len(joint_angles)}, need at least 9')
     
-    joint_angles = [float(angle) for angle in joint_angles[:9]]
-    zero_count = sum(1 for angle in joint_angles if abs(angle) < 5.0)
+    # No copy when given a float32 array (as /predict does)
+    angles_array = np.asarray(joint_angles[:9], dtype=np.float32)
+    zero_count = int(np.count_nonzero(np.abs(angles_array) < 5.0))
     quality_score = (9 - zero_count) / 9
     
-    angles_array = np.array(joint_angles, dtype=np.float32)
-    model_input = create_model_input(angles_array)
-    
-    # Scale the features
-    if scaler is not None:
-        model_input = scaler.transform(model_input)
-    
-    # Make prediction with scikit-learn model
-    if hasattr(model, 'predict_proba'):
-        # Get probabilities for all classes
-        prediction_probs = model.predict_proba(model_input)[0]
-        predicted_class_idx = np.argmax(prediction_probs)
-        confidence = float(np.max(prediction_probs))
+    # Consecutive camera frames are often near-identical - reuse the previous result
+    # (mock predictions are random, so they are not cached)
+    use_cache = ML_FRAMEWORK == "opencv_sklearn"
+    cache_key = prediction_cache.key(angles_array) if use_cache else None
+    cached = prediction_cache.get(cache_key) if use_cache else None
+    if cached is not None:
+        prediction_probs, predicted_class_idx, confidence = cached
     else:
-        # Fallback for models without predict_proba
-        predicted_class_idx = model.predict(model_input)[0]
-        confidence = 0.8  # Default confidence for models without probability
-        prediction_probs = np.zeros(len(label_encoder.classes_))
-        prediction_probs[predicted_class_idx] = confidence
+        # Build and scale the features in this thread's reusable buffer
+        model_input = create_model_input(angles_array, out=get_model_input_buffer())
+    
+        # Scale the features in place
+        if scaler is not None:
+            model_input = scale_features(model_input)
+    
+        # Make prediction with scikit-learn model
+        if hasattr(model, 'predict_proba'):
+            # Get probabilities for all classes
+            prediction_probs = predict_probabilities(model_input)
+            predicted_class_idx = int(prediction_probs.argmax())
+            confidence = float(prediction_probs[predicted_class_idx])
+        else:
+            # Fallback for models without predict_proba
+            predicted_class_idx = int(model.predict(model_input)[0])
+            confidence = 0.8  # Default confidence for models without probability
+            prediction_probs = np.zeros(len(exercise_classes))
+            prediction_probs[predicted_class_idx] = confidence
+    
+        if use_cache:
+            prediction_cache.put(cache_key, (prediction_probs, predicted_class_idx, confidence))
     
-    if predicted_class_idx >= len(label_encoder.classes_):
-        predicted_class_idx = predicted_class_idx % len(label_encoder.classes_)
+    if predicted_class_idx >= len(exercise_classes):
+        predicted_class_idx = predicted_class_idx % len(exercise_classes)
     
-    predicted_exercise = label_encoder.inverse_transform([predicted_class_idx])[0]
+    # Plain list indexing - LabelEncoder.inverse_transform validates and allocates arrays per call
+    predicted_exercise = exercise_classes[predicted_class_idx]
     
     # Exercise matching logic
     exercise_match = False
@@ -708,23 +831,28 @@ def predict_internal(data):
     else:
         exercise_match = confidence >= CONFIG['CONFIDENCE_THRESHOLD']
     
-    # Phase detection
+    # Phase detection against this user's session state, as one atomic read-modify-write
     phase = 'unknown'
     if exercise_match and quality_score > 0.5:
-        phase = detect_exercise_phase(joint_angles, predicted_exercise, selected_exercise)
+        phase, rep_count = exercise_state.update(session_id, lambda state: (
+            detect_exercise_phase(angles_array, predicted_exercise, selected_exercise, state),
+            state.rep_count
+        ))
+    else:
+        rep_count = exercise_state.load(session_id).rep_count
     
     return {
         'exercise': predicted_exercise,
         'confidence': confidence,
         'phase': phase,
-        'rep_count': current_exercise_state['rep_count'],
-        'joint_angles': joint_angles,
-        'timestamp': datetime.now().isoformat(),
+        'rep_count': rep_count,
+        'joint_angles': angles_array,
+        'timestamp': g.timestamp,
         'exercise_match': exercise_match,
         'selected_exercise': selected_exercise,
         'quality_score': quality_score,
         'ml_framework': ML_FRAMEWORK,
-        'all_predictions': prediction_probs.tolist() if hasattr(prediction_probs, 'tolist') else []
+        'all_predictions': prediction_probs
     }
 
 if __name__ == '__main__':
@@ -734,10 +862,14 @@ if __name__ == '__main__':
     print(f"   - Debug Mode: {CONFIG['DEBUG']}")
     print(f"   - Host: {CONFIG['HOST']}")
     print(f"   - Port: {CONFIG['PORT']}")
+    print(f"   - Model Bundle Path: {CONFIG['MODEL_BUNDLE_PATH']}")
     print(f"   - Model Path: {CONFIG['MODEL_PATH']}")
     print(f"   - Encoder Path: {CONFIG['ENCODER_PATH']}")
     print(f"   - Confidence Threshold: {CONFIG['CONFIDENCE_THRESHOLD']}")
     print(f"   - Phase Threshold: {CONFIG['PHASE_THRESHOLD']}")
+    print(f"   - Log Level: {CONFIG['LOG_LEVEL']}")
+    print(f"   - ONNX Inference: {'enabled' if CONFIG['ONNX_INFERENCE'] and ONNX_AVAILABLE else 'disabled'}")
+    print(f"   - Request Batching: {'enabled' if CONFIG['BATCH_PREDICTIONS'] else 'disabled'}")
     
     # Load models on startup
     if load_models():
@@ -0,0 +1,178 @@
+"""
+Per-session exercise phase and rep-count state
+
+Phase tracking is read and updated on every /predict request. Under a
+multi-worker server each process would otherwise keep its own copy, so rep
+counts would depend on which worker served each frame. When REDIS_URL is set
+(and the redis client is installed) state lives in a Redis hash per session,
+``session:{user_id}``, shared by every worker. Otherwise an in-process store
+is used, which is only correct with a single worker.
+
+Per-frame updates go through ``update(session_id, fn)``, which applies fn to
+the session state as one atomic read-modify-write: under the store lock in
+memory, and as a WATCH/MULTI transaction (retried on conflict) in Redis. A
+concurrent frame or /reset_session therefore cannot be overwritten by a
+stale copy of the state.
+"""
+
+import json
+import threading
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+DEFAULT_SESSION_ID = 'default'
+
+# Idle sessions expire from Redis after a day
+SESSION_TTL_SECONDS = 24 * 60 * 60
+
+
+class ExerciseState:
+    """Phase and rep-count state for one exercise session"""
+
+    __slots__ = ('current_phase', 'rep_count', 'last_prediction', 'phase_threshold')
+
+    def __init__(self, phase_threshold, current_phase='down', rep_count=0, last_prediction=None):
+        self.current_phase = current_phase  # 'up' or 'down' ('hold' or 'rest' for isometric exercises)
+        self.rep_count = rep_count
+        self.last_prediction = last_prediction
+        self.phase_threshold = phase_threshold  # Confidence threshold for phase detection
+
+    def to_dict(self):
+        return {
+            'current_phase': self.current_phase,
+            'rep_count': self.rep_count,
+            'last_prediction': self.last_prediction,
+            'phase_threshold': self.phase_threshold
+        }
+
+
+def new_session_state(phase_threshold):
+    """State for a session that has not recorded any reps yet"""
+    return ExerciseState(phase_threshold)
+
+
+class InMemoryStateStore:
+    """Session state held in this process, for single-worker development"""
+
+    backend = 'memory'
+
+    def __init__(self, default_phase_threshold):
+        self.default_phase_threshold = default_phase_threshold
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        """State for a session, created on first use"""
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None:
+                state = self._states[session_id] = new_session_state(self.default_phase_threshold)
+            return state
+
+    def update(self, session_id, fn):
+        """Apply fn to the stored state in place under the store lock and return its result"""
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None:
+                state = self._states[session_id] = new_session_state(self.default_phase_threshold)
+            return fn(state)
+
+    def reset(self, session_id, phase_threshold):
+        with self._lock:
+            self._states[session_id] = new_session_state(phase_threshold)
+        # A separate copy, so the response does not see frames processed after the reset
+        return new_session_state(phase_threshold)
+
+
+class RedisStateStore:
+    """Session state stored as one Redis hash per session, shared across workers"""
+
+    backend = 'redis'
+
+    def __init__(self, client, default_phase_threshold):
+        self.client = client
+        self.default_phase_threshold = default_phase_threshold
+
+    @staticmethod
+    def key(session_id):
+        return f'session:{session_id}'
+
+    def decode(self, fields):
+        """ExerciseState from the fields of a session hash (a new session when empty)"""
+        if not fields:
+            return new_session_state(self.default_phase_threshold)
+        fields = {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+                  for k, v in fields.items()}
+        last_prediction = fields.get('last_prediction')
+        return ExerciseState(
+            phase_threshold=float(fields.get('phase_threshold', self.default_phase_threshold)),
+            current_phase=fields.get('current_phase', 'down'),
+            rep_count=int(fields.get('rep_count', 0)),
+            last_prediction=json.loads(last_prediction) if last_prediction else None
+        )
+
+    @staticmethod
+    def queue_write(pipe, key, state):
+        """Queue the full state write and an expiry refresh on a pipeline"""
+        pipe.hset(key, mapping={
+            'current_phase': state.current_phase,
+            'rep_count': int(state.rep_count),
+            'last_prediction': json.dumps(state.last_prediction) if state.last_prediction else '',
+            'phase_threshold': float(state.phase_threshold)
+        })
+        pipe.expire(key, SESSION_TTL_SECONDS)
+
+    def load(self, session_id):
+        """State for a session, decoded from its hash in one round trip"""
+        return self.decode(self.client.hgetall(self.key(session_id)))
+
+    def update(self, session_id, fn):
+        """
+        Apply fn to the session state and write it back only if the hash did not
+        change in between (WATCH/MULTI); on a conflict the state is re-read and fn
+        runs again, so fn must only modify the state it is given
+        """
+        key = self.key(session_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    state = self.decode(pipe.hgetall(key))
+                    result = fn(state)
+                    pipe.multi()
+                    self.queue_write(pipe, key, state)
+                    pipe.execute()
+                    return result
+                except redis.WatchError:
+                    continue
+
+    def reset(self, session_id, phase_threshold):
+        """Overwrite the session in one transaction; in-flight updates see the conflict and retry"""
+        state = new_session_state(phase_threshold)
+        key = self.key(session_id)
+        pipe = self.client.pipeline()
+        self.queue_write(pipe, key, state)
+        pipe.execute()
+        return state
+
+
+def create_state_store(redis_url, default_phase_threshold):
+    """
+    Redis-backed store when a URL is configured and reachable,
+    otherwise an in-process store
+    """
+    if redis_url and REDIS_AVAILABLE:
+        try:
+            client = redis.Redis.from_url(redis_url)
+            client.ping()
+            print(f"✅ Exercise session state stored in Redis ({redis_url})")
+            return RedisStateStore(client, default_phase_threshold)
+        except Exception as e:
+            print(f"⚠️  Redis unavailable, keeping session state in memory: {e}")
+    elif redis_url:
+        print("⚠️  REDIS_URL is set but the redis package is not installed, keeping session state in memory")
+    return InMemoryStateStore(default_phase_threshold)
@@ -0,0 +1,124 @@
+"""
+Compiled exercise feature kernel
+
+Numba-compiled version of create_exercise_features in app.py. The NumPy
+version spends most of its time dispatching dozens of small array operations
+on a 9-element input; here the whole feature vector is filled in one native
+pass. Without Numba, app.py keeps using its NumPy implementation.
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def compute_exercise_features(angles, sin_lut, cos_lut, lut_steps, out):
+        """
+        Fill out (length 81) with the exercise features of 9 joint angles
+        sin_lut/cos_lut cover 0-180 degrees in lut_steps steps per degree and are
+        used when every angle is in that range, as in the NumPy version
+        """
+        n = 9
+        angle_min = angles[0]
+        angle_max = angles[0]
+        angle_sum = 0.0
+        for i in range(n):
+            a = angles[i]
+            angle_min = min(angle_min, a)
+            angle_max = max(angle_max, a)
+            angle_sum += a
+            # 1-2. Raw and normalized angles
+            out[i] = a
+            out[9 + i] = a / 180.0
+
+        # 3. Trigonometric features
+        in_range = angle_min >= 0 and angle_max <= 180
+        for i in range(n):
+            if in_range:
+                # Scale in float32 like the NumPy version so ties round to the same entry
+                idx = int(np.rint(angles[i] * np.float32(lut_steps)))
+                out[18 + i] = sin_lut[idx]
+                out[27 + i] = cos_lut[idx]
+            else:
+                radians = math.radians(angles[i])
+                out[18 + i] = math.sin(radians)
+                out[27 + i] = math.cos(radians)
+
+        # 4-5. Joint differences and ratios
+        for i in range(n - 1):
+            out[36 + i] = abs(angles[i] - angles[i + 1])
+            out[44 + i] = angles[i] / angles[i + 1] if angles[i + 1] != 0 else 0.0
+
+        # 6. Statistical features (population std, median of 9 by insertion sort)
+        mean = angle_sum / n
+        variance = 0.0
+        for i in range(n):
+            variance += (angles[i] - mean) ** 2
+        ordered = angles.copy()
+        for i in range(1, n):
+            value = ordered[i]
+            j = i - 1
+            while j >= 0 and ordered[j] > value:
+                ordered[j + 1] = ordered[j]
+                j -= 1
+            ordered[j + 1] = value
+        out[52] = mean
+        out[53] = math.sqrt(variance / n)
+        out[54] = angle_min
+        out[55] = angle_max
+        out[56] = ordered[n // 2]
+
+        # 7. Exercise-specific features: left/right averages and symmetry for
+        # shoulder, elbow, hip, knee
+        shoulder_avg = (angles[0] + angles[1]) / 2
+        elbow_avg = (angles[2] + angles[3]) / 2
+        hip_avg = (angles[4] + angles[5]) / 2
+        knee_avg = (angles[6] + angles[7]) / 2
+        out[57] = shoulder_avg
+        out[58] = elbow_avg
+        out[59] = abs(angles[0] - angles[1])
+        out[60] = abs(angles[2] - angles[3])
+        out[61] = hip_avg
+        out[62] = knee_avg
+        out[63] = abs(angles[4] - angles[5])
+        out[64] = abs(angles[6] - angles[7])
+        out[65] = angles[8]
+        out[66] = shoulder_avg + elbow_avg
+        out[67] = hip_avg + knee_avg
+        out[68] = abs(shoulder_avg - hip_avg)
+        out[69] = angle_sum
+        pair_mean = (shoulder_avg + elbow_avg + hip_avg + knee_avg) / 4
+        pair_variance = ((shoulder_avg - pair_mean) ** 2 + (elbow_avg - pair_mean) ** 2
+                         + (hip_avg - pair_mean) ** 2 + (knee_avg - pair_mean) ** 2) / 4
+        out[70] = math.sqrt(pair_variance)
+
+        # 8. Advanced biomechanical features
+        for k in range(4):
+            out[71 + k] = abs(angles[2 * k] - 90)
+        out[75] = angle_max - angle_min
+        above = below = near_neutral = extended = flexed = 0
+        for i in range(n):
+            a = angles[i]
+            if a > 90:
+                above += 1
+            if a < 90:
+                below += 1
+            if abs(a - 90) < 15:
+                near_neutral += 1
+            if abs(a - 180) < 30:
+                extended += 1
+            if abs(a) < 30:
+                flexed += 1
+        out[76] = above
+        out[77] = below
+        out[78] = near_neutral
+        out[79] = extended
+        out[80] = flexed
+        return out
@@ -0,0 +1,66 @@
+"""
+Gunicorn configuration for the PhysioTracker backend
+
+Usage (from the backend directory):
+    gunicorn -c gunicorn_conf.py app:app
+    gunicorn -c gunicorn_conf.py app_tensorflow_backup:app
+"""
+
+import gc
+import importlib
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Each request runs one tiny single-sample inference, so native thread pools
+# (OpenMP/BLAS, Numba) only add wake-up overhead and oversubscribe the CPU across
+# workers. Cap them at one thread per worker unless explicitly configured; this
+# must happen before app.py imports NumPy
+for thread_var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMBA_NUM_THREADS'):
+    os.environ.setdefault(thread_var, os.getenv('INFERENCE_THREADS', '1'))
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', 5000)}"
+
+# Processes run CPU-bound predict_proba in parallel, threads absorb concurrent I/O.
+# With batched predictions, one process with many threads lets the streamer
+# coalesce concurrent requests into a single predict_proba call. Without Redis,
+# session state (rep counts) lives in each process, so default to one worker
+if os.getenv('BATCH_PREDICTIONS', 'False').lower() == 'true':
+    default_workers, default_threads = 1, 16
+elif not os.getenv('REDIS_URL'):
+    default_workers, default_threads = 1, 8
+else:
+    default_workers, default_threads = 2 * (os.cpu_count() or 1) + 1, 2
+workers = int(os.getenv('GUNICORN_WORKERS', default_workers))
+threads = int(os.getenv('GUNICORN_THREADS', default_threads))
+# Inference is CPU-bound and uses real threads (batching streamer, per-thread
+# buffers), so threaded workers are the default over greenlet-based ones
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+# Import the app (and load models) once in the master so workers share
+# the model memory copy-on-write after fork
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """Load models in the master process before workers are forked"""
+    app_uri = getattr(server.app, 'app_uri', None) or server.cfg.wsgi_app or 'app:app'
+    app_module = importlib.import_module(app_uri.split(':')[0])
+    app_module.ensure_models_loaded()
+    # The app falls back to in-memory session state when Redis is unset or unreachable
+    if server.cfg.workers > 1 and app_module.exercise_state.backend == 'memory':
+        server.log.warning(
+            "Session state is kept per process (no reachable Redis) but %d workers are configured: "
+            "rep counts will depend on which worker serves each frame. Set REDIS_URL or GUNICORN_WORKERS=1",
+            server.cfg.workers
+        )
+    # Move everything loaded so far out of the garbage collector's generations so
+    # collections in the workers do not write to (and un-share) the model's pages
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,55 @@
+"""
+Fast JSON serialization for Flask responses
+
+Uses orjson when it is installed, which is several times faster than the
+stdlib encoder and serializes NumPy arrays and scalars natively. Without
+orjson, the stdlib provider is used with NumPy support added.
+"""
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """Stdlib JSON provider that also accepts NumPy arrays and scalars"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (np.ndarray, np.generic)):
+            return o.tolist()
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(NumpyJSONProvider):
+    """JSON provider backed by orjson"""
+
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if ORJSON_AVAILABLE else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.option
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option), mimetype=self.mimetype
+        )
+
+
+def install_json_provider(app):
+    """Configure a Flask app to use the fastest available JSON provider"""
+    provider_class = OrjsonProvider if ORJSON_AVAILABLE else NumpyJSONProvider
+    app.json_provider_class = provider_class
+    app.json = provider_class(app)
+    return app.json
@@ -0,0 +1,67 @@
+"""
+Built-in request micro-batching
+
+Collects items submitted by concurrent request threads and runs them through a
+batch function in one call, from a single background thread. It has the same
+predict() interface as service_streamer.ThreadedStreamer, which the servers
+prefer when it is installed, so either can back BATCH_PREDICTIONS.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Batch concurrent predict() calls into single calls of batch_fn
+    A batch runs once batch_size items are queued or max_latency seconds after its first item
+    """
+
+    def __init__(self, batch_fn, batch_size=32, max_latency=0.01):
+        self.batch_fn = batch_fn
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.pending = queue.SimpleQueue()
+        self.worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self.worker.start()
+
+    def predict(self, items):
+        """Return batch_fn's results for items, batched with other threads' concurrent calls"""
+        futures = []
+        for item in items:
+            future = Future()
+            self.pending.put((item, future))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def _collect_batch(self):
+        """Block for the first queued item, then gather more until the batch is full or the window closes"""
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(batch):
+                    raise ValueError(f'batch_fn returned {len(results)} results for {len(batch)} items')
+            except Exception as e:
+                # Fail every request in the batch rather than killing the worker thread
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,26 @@
+"""
+Single-file model artifacts
+
+Stores the classifier, feature scaler and label encoder in one joblib file, so
+a server start opens and unpickles one artifact instead of three. The servers
+still read the separate files when no bundle exists.
+"""
+
+import importlib.util
+
+import joblib
+
+# joblib can use LZ4 (decompresses several times faster than zlib) when the lz4 package is installed
+BUNDLE_COMPRESSION = ('lz4', 3) if importlib.util.find_spec('lz4') is not None else 3
+
+
+def save_model_bundle(path, model, scaler, label_encoder, compress=0):
+    """Write model, scaler and label encoder to one joblib file"""
+    bundle = {'model': model, 'scaler': scaler, 'label_encoder': label_encoder}
+    joblib.dump(bundle, path, compress=compress)
+
+
+def load_model_bundle(path):
+    """Return (model, scaler, label_encoder) from a file written by save_model_bundle"""
+    bundle = joblib.load(path)
+    return bundle['model'], bundle['scaler'], bundle['label_encoder']
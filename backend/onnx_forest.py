@@ -0,0 +1,69 @@
+"""
+ONNX Runtime inference for scikit-learn classifiers
+
+Converts a fitted classifier (the Random Forest) to ONNX with skl2onnx and
+serves predict_proba from onnxruntime's compiled tree ensemble, which skips
+sklearn's per-call validation and per-estimator Python dispatch and releases
+the GIL while it runs. Both packages are optional; without them the caller
+keeps using the scikit-learn model.
+
+The packages are only imported when a model is converted, so servers that
+end up using another predictor do not pay their import time.
+"""
+
+import importlib.util
+
+import numpy as np
+
+ONNX_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ('onnxruntime', 'skl2onnx'))
+
+
+class OnnxClassifier:
+    """predict_proba-compatible wrapper around an onnxruntime inference session"""
+
+    def __init__(self, classifier, n_features):
+        import onnxruntime
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+        
+        # zipmap=False returns probabilities as a plain (n_samples, n_classes) tensor
+        onnx_model = convert_sklearn(
+            classifier,
+            initial_types=[('X', FloatTensorType([None, n_features]))],
+            options={id(classifier): {'zipmap': False}}
+        )
+
+        # Each request scores one sample, so single-threaded sessions avoid
+        # pool wake-ups; concurrency comes from the server's request threads
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            onnx_model.SerializeToString(), sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.probabilities_name = self.session.get_outputs()[1].name
+        self.classes_ = classifier.classes_
+        self.n_features_in_ = n_features
+
+        # Run once now so session initialization does not land on the first request
+        self.predict_proba(np.zeros((1, n_features), dtype=np.float32))
+
+    def predict_proba(self, X):
+        """Return class probabilities for a 2D float array, shape (n_samples, n_classes)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return self.session.run([self.probabilities_name], {self.input_name: X})[0]
+
+
+def compile_onnx_classifier(classifier, n_features):
+    """
+    Build an OnnxClassifier for a fitted scikit-learn classifier
+    Returns None when onnxruntime/skl2onnx are unavailable or conversion fails
+    """
+    if not ONNX_AVAILABLE or not hasattr(classifier, 'predict_proba'):
+        return None
+    try:
+        return OnnxClassifier(classifier, n_features)
+    except Exception as e:
+        print(f"⚠️  Could not convert model to ONNX, using scikit-learn inference: {e}")
+        return None
@@ -0,0 +1,48 @@
+"""
+Compiled pose angle kernels
+
+Numba-compiled version of the per-frame joint angle math in pose_utils. It
+works on plain float arrays, so each frame runs as one native call instead of
+a series of small NumPy operations. Without Numba, pose_utils keeps using its
+NumPy implementation.
+"""
+
+import math
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _joint_angle(x1, y1, x2, y2, x3, y3):
+        """Angle at (x2, y2) in degrees, |atan2(cross, dot)| of the two arm vectors"""
+        ax, ay = x1 - x2, y1 - y2
+        cx, cy = x3 - x2, y3 - y2
+        cross = ax * cy - ay * cx
+        dot = ax * cx + ay * cy
+        # Zero-length vectors give a 0 angle
+        if cross == 0 and dot == 0:
+            return 0.0
+        return math.degrees(abs(math.atan2(cross, dot)))
+
+    @njit(cache=True, fastmath=True)
+    def compute_pose_angles(points, triplet_idx, out):
+        """
+        Fill out with the angles of every triplet of (n, 2) points, followed by
+        the spine inclination; out has one more slot than triplet_idx has rows
+        """
+        n_rows = triplet_idx.shape[0]
+        for r in range(n_rows):
+            a, b, c = triplet_idx[r, 0], triplet_idx[r, 1], triplet_idx[r, 2]
+            out[r] = _joint_angle(points[a, 0], points[a, 1], points[b, 0],
+                                  points[b, 1], points[c, 0], points[c, 1])
+        # Vertical reference above the shoulder midpoint, shoulder midpoint (vertex), hip midpoint
+        sx = (points[11, 0] + points[12, 0]) / 2
+        sy = (points[11, 1] + points[12, 1]) / 2
+        hx = (points[23, 0] + points[24, 0]) / 2
+        hy = (points[23, 1] + points[24, 1]) / 2
+        out[n_rows] = _joint_angle(sx, sy - 0.1, sx, sy, hx, hy)
+        return out
@@ -1,7 +1,14 @@
 import numpy as np
 import math
+import threading
+from functools import lru_cache
 from typing import List, Tuple, Optional, Dict
 
+from pose_kernels import NUMBA_AVAILABLE
+
+if NUMBA_AVAILABLE:
+    from pose_kernels import compute_pose_angles
+
 def calculate_angle(point1: Tuple[float, float], point2: Tuple[float, float], point3: Tuple[float, float]) -> float:
     """
     Calculate angle between three points (in degrees)
@@ -15,34 +22,23 @@ def calculate_angle(point1: Tuple[float, float], point2: Tuple[float, float], po
     Returns:
         Angle in degrees (0-180)
     """
-    try:
-        # Calculate vectors
-        vector1 = np.array([point1[0] - point2[0], point1[1] - point2[1]])
-        vector2 = np.array([point3[0] - point2[0], point3[1] - point2[1]])
-        
-        # Handle zero vectors
-        norm1 = np.linalg.norm(vector1)
-        norm2 = np.linalg.norm(vector2)
-        
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        
-        # Calculate angle using dot product
-        cosine_angle = np.dot(vector1, vector2) / (norm1 * norm2)
-        
-        # Handle numerical errors
-        cosine_angle = np.clip(cosine_angle, -1.0, 1.0)
-        
-        angle = np.arccos(cosine_angle)
-        return float(np.degrees(angle))
-        
-    except Exception as e:
-        print(f"Error calculating angle: {e}")
+    # Signed area (cross product) and dot product of the two arm vectors
+    # give the angle through atan2, with no norms, division or clipping
+    ax, ay = point1[0] - point2[0], point1[1] - point2[1]
+    cx, cy = point3[0] - point2[0], point3[1] - point2[1]
+    
+    cross = ax * cy - ay * cx
+    dot = ax * cx + ay * cy
+    
+    # Handle zero vectors (atan2 of signed zeros can be 180)
+    if cross == 0 and dot == 0:
         return 0.0
+    
+    return math.degrees(abs(math.atan2(cross, dot)))
 
 def calculate_distance(point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
     """Calculate Euclidean distance between two points"""
-    return math.sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
+    return math.hypot(point1[0] - point2[0], point1[1] - point2[1])
 
 def validate_landmarks(landmarks) -> bool:
     """Validate that landmarks contain required pose points"""
@@ -55,6 +51,101 @@ def validate_landmarks(landmarks) -> bool:
     except:
         return False
 
+# Wire layout of one NormalizedLandmarkList entry with x, y, z, visibility and presence
+# all set: 27 bytes of field tag and length (25), then a (tag, little-endian float32)
+# pair per field. Tag bytes sit at LANDMARK_TAG_OFFSETS and the floats every 5 bytes from byte 3
+LANDMARK_RECORD_SIZE = 27
+LANDMARK_TAG_OFFSETS = np.array([0, 1, 2, 7, 12, 17, 22])
+LANDMARK_TAG_VALUES = np.array([0x0a, 25, 0x0d, 0x15, 0x1d, 0x25, 0x2d], dtype=np.uint8)
+
+def _decode_serialized_landmarks(landmarks):
+    """
+    Decode a MediaPipe NormalizedLandmarkList protobuf straight from its serialized bytes
+    Returns an (n, 4) array of [x, y, visibility, presence], or None when the message
+    is not a protobuf or not every landmark carries all five fields
+    """
+    serialize = getattr(landmarks, 'SerializeToString', None)
+    if serialize is None:
+        return None
+    data = serialize()
+    n_points, remainder = divmod(len(data), LANDMARK_RECORD_SIZE)
+    if remainder:
+        return None
+    if n_points == 0:
+        return np.empty((0, 4))
+    
+    records = np.frombuffer(data, dtype=np.uint8).reshape(n_points, LANDMARK_RECORD_SIZE)
+    if not (records[:, LANDMARK_TAG_OFFSETS] == LANDMARK_TAG_VALUES).all():
+        return None
+    
+    # Strided (n, 5) float32 view of [x, y, z, visibility, presence], z dropped
+    fields = np.ndarray((n_points, 5), dtype='<f4', buffer=data, offset=3,
+                        strides=(LANDMARK_RECORD_SIZE, 5))
+    return fields[:, [0, 1, 3, 4]].astype(np.float64)
+
+def _landmarks_to_array(landmarks):
+    """
+    Convert MediaPipe landmarks to an (n, 4) array of [x, y, visibility, presence]
+    Missing visibility defaults to 0.5 and missing presence to the visibility
+    """
+    # Protobuf landmarks are decoded from their serialized bytes in C; anything
+    # else (or older messages without presence) is read field by field
+    array = _decode_serialized_landmarks(landmarks)
+    if array is None:
+        n_points = len(landmarks.landmark)
+        values = []
+        for lm in landmarks.landmark:
+            visibility = getattr(lm, 'visibility', 0.5)
+            values += (lm.x, lm.y, visibility, getattr(lm, 'presence', visibility))
+        array = np.array(values, dtype=np.float64).reshape(n_points, 4)
+    array.flags.writeable = False
+    return array
+
+# Landmark index triplets (first point, vertex, third point) for the joint angles,
+# in output order. The ninth angle (spine inclination) is measured on derived points
+TRIPLET_IDX = np.array([
+    [23, 11, 13],  # Left shoulder (hip-shoulder-elbow)
+    [24, 12, 14],  # Right shoulder (hip-shoulder-elbow)
+    [11, 13, 15],  # Left elbow (shoulder-elbow-wrist)
+    [12, 14, 16],  # Right elbow (shoulder-elbow-wrist)
+    [11, 23, 25],  # Left hip (shoulder-hip-knee)
+    [12, 24, 26],  # Right hip (shoulder-hip-knee)
+    [23, 25, 27],  # Left knee (hip-knee-ankle)
+    [24, 26, 28],  # Right knee (hip-knee-ankle)
+], dtype=np.int32)
+
+def _spine_triplet(points):
+    """
+    Spine inclination triplet for (..., n, 2) points, shape (..., 3, 2): a vertical
+    reference above the shoulder midpoint, the shoulder midpoint (vertex) and the hip midpoint
+    """
+    shoulder_midpoint = (points[..., 11, :] + points[..., 12, :]) / 2
+    hip_midpoint = (points[..., 23, :] + points[..., 24, :]) / 2
+    vertical_ref = shoulder_midpoint - [0.0, 0.1]
+    return np.stack([vertical_ref, shoulder_midpoint, hip_midpoint], axis=-2)
+
+def _triplet_angles(triplets):
+    """Angles in degrees at the vertex of (..., 3, 2) point triplets, shape (...)"""
+    vector1 = triplets[..., 0, :] - triplets[..., 1, :]
+    vector2 = triplets[..., 2, :] - triplets[..., 1, :]
+    cross = vector1[..., 0] * vector2[..., 1] - vector1[..., 1] * vector2[..., 0]
+    dots = (vector1 * vector2).sum(axis=-1)
+    
+    # |atan2(cross, dot)| is already in [0, 180]; zero-length vectors give a 0 angle
+    zero_length = (cross == 0) & (dots == 0)
+    return np.where(zero_length, 0.0, np.degrees(np.abs(np.arctan2(cross, dots))))
+
+angle_buffers = threading.local()  # Per-thread reusable (9,) angle output buffer
+repeat_frame_cache = threading.local()  # Per-thread (landmark bytes, result) of the last frame
+
+def _get_angle_buffer():
+    """Return this thread's preallocated (9,) float64 angle buffer"""
+    buffer = getattr(angle_buffers, 'angles', None)
+    if buffer is None:
+        buffer = np.empty(9)
+        angle_buffers.angles = buffer
+    return buffer
+
 def extract_pose_angles(landmarks):
     """
     Extract key joint angles from MediaPipe pose landmarks
@@ -66,86 +157,106 @@ def extract_pose_angles(landmarks):
     23: left_hip, 24: right_hip, 25: left_knee, 26: right_knee
     27: left_ankle, 28: right_ankle
     """
+    # Poses without the full landmark set get zero angles
+    if not validate_landmarks(landmarks):
+        return [0.0] * 9
     
-    angles = []
+    # Angles depend only on the coordinates, so a frame repeating the previous
+    # one on this thread reuses its result
+    landmark_array = _landmarks_to_array(landmarks)
+    key = landmark_array[:, :2].tobytes()
+    cached = getattr(repeat_frame_cache, 'angles', None)
+    if cached is not None and cached[0] == key:
+        return list(cached[1])
     
-    try:
-        # Convert landmarks to list of [x, y] coordinates
-        points = [[lm.x, lm.y] for lm in landmarks.landmark]
-        
-        # Left arm angles
-        if len(points) > 16:
-            # Left shoulder angle (shoulder-elbow-wrist)
-            left_shoulder_angle = calculate_angle(points[11], points[13], points[15])
-            angles.append(left_shoulder_angle)
-            
-            # Right shoulder angle (shoulder-elbow-wrist)
-            right_shoulder_angle = calculate_angle(points[12], points[14], points[16])
-            angles.append(right_shoulder_angle)
-            
-            # Left elbow angle (shoulder-elbow-wrist)
-            left_elbow_angle = calculate_angle(points[11], points[13], points[15])
-            angles.append(left_elbow_angle)
-            
-            # Right elbow angle (shoulder-elbow-wrist)
-            right_elbow_angle = calculate_angle(points[12], points[14], points[16])
-            angles.append(right_elbow_angle)
-        
-        # Torso angles
-        if len(points) > 24:
-            # Left hip angle (shoulder-hip-knee)
-            left_hip_angle = calculate_angle(points[11], points[23], points[25])
-            angles.append(left_hip_angle)
-            
-            # Right hip angle (shoulder-hip-knee)
-            right_hip_angle = calculate_angle(points[12], points[24], points[26])
-            angles.append(right_hip_angle)
-        
-        # Leg angles
-        if len(points) > 28:
-            # Left knee angle (hip-knee-ankle)
-            left_knee_angle = calculate_angle(points[23], points[25], points[27])
-            angles.append(left_knee_angle)
-            
-            # Right knee angle (hip-knee-ankle)
-            right_knee_angle = calculate_angle(points[24], points[26], points[28])
-            angles.append(right_knee_angle)
-        
-        # Spine angle (approximation using shoulders and hips)
-        if len(points) > 24:
-            # Calculate spine inclination
-            shoulder_midpoint = [(points[11][0] + points[12][0])/2, (points[11][1] + points[12][1])/2]
-            hip_midpoint = [(points[23][0] + points[24][0])/2, (points[23][1] + points[24][1])/2]
-            
-            # Vertical reference point
-            vertical_ref = [shoulder_midpoint[0], shoulder_midpoint[1] - 0.1]
-            
-            spine_angle = calculate_angle(vertical_ref, shoulder_midpoint, hip_midpoint)
-            angles.append(spine_angle)
-        
-        # Ensure we always return a consistent number of angles
-        # Pad with zeros if we don't have enough angles
-        while len(angles) < 9:  # 9 key angles
-            angles.append(0.0)
-            
-    except Exception as e:
-        print(f"Error calculating angles: {e}")
-        # Return default angles if calculation fails
-        angles = [0.0] * 9
+    # tolist copies, so the buffer is never shared between frames
+    angles = _compute_angles(landmark_array).tolist()
+    repeat_frame_cache.angles = (key, angles)
+    return list(angles)
+
+def _compute_angles(landmark_array):
+    """
+    Fill this thread's angle buffer from a validated (n, 4) landmark array and return it
+    """
+    # (n, 2) view of the [x, y] coordinates
+    points = landmark_array[:, :2]
+    
+    angles = _get_angle_buffer()
+    if NUMBA_AVAILABLE:
+        compute_pose_angles(points, TRIPLET_IDX, angles)
+    else:
+        # Gather all (9, 3, 2) point triplets, the eight joints then the spine,
+        # and compute the angles in one pass
+        triplets = np.concatenate([points[TRIPLET_IDX], _spine_triplet(points)[np.newaxis]])
+        angles[:] = _triplet_angles(triplets)
+    
+    return angles
+
+def extract_pose_angles_batch(landmarks_list) -> np.ndarray:
+    """
+    Extract the joint angles for a window of frames in one vectorized pass
+    Returns an (n_frames, 9) array; each row matches extract_pose_angles for that frame
+    """
+    angles = np.zeros((len(landmarks_list), 9))
+    
+    # Frames with a full pose are stacked into one (n, 33, 2) array; the rest stay zero
+    full_frames = [i for i, landmarks in enumerate(landmarks_list) if validate_landmarks(landmarks)]
+    
+    if full_frames:
+        points = np.stack([_landmarks_to_array(landmarks_list[i])[:33, :2] for i in full_frames])
+        # (n, 9, 3, 2) triplets: the eight joints, then the spine
+        triplets = np.concatenate([points[:, TRIPLET_IDX], _spine_triplet(points)[:, np.newaxis]], axis=1)
+        angles[full_frames] = _triplet_angles(triplets)
     
     return angles
 
 def normalize_angles(angles):
     """
     Normalize angles to 0-1 range for better model performance
+    Accepts a list or an array of any shape (e.g. a batch of frames) and returns an array
     """
-    normalized = []
-    for angle in angles:
-        # Normalize to 0-1 (angles are typically 0-180 degrees)
-        normalized_angle = min(max(angle / 180.0, 0.0), 1.0)
-        normalized.append(normalized_angle)
-    
-    return normalized
+    # Normalize to 0-1 (angles are typically 0-180 degrees), clipping in place
+    normalized = np.asarray(angles, dtype=np.float64) / 180.0
+    return np.clip(normalized, 0.0, 1.0, out=normalized)
+
+# uint8 angle quantization: 0-180 degrees in 255 steps (~0.7 degrees, below MediaPipe landmark noise)
+ANGLE_QUANT_SCALE = 255.0 / 180.0
+
+def quantize_angles(angles):
+    """
+    Quantize angles in degrees to uint8 for compact storage of frame windows
+    Accepts a list or an array of any shape, e.g. the output of extract_pose_angles_batch
+    """
+    scaled = np.clip(np.asarray(angles, dtype=np.float32), 0.0, 180.0) * np.float32(ANGLE_QUANT_SCALE)
+    return np.rint(scaled, out=scaled).astype(np.uint8)
+
+def dequantize_angles(quantized):
+    """Convert quantize_angles output back to float32 angles in degrees"""
+    return np.asarray(quantized, dtype=np.float32) * np.float32(1.0 / ANGLE_QUANT_SCALE)
+
+# Canonical exercise names, keyed by lowercase name with '-' and ' ' mapped to '_'
+EXERCISE_ALIASES = {
+    'pushup': 'push_up', 'push_up': 'push_up',
+    'squat': 'squat', 'squats': 'squat',
+    'jumping_jack': 'jumping_jack',
+    'high_knees': 'high_knees',
+    'butt_kicks': 'butt_kicks', 'butt_kick': 'butt_kicks',
+    'wall_sits': 'wall_sits', 'wall_sit': 'wall_sits',
+}
+
+@lru_cache(maxsize=64)
+def exercise_key(exercise_type):
+    """Canonical exercise name for exercise_type, or None for unknown exercises"""
+    return EXERCISE_ALIASES.get(exercise_type.lower().replace('-', '_').replace(' ', '_'))
+
+# Angles used per exercise (angle order: shoulders, elbows, hips, knees, spine)
+EXERCISE_ANGLE_SLICES = {
+    'push_up': slice(0, 5),           # Arm and torso: shoulder, elbow, and hip angles
+    'squat': slice(4, None),          # Leg and hip: hip, knee, and spine angles
+    'high_knees': slice(4, None),     # Leg angles for high knees
+    'butt_kicks': slice(4, None),     # Leg and hip angles for butt kicks
+    'wall_sits': slice(4, None),      # Leg angles and spine for wall sits
+}
 
 def get_exercise_specific_angles(landmarks, exercise_type):
     """
@@ -153,36 +264,11 @@ def get_exercise_specific_angles(landmarks, exercise_type):
     """
     all_angles = extract_pose_angles(landmarks)
     
-    if exercise_type.lower() in ['pushup', 'push-up', 'push_up']:
-        # For push-ups, focus on arm and torso angles
-        return all_angles[:5]  # shoulder, elbow, and hip angles
-    
-    elif exercise_type.lower() in ['squat', 'squats']:
-        # For squats, focus on leg and hip angles
-        return all_angles[4:]  # hip, knee, and spine angles
-    
-    elif exercise_type.lower() in ['jumping_jack', 'jumping-jack']:
-        # For jumping jacks, use all angles
-        return all_angles
-    
-    # NEW: High Knees exercise
-    elif exercise_type.lower() in ['high_knees', 'high-knees']:
-        # Focus on leg angles for high knees
-        return all_angles[4:]  # hip, knee, and spine angles
-    
-    # NEW: Butt Kicks exercise
-    elif exercise_type.lower() in ['butt_kicks', 'butt-kicks', 'butt_kick']:
-        # Focus on leg and hip angles for butt kicks
-        return all_angles[4:]  # hip, knee, and spine angles
-    
-    # NEW: Wall Sits exercise
-    elif exercise_type.lower() in ['wall_sits', 'wall-sits', 'wall_sit']:
-        # Focus on leg angles and spine for wall sits
-        return all_angles[4:]  # hip, knee, and spine angles
-    
-    else:
-        # Default: return all angles
-        return all_angles
+    # Default (including jumping jacks): return all angles
+    return all_angles[EXERCISE_ANGLE_SLICES.get(exercise_key(exercise_type), slice(None))]
+
+# Key body points for the pose quality score: shoulders, elbows, wrists, hips, knees, ankles
+KEY_LANDMARKS = np.array([11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28])
 
 def get_pose_quality_score(landmarks) -> float:
     """
@@ -193,71 +279,97 @@ def get_pose_quality_score(landmarks) -> float:
         if not validate_landmarks(landmarks):
             return 0.0
             
-        # Check visibility and confidence of key landmarks
-        key_landmarks = [11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28]  # Key body points
-        
-        total_visibility = 0
-        total_confidence = 0
-        
-        for idx in key_landmarks:
-            if idx < len(landmarks.landmark):
-                landmark = landmarks.landmark[idx]
-                total_visibility += getattr(landmark, 'visibility', 0.5)
-                # Some MediaPipe versions don't have presence, use visibility as fallback
-                total_confidence += getattr(landmark, 'presence', getattr(landmark, 'visibility', 0.5))
-        
-        avg_visibility = total_visibility / len(key_landmarks)
-        avg_confidence = total_confidence / len(key_landmarks)
-        
-        # Combined quality score
-        quality_score = (avg_visibility + avg_confidence) / 2
-        
-        return min(max(quality_score, 0.0), 1.0)
+        return _quality_score(_landmarks_to_array(landmarks))
         
     except Exception as e:
         print(f"Error calculating pose quality: {e}")
         return 0.0
 
+def _quality_score(landmark_array):
+    """Pose quality score (0-1) from a validated (n, 4) landmark array"""
+    # Combined quality score: mean visibility and confidence (presence) of the key
+    # landmarks; some MediaPipe versions don't have presence and the array falls back to visibility
+    quality_score = landmark_array[KEY_LANDMARKS, 2:].mean()
+    return float(min(max(quality_score, 0.0), 1.0))
+
 def extract_pose_angles_enhanced(landmarks) -> Tuple[List[float], Dict[str, float]]:
     """
     Extract enhanced pose angles with additional metadata
     Returns tuple of (angles_list, metadata_dict)
     """
-    angles = []
-    metadata = {}
+    if not validate_landmarks(landmarks):
+        return [0.0] * 9, {'quality': 0.0, 'error': 'Invalid landmarks'}
     
-    try:
-        if not validate_landmarks(landmarks):
-            return [0.0] * 9, {'quality': 0.0, 'error': 'Invalid landmarks'}
-            
-        # Convert landmarks to list of [x, y] coordinates
-        points = [[lm.x, lm.y] for lm in landmarks.landmark]
-        
-        # Calculate pose quality
-        quality = get_pose_quality_score(landmarks)
-        metadata['quality'] = quality
-        
-        # Extract the same angles as before but with better error handling
-        angles = extract_pose_angles(landmarks)
-        
-        # Add additional metadata
-        metadata['landmark_count'] = len(points)
-        metadata['zero_angles'] = sum(1 for angle in angles if abs(angle) < 5.0)
-        metadata['valid_angles'] = len(angles) - metadata['zero_angles']
-        
-        # Calculate body symmetry
-        if len(angles) >= 8:
-            left_arm_symmetry = abs(angles[0] - angles[1])  # Left vs right shoulder
-            left_leg_symmetry = abs(angles[4] - angles[5])  # Left vs right hip
-            metadata['arm_symmetry'] = left_arm_symmetry
-            metadata['leg_symmetry'] = left_leg_symmetry
-            metadata['overall_symmetry'] = (left_arm_symmetry + left_leg_symmetry) / 2
-        
-        return angles, metadata
-        
-    except Exception as e:
-        print(f"Error in enhanced angle extraction: {e}")
-        return [0.0] * 9, {'quality': 0.0, 'error': str(e)}
+    # One landmark conversion feeds both the quality score and the angles
+    landmark_array = _landmarks_to_array(landmarks)
+    
+    # A frame identical to the previous one on this thread (idle moments) reuses its result
+    key = landmark_array.tobytes()
+    cached = getattr(repeat_frame_cache, 'enhanced', None)
+    if cached is not None and cached[0] == key:
+        return list(cached[1]), dict(cached[2])
+    
+    metadata = {'quality': _quality_score(landmark_array)}
+    angle_array = _compute_angles(landmark_array)
+    angles = angle_array.tolist()
+    
+    # Add additional metadata (angles are never negative)
+    metadata['landmark_count'] = len(landmark_array)
+    metadata['zero_angles'] = int(np.count_nonzero(angle_array < 5.0))
+    metadata['valid_angles'] = len(angles) - metadata['zero_angles']
+    
+    # Calculate body symmetry
+    left_arm_symmetry = abs(angles[0] - angles[1])  # Left vs right shoulder
+    left_leg_symmetry = abs(angles[4] - angles[5])  # Left vs right hip
+    metadata['arm_symmetry'] = left_arm_symmetry
+    metadata['leg_symmetry'] = left_leg_symmetry
+    metadata['overall_symmetry'] = (left_arm_symmetry + left_leg_symmetry) / 2
+    
+    repeat_frame_cache.enhanced = (key, angles, metadata)
+    return list(angles), dict(metadata)
+
+# Form recommendation rules per exercise, evaluated in order:
+# (value indices, op, threshold, all/any over the indices, outcome if met, outcome otherwise)
+# Values are the nine angles (shoulders, elbows, hips, knees, spine) and, at index 9, the
+# shoulder asymmetry; an outcome is (bucket, message, form score delta) or None
+SHOULDER_ASYMMETRY = 9
+EXERCISE_RULES = {
+    'push_up': [
+        ((8,), 'lt', 160, all, ('suggestions', "Keep your body in a straight line", -20), None),
+        ((2, 3), 'gt', 90, all, ('good_points', "Good elbow position", 0),
+         ('suggestions', "Lower yourself until elbows are at 90 degrees", 0)),
+    ],
+    'squat': [
+        ((6, 7), 'lt', 90, any, ('good_points', "Good squat depth", 0),
+         ('suggestions', "Try to squat deeper (thighs parallel to ground)", -15)),
+        ((8,), 'gt', 160, all, ('good_points', "Good posture - chest up", 0),
+         ('suggestions', "Keep your chest up and back straight", -10)),
+    ],
+    'high_knees': [
+        ((6, 7), 'lt', 100, all, ('good_points', "Great job lifting knees high", 0),
+         ('suggestions', "Aim to lift your knees higher", -15)),
+        ((SHOULDER_ASYMMETRY,), 'gt', 10, all, ('warnings', "Shoulder asymmetry detected", -10), None),
+    ],
+    'butt_kicks': [
+        ((6, 7), 'lt', 90, all, ('good_points', "Good heel-to-glute range", 0),
+         ('suggestions', "Try to kick your heels towards your glutes", -15)),
+        ((8,), 'lt', 160, all, ('warnings', "Spine angle suggests leaning forward", -10), None),
+    ],
+    'wall_sits': [
+        ((6, 7), 'between', (85, 95), all, ('good_points', "Great wall sit position", 10),
+         ('suggestions', "Adjust your position to achieve 90-degree knee angle", -15)),
+        ((8,), 'lt', 170, all, ('warnings', "Spine angle suggests back is not straight", -10), None),
+    ],
+}
+
+def _check_angle(value, op, threshold):
+    """Evaluate one rule comparison: 'lt', 'gt' or 'between' (inclusive (low, high))"""
+    if op == 'lt':
+        return value < threshold
+    if op == 'gt':
+        return value > threshold
+    low, high = threshold
+    return low <= value <= high
 
 def get_exercise_recommendations(angles: List[float], exercise_type: str = None) -> Dict[str, any]:
     """
@@ -275,16 +387,9 @@ def get_exercise_recommendations(angles: List[float], exercise_type: str = None)
             recommendations['warnings'].append("Insufficient pose data for analysis")
             return recommendations
             
-        # Extract key angles with safety checks
-        shoulder_l = angles[0] if len(angles) > 0 else 0
-        shoulder_r = angles[1] if len(angles) > 1 else 0
-        elbow_l = angles[2] if len(angles) > 2 else 0
-        elbow_r = angles[3] if len(angles) > 3 else 0
-        hip_l = angles[4] if len(angles) > 4 else 0
-        hip_r = angles[5] if len(angles) > 5 else 0
-        knee_l = angles[6] if len(angles) > 6 else 0
-        knee_r = angles[7] if len(angles) > 7 else 0
-        spine = angles[8] if len(angles) > 8 else 0
+        # Extract key angles
+        shoulder_l, shoulder_r = angles[0], angles[1]
+        elbow_l, elbow_r = angles[2], angles[3]
         
         # General form analysis
         form_score = 100.0
@@ -304,65 +409,15 @@ def get_exercise_recommendations(angles: List[float], exercise_type: str = None)
             
         # Exercise-specific recommendations
         if exercise_type:
-            exercise_lower = exercise_type.lower().replace('-', '_').replace(' ', '_')
-            
-            if exercise_lower in ['push_up', 'pushup']:
-                if spine < 160:
-                    recommendations['suggestions'].append("Keep your body in a straight line")
-                    form_score -= 20
-                if elbow_l > 90 and elbow_r > 90:
-                    recommendations['good_points'].append("Good elbow position")
-                else:
-                    recommendations['suggestions'].append("Lower yourself until elbows are at 90 degrees")
-                    
-            elif exercise_lower in ['squat', 'squats']:
-                if knee_l < 90 or knee_r < 90:
-                    recommendations['good_points'].append("Good squat depth")
-                else:
-                    recommendations['suggestions'].append("Try to squat deeper (thighs parallel to ground)")
-                    form_score -= 15
-                if spine > 160:
-                    recommendations['good_points'].append("Good posture - chest up")
-                else:
-                    recommendations['suggestions'].append("Keep your chest up and back straight")
-                    form_score -= 10
-                    
-            # NEW: Recommendations for High Knees
-            elif exercise_lower in ['high_knees', 'high-knees']:
-                if knee_l < 100 and knee_r < 100:
-                    recommendations['good_points'].append("Great job lifting knees high")
-                else:
-                    recommendations['suggestions'].append("Aim to lift your knees higher")
-                    form_score -= 15
-                
-                if shoulder_diff > 10:
-                    recommendations['warnings'].append("Shoulder asymmetry detected")
-                    form_score -= 10
-            
-            # NEW: Recommendations for Butt Kicks
-            elif exercise_lower in ['butt_kicks', 'butt-kicks', 'butt_kick']:
-                if knee_l < 90 and knee_r < 90:
-                    recommendations['good_points'].append("Good heel-to-glute range")
-                else:
-                    recommendations['suggestions'].append("Try to kick your heels towards your glutes")
-                    form_score -= 15
-                
-                if spine < 160:
-                    recommendations['warnings'].append("Spine angle suggests leaning forward")
-                    form_score -= 10
-            
-            # NEW: Recommendations for Wall Sits
-            elif exercise_lower in ['wall_sits', 'wall-sits', 'wall_sit']:
-                if 85 <= knee_l <= 95 and 85 <= knee_r <= 95:
-                    recommendations['good_points'].append("Great wall sit position")
-                    form_score += 10
-                else:
-                    recommendations['suggestions'].append("Adjust your position to achieve 90-degree knee angle")
-                    form_score -= 15
-                
-                if spine < 170:
-                    recommendations['warnings'].append("Spine angle suggests back is not straight")
-                    form_score -= 10
+            # Rule inputs: the nine angles, then the shoulder asymmetry
+            values = list(angles[:9]) + [shoulder_diff]
+            for indices, op, threshold, combine, if_met, otherwise in EXERCISE_RULES.get(exercise_key(exercise_type), ()):
+                met = combine(_check_angle(values[i], op, threshold) for i in indices)
+                outcome = if_met if met else otherwise
+                if outcome:
+                    bucket, message, delta = outcome
+                    recommendations[bucket].append(message)
+                    form_score += delta
         
         # Normalize form score
         recommendations['form_score'] = max(0.0, min(100.0, form_score)) / 100.0
@@ -374,6 +429,88 @@ def get_exercise_recommendations(angles: List[float], exercise_type: str = None)
         recommendations['warnings'].append(f"Analysis error: {str(e)}")
         return recommendations
 
+def _analyze_high_knees(analysis, angles):
+    """High knees form checks; returns the form score adjustment"""
+    analysis['exercise_specific']['type'] = 'cardio_leg_movement'
+    knee_l, knee_r = angles[6], angles[7]
+    score = 0.0
+    
+    # Check knee height
+    avg_knee = (knee_l + knee_r) / 2
+    if avg_knee < 100:  # Knees bent high
+        analysis['good_points'].append("Good knee height - bringing knees up high")
+        score += 10
+    else:
+        analysis['recommendations'].append("Bring your knees higher towards your chest")
+        score -= 15
+        
+    # Check balance and symmetry
+    knee_diff = abs(knee_l - knee_r)
+    if knee_diff > 20:
+        analysis['warnings'].append("Leg asymmetry - try to maintain balance")
+        score -= 10
+    
+    return score
+
+def _analyze_butt_kicks(analysis, angles):
+    """Butt kicks form checks; returns the form score adjustment"""
+    analysis['exercise_specific']['type'] = 'cardio_leg_movement'
+    knee_l, knee_r, spine = angles[6], angles[7], angles[8]
+    score = 0.0
+    
+    # Check heel-to-glute range
+    avg_knee = (knee_l + knee_r) / 2
+    if avg_knee < 90:  # Tight knee bend for butt kicks
+        analysis['good_points'].append("Great range of motion - heels reaching glutes")
+        score += 10
+    else:
+        analysis['recommendations'].append("Try to kick your heels back towards your glutes")
+        score -= 15
+        
+    # Check upright posture
+    if spine > 160:
+        analysis['good_points'].append("Good upright posture")
+    else:
+        analysis['recommendations'].append("Keep your torso upright")
+        score -= 10
+    
+    return score
+
+def _analyze_wall_sits(analysis, angles):
+    """Wall sits form checks; returns the form score adjustment"""
+    analysis['exercise_specific']['type'] = 'isometric_strength'
+    knee_l, knee_r, spine = angles[6], angles[7], angles[8]
+    score = 0.0
+    
+    # Check proper wall sit position
+    avg_knee = (knee_l + knee_r) / 2
+    
+    if 85 <= avg_knee <= 95:  # Ideal 90-degree knee angle
+        analysis['good_points'].append("Perfect wall sit position - 90-degree knee angle")
+        score += 15
+    elif avg_knee < 85:
+        analysis['recommendations'].append("Slide up slightly - your knees are too bent")
+        score -= 10
+    elif avg_knee > 110:
+        analysis['recommendations'].append("Slide down more - get your thighs parallel to ground")
+        score -= 15
+        
+    # Check back against wall (spine angle)
+    if spine > 170:
+        analysis['good_points'].append("Good back position against the wall")
+    else:
+        analysis['recommendations'].append("Keep your back flat against the wall")
+        score -= 10
+    
+    return score
+
+# Exercise-specific form analysis for the new exercises, by canonical name
+FORM_ANALYZERS = {
+    'high_knees': _analyze_high_knees,
+    'butt_kicks': _analyze_butt_kicks,
+    'wall_sits': _analyze_wall_sits,
+}
+
 def analyze_exercise_form_enhanced(angles, exercise_type, quality_score=0.8):
     """
     Enhanced exercise form analysis including the new exercises
@@ -391,76 +528,12 @@ def analyze_exercise_form_enhanced(angles, exercise_type, quality_score=0.8):
             analysis['warnings'].append("Insufficient pose data for analysis")
             return analysis
             
-        # Extract key angles
-        shoulder_l, shoulder_r = angles[0], angles[1]
-        elbow_l, elbow_r = angles[2], angles[3]
-        hip_l, hip_r = angles[4], angles[5]
-        knee_l, knee_r = angles[6], angles[7]
-        spine = angles[8]
-        
         form_score = 100.0
         
         # Exercise-specific analysis for new exercises
-        if exercise_type.lower() in ['high_knees', 'high-knees']:
-            analysis['exercise_specific']['type'] = 'cardio_leg_movement'
-            
-            # Check knee height
-            avg_knee = (knee_l + knee_r) / 2
-            if avg_knee < 100:  # Knees bent high
-                analysis['good_points'].append("Good knee height - bringing knees up high")
-                form_score += 10
-            else:
-                analysis['recommendations'].append("Bring your knees higher towards your chest")
-                form_score -= 15
-                
-            # Check balance and symmetry
-            knee_diff = abs(knee_l - knee_r)
-            if knee_diff > 20:
-                analysis['warnings'].append("Leg asymmetry - try to maintain balance")
-                form_score -= 10
-                
-        elif exercise_type.lower() in ['butt_kicks', 'butt-kicks', 'butt_kick']:
-            analysis['exercise_specific']['type'] = 'cardio_leg_movement'
-            
-            # Check heel-to-glute range
-            avg_knee = (knee_l + knee_r) / 2
-            if avg_knee < 90:  # Tight knee bend for butt kicks
-                analysis['good_points'].append("Great range of motion - heels reaching glutes")
-                form_score += 10
-            else:
-                analysis['recommendations'].append("Try to kick your heels back towards your glutes")
-                form_score -= 15
-                
-            # Check upright posture
-            if spine > 160:
-                analysis['good_points'].append("Good upright posture")
-            else:
-                analysis['recommendations'].append("Keep your torso upright")
-                form_score -= 10
-                
-        elif exercise_type.lower() in ['wall_sits', 'wall-sits', 'wall_sit']:
-            analysis['exercise_specific']['type'] = 'isometric_strength'
-            
-            # Check proper wall sit position
-            avg_knee = (knee_l + knee_r) / 2
-            avg_hip = (hip_l + hip_r) / 2
-            
-            if 85 <= avg_knee <= 95:  # Ideal 90-degree knee angle
-                analysis['good_points'].append("Perfect wall sit position - 90-degree knee angle")
-                form_score += 15
-            elif avg_knee < 85:
-                analysis['recommendations'].append("Slide up slightly - your knees are too bent")
-                form_score -= 10
-            elif avg_knee > 110:
-                analysis['recommendations'].append("Slide down more - get your thighs parallel to ground")
-                form_score -= 15
-                
-            # Check back against wall (spine angle)
-            if spine > 170:
-                analysis['good_points'].append("Good back position against the wall")
-            else:
-                analysis['recommendations'].append("Keep your back flat against the wall")
-                form_score -= 10
+        analyzer = FORM_ANALYZERS.get(exercise_key(exercise_type))
+        if analyzer:
+            form_score += analyzer(analysis, angles)
                 
         # General form checks for all exercises
         if quality_score < 0.6:
@@ -473,4 +546,4 @@ def analyze_exercise_form_enhanced(angles, exercise_type, quality_score=0.8):
         
     except Exception as e:
         analysis['warnings'].append(f"Analysis error: {str(e)}")
-        return analysis
\ No newline at end of file
+        return analysis
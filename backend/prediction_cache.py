@@ -0,0 +1,51 @@
+"""
+Quantized joint-angle prediction cache
+
+Consecutive camera frames are often near-identical, so the servers reuse the
+previous prediction for a frame whose joint angles fall in the same bins. The
+cache is a small LRU shared by the request threads of one process.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    LRU of quantized joint angles -> (probabilities, class index, confidence)
+    Angles are binned to resolution degrees; at most size entries are kept
+    """
+
+    def __init__(self, size=32, resolution=0.25):
+        self.size = size
+        self.resolution = resolution
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def key(self, joint_angles):
+        """Quantize joint angles to resolution degree bins so near-identical frames share a cache entry"""
+        bins = np.asarray(joint_angles, dtype=np.float32) / self.resolution
+        return np.rint(bins).astype(np.int32).tobytes()
+
+    def get(self, key):
+        """Return the cached prediction for key (marking it recently used), or None"""
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is not None:
+                self.entries.move_to_end(key)
+            return cached
+
+    def put(self, key, prediction):
+        """Store a prediction, evicting the least recently used entry when full"""
+        with self.lock:
+            self.entries[key] = prediction
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """Drop cached predictions, e.g. after the model changes"""
+        with self.lock:
+            self.entries.clear()
@@ -7,36 +7,66 @@ Enhanced script to start the Flask backend server with better error handling
 
 import os
 import sys
+import time
 import signal
+import hashlib
+import importlib.util
 from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Import names for packages whose distribution name differs
+PACKAGE_MODULES = {'scikit-learn': 'sklearn'}
+
+# A passing dependency check is remembered per interpreter/environment for this long,
+# or until requirements.txt changes
+DEPS_CHECK_TTL = int(os.getenv('DEPS_CHECK_TTL', 24 * 3600))
+
+def dependency_marker_path():
+    """Marker file recording a passing dependency check for this interpreter and environment"""
+    key = hashlib.sha1(f"{sys.version}|{sys.prefix}".encode()).hexdigest()[:12]
+    return Path(__file__).resolve().parent / f".deps_ok_{key}"
+
+def dependency_check_cached():
+    """True when a fresh marker from an earlier passing check exists"""
+    marker = dependency_marker_path()
+    requirements = marker.parent / 'requirements.txt'
+    try:
+        marker_mtime = marker.stat().st_mtime
+    except OSError:
+        return False
+    if time.time() - marker_mtime > DEPS_CHECK_TTL:
+        return False
+    return not requirements.exists() or requirements.stat().st_mtime <= marker_mtime
+
 def check_dependencies():
     """Check if required dependencies are installed"""
     required_packages = ['flask', 'flask_cors', 'numpy', 'pickle']
-    optional_packages = ['keras', 'tensorflow', 'scikit-learn', 'pandas']
+    optional_packages = ['keras', 'tensorflow', 'scikit-learn', 'pandas', 'numba', 'redis', 'celery', 'onnxruntime', 'skl2onnx']
+    
+    if dependency_check_cached():
+        print("🔍 Checking dependencies... ✅ (cached)")
+        return True
     
     print("🔍 Checking dependencies...")
     
     missing_required = []
     missing_optional = []
     
+    # find_spec locates packages without importing them (no TensorFlow/Keras import cost)
     for package in required_packages:
-        try:
-            __import__(package)
+        if importlib.util.find_spec(PACKAGE_MODULES.get(package, package)) is not None:
             print(f"  ✅ {package}")
-        except ImportError:
+        else:
             missing_required.append(package)
             print(f"  ❌ {package} (REQUIRED)")
     
     for package in optional_packages:
-        try:
-            __import__(package)
+        if importlib.util.find_spec(PACKAGE_MODULES.get(package, package)) is not None:
             print(f"  ✅ {package}")
-        except ImportError:
+        else:
             missing_optional.append(package)
             print(f"  ⚠️  {package} (optional)")
     
@@ -49,6 +79,11 @@ def check_dependencies():
         print(f"\n⚠️  Missing optional packages: {', '.join(missing_optional)}")
         print("Some features may not work properly.")
     
+    try:
+        dependency_marker_path().touch()
+    except OSError:
+        pass
+    
     return True
 
 def check_model_files():
@@ -90,8 +125,9 @@ def main():
     print("🏥 PhysioTracker - AI Exercise Monitoring Backend")
     print("=" * 70)
     
-    # Register signal handler for graceful shutdown
-    signal.signal(signal.SIGINT, signal_handler)
+    # Register signal handler for graceful shutdown (once, if main() is re-run)
+    if signal.getsignal(signal.SIGINT) is not signal_handler:
+        signal.signal(signal.SIGINT, signal_handler)
     
     # Check dependencies
     if not check_dependencies():
@@ -103,15 +139,15 @@ def main():
     
     # Import app after dependency check
     try:
-        from app import app, load_models
+        from app import app, ensure_models_loaded
         print("✅ Flask app imported successfully")
     except ImportError as e:
         print(f"❌ Failed to import Flask app: {e}")
         sys.exit(1)
     
-    # Load models
+    # Models are loaded when app is imported; this only loads them if PRELOAD_MODELS is off
     print("\n🔄 Loading AI models...")
-    models_loaded = load_models()
+    models_loaded = ensure_models_loaded()
     
     if models_loaded:
         print("✅ Models loaded successfully")
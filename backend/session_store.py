@@ -0,0 +1,152 @@
+"""
+SQLite-backed storage for logged exercise sessions
+
+Sessions live in a WAL-mode database shared by every server process. Per-user,
+per-exercise totals are maintained in a summary table updated in the same
+transaction as each insert, so user summaries are a small indexed lookup.
+Durations use NUMERIC affinity so integer seconds come back as integers.
+"""
+
+import os
+import sqlite3
+import threading
+
+try:
+    import orjson
+
+    def _dumps(value):
+        return orjson.dumps(value)
+
+    def _loads(value):
+        return orjson.loads(value)
+except ImportError:
+    import json
+
+    def _dumps(value):
+        return json.dumps(value)
+
+    def _loads(value):
+        return json.loads(value)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    total_reps INTEGER,
+    duration NUMERIC,
+    timestamp TEXT,
+    session_data BLOB
+);
+CREATE INDEX IF NOT EXISTS ix_sessions_user ON sessions(user_id);
+CREATE TABLE IF NOT EXISTS user_exercise_stats (
+    user_id TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    total_reps INTEGER NOT NULL DEFAULT 0,
+    total_duration NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, exercise)
+);
+"""
+
+SESSION_COLUMNS = 'user_id, exercise, total_reps, duration, timestamp, session_data'
+
+
+class SessionStore:
+    """Exercise session storage with one SQLite connection per thread"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Create the schema up front with a throwaway connection so that no
+        # connection is inherited by forked worker processes
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @property
+    def conn(self):
+        """Connection for the current thread and process, opened on first use"""
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            self._local.conn = self._connect()
+            self._local.pid = pid
+        return self._local.conn
+
+    @staticmethod
+    def _row_to_session(row):
+        user_id, exercise, total_reps, duration, timestamp, session_data = row
+        return {
+            'user_id': user_id,
+            'exercise': exercise,
+            'total_reps': total_reps,
+            'duration': duration,
+            'timestamp': timestamp,
+            'session_data': _loads(session_data) if session_data is not None else []
+        }
+
+    def add(self, session_entry):
+        """Insert a session and update the user's summary, returning the new session id"""
+        conn = self.conn
+        with conn:
+            cursor = conn.execute(
+                f'INSERT INTO sessions ({SESSION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)',
+                (session_entry['user_id'], session_entry['exercise'],
+                 session_entry['total_reps'], session_entry['duration'],
+                 session_entry['timestamp'], _dumps(session_entry.get('session_data', [])))
+            )
+            conn.execute(
+                'INSERT INTO user_exercise_stats (user_id, exercise, sessions, total_reps, total_duration) '
+                'VALUES (?, ?, 1, ?, ?) '
+                'ON CONFLICT(user_id, exercise) DO UPDATE SET '
+                'sessions = sessions + 1, '
+                'total_reps = total_reps + excluded.total_reps, '
+                'total_duration = total_duration + excluded.total_duration',
+                (session_entry['user_id'], session_entry['exercise'],
+                 session_entry['total_reps'], session_entry['duration'])
+            )
+        return cursor.lastrowid
+
+    def get_user_sessions(self, user_id):
+        """All sessions logged by a user, oldest first"""
+        rows = self.conn.execute(
+            f'SELECT {SESSION_COLUMNS} FROM sessions WHERE user_id = ? ORDER BY id', (user_id,)
+        ).fetchall()
+        return [self._row_to_session(row) for row in rows]
+
+    def get_user_summary(self, user_id):
+        """Session, rep and duration totals for a user, overall and per exercise"""
+        rows = self.conn.execute(
+            'SELECT exercise, sessions, total_reps, total_duration '
+            'FROM user_exercise_stats WHERE user_id = ?', (user_id,)
+        ).fetchall()
+
+        summary = {'total_sessions': 0, 'total_reps': 0, 'total_duration': 0, 'exercise_breakdown': {}}
+        for exercise, sessions, total_reps, total_duration in rows:
+            summary['total_sessions'] += sessions
+            summary['total_reps'] += total_reps
+            summary['total_duration'] += total_duration
+            summary['exercise_breakdown'][exercise] = {
+                'sessions': sessions,
+                'total_reps': total_reps,
+                'total_duration': total_duration
+            }
+        return summary
+
+    def all_sessions(self):
+        """Every logged session, oldest first"""
+        rows = self.conn.execute(f'SELECT {SESSION_COLUMNS} FROM sessions ORDER BY id').fetchall()
+        return [self._row_to_session(row) for row in rows]
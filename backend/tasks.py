@@ -0,0 +1,48 @@
+"""
+Background tasks for the PhysioTracker backend
+
+When CELERY_BROKER_URL is set (and Celery is installed), /log_session hands
+session writes to a Celery worker instead of storing them in the request
+thread. Start a worker from the backend directory with:
+    celery -A tasks worker --loglevel=info
+"""
+
+import os
+from dotenv import load_dotenv
+from session_store import SessionStore
+
+# Load environment variables
+load_dotenv()
+
+try:
+    from celery import Celery
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+
+BROKER_URL = os.getenv('CELERY_BROKER_URL')
+RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', BROKER_URL)
+
+celery_app = None
+store_session = None
+_session_store = None
+
+
+def get_session_store():
+    """Session store for this worker process, opened on first use"""
+    global _session_store
+    if _session_store is None:
+        _session_store = SessionStore(os.getenv('SESSIONS_DB_PATH', 'sessions.db'))
+    return _session_store
+
+
+if CELERY_AVAILABLE and BROKER_URL:
+    celery_app = Celery('physio', broker=BROKER_URL, backend=RESULT_BACKEND)
+    celery_app.conf.update(task_serializer='json', result_serializer='json', accept_content=['json'])
+
+    @celery_app.task(name='physio.store_session')
+    def store_session(session_entry):
+        """Store a logged session, returning its session id"""
+        return get_session_store().add(session_entry)
+elif BROKER_URL:
+    print("⚠️  CELERY_BROKER_URL is set but Celery is not installed, logging sessions in the request thread")
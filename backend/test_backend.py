@@ -11,10 +11,12 @@ import time
 # Backend URL
 BASE_URL = "http://localhost:5000"
 
+SESSION = requests.Session()
+
 def test_health():
     """Test health endpoint"""
     print("🔍 Testing Health Endpoint...")
-    response = requests.get(f"{BASE_URL}/health")
+    response = SESSION.get(f"{BASE_URL}/health")
     data = response.json()
     
     print(f"   Status: {data['status']}")
@@ -26,7 +28,7 @@ def test_health():
 def test_exercises():
     """Test exercises endpoint"""
     print("📋 Testing Exercises Endpoint...")
-    response = requests.get(f"{BASE_URL}/exercises")
+    response = SESSION.get(f"{BASE_URL}/exercises")
     data = response.json()
     
     exercises = data['exercises']
@@ -44,7 +46,7 @@ def test_prediction(joint_angles, exercise_name, description):
         "selected_exercise": exercise_name
     }
     
-    response = requests.post(
+    response = SESSION.post(
         f"{BASE_URL}/predict", 
         json=payload,
         headers={"Content-Type": "application/json"}
@@ -90,7 +92,7 @@ def test_exercise_endpoint(exercise_name):
     """Test the new test exercise endpoint"""
     print(f"🧪 Testing Exercise Endpoint for {exercise_name}...")
     
-    response = requests.post(f"{BASE_URL}/test_exercise/{exercise_name}")
+    response = SESSION.post(f"{BASE_URL}/test_exercise/{exercise_name}")
     
     if response.status_code == 200:
         data = response.json()
@@ -105,7 +107,7 @@ def test_session_reset():
     """Test session reset"""
     print("🔄 Testing Session Reset...")
     
-    response = requests.post(f"{BASE_URL}/reset_session")
+    response = SESSION.post(f"{BASE_URL}/reset_session")
     
     if response.status_code == 200:
         data = response.json()
@@ -1,5 +1,10 @@
 import requests
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SESSION = requests.Session()
 
 # Test the backend prediction endpoint
 def test_prediction():
@@ -12,7 +17,7 @@ def test_prediction():
     }
     
     try:
-        response = requests.post(url, json=test_data)
+        response = SESSION.post(url, json=test_data)
         result = response.json()
         
         print("🔥 BACKEND PREDICTION TEST:")
@@ -41,7 +46,7 @@ def test_multiple_reps():
     url = "http://localhost:5000/predict"
     
     # Reset session first
-    reset_response = requests.post("http://localhost:5000/reset_session")
+    reset_response = SESSION.post("http://localhost:5000/reset_session")
     print(f"🔄 Session reset: {reset_response.json()}")
     
     # Simulate squat movement: down -> up -> down -> up
@@ -64,7 +69,7 @@ def test_multiple_reps():
             "selected_exercise": "squat"
         }
         
-        response = requests.post(url, json=test_data)
+        response = SESSION.post(url, json=test_data)
         result = response.json()
         
         print(f"Phase {i+1} ({phase_data['phase']}): "
@@ -72,6 +77,44 @@ def test_multiple_reps():
               f"Reps={result.get('rep_count', 0)}, "
               f"Confidence={result.get('confidence', 0):.3f}")
 
+def test_concurrent_predictions(n_requests=64, max_workers=8):
+    """Send predictions in parallel so the server can batch them, and compare with sending them one by one"""
+    url = "http://localhost:5000/predict"
+    
+    # Slightly different angles per request so every one reaches the model
+    payloads = [
+        {"joint_angles": [130 + i % 16, 132, 160, 158, 100 + i // 16, 98, 70, 68, 175]}
+        for i in range(n_requests)
+    ]
+    
+    # requests.Session is not thread-safe, so each worker thread uses its own
+    thread_sessions = threading.local()
+    
+    def predict(payload):
+        if not hasattr(thread_sessions, 'session'):
+            thread_sessions.session = requests.Session()
+        response = thread_sessions.session.post(url, json=payload)
+        return response.status_code
+    
+    print(f"\n⚡ Testing throughput with {n_requests} predictions:")
+    
+    start = time.perf_counter()
+    sequential_codes = [predict(payload) for payload in payloads]
+    sequential_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        concurrent_codes = list(executor.map(predict, payloads))
+    concurrent_time = time.perf_counter() - start
+    
+    print(f"Sequential: {sequential_time:.2f}s ({n_requests / sequential_time:.0f} req/s), "
+          f"{sequential_codes.count(200)}/{n_requests} OK")
+    print(f"Concurrent ({max_workers} workers): {concurrent_time:.2f}s ({n_requests / concurrent_time:.0f} req/s), "
+          f"{concurrent_codes.count(200)}/{n_requests} OK")
+    
+    # These predictions advance the shared rep counter in arbitrary order
+    SESSION.post("http://localhost:5000/reset_session")
+
 if __name__ == "__main__":
     # Test single prediction
     print("Testing backend prediction...")
@@ -81,3 +124,8 @@ if __name__ == "__main__":
     
     # Test rep counting
     test_multiple_reps()
+    
+    print("\n" + "="*50)
+    
+    # Test throughput under concurrent requests
+    test_concurrent_predictions()
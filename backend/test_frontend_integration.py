@@ -10,6 +10,8 @@ import random
 
 BASE_URL = "http://localhost:5000"
 
+SESSION = requests.Session()
+
 def test_frontend_integration():
     print("🧪 Testing Frontend Integration Flow")
     print("=" * 50)
@@ -17,7 +19,7 @@ def test_frontend_integration():
     # Test 1: Health check
     print("\n1. Testing health endpoint...")
     try:
-        response = requests.get(f"{BASE_URL}/health")
+        response = SESSION.get(f"{BASE_URL}/health")
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Health check passed")
@@ -33,7 +35,7 @@ def test_frontend_integration():
     print("\n2. Testing session start (frontend simulation)...")
     try:
         # Reset session with exercise
-        reset_response = requests.post(f"{BASE_URL}/reset_session", 
+        reset_response = SESSION.post(f"{BASE_URL}/reset_session", 
                                      json={"selected_exercise": "push_up"})
         if reset_response.status_code == 200:
             reset_data = reset_response.json()
@@ -44,7 +46,7 @@ def test_frontend_integration():
             return
         
         # Get session state
-        state_response = requests.get(f"{BASE_URL}/session_state")
+        state_response = SESSION.get(f"{BASE_URL}/session_state")
         if state_response.status_code == 200:
             state_data = state_response.json()
             print(f"✅ Session state retrieved")
@@ -78,7 +80,7 @@ def test_frontend_integration():
         
         for i, angles in enumerate(push_up_sequence):
             print(f"\n   Prediction {i+1}:")
-            response = requests.post(f"{BASE_URL}/predict", 
+            response = SESSION.post(f"{BASE_URL}/predict", 
                                    json={
                                        "joint_angles": angles,
                                        "selected_exercise": "push_up"
@@ -103,7 +105,7 @@ def test_frontend_integration():
     # Test 4: Check final session state
     print("\n4. Checking final session state...")
     try:
-        final_state_response = requests.get(f"{BASE_URL}/session_state")
+        final_state_response = SESSION.get(f"{BASE_URL}/session_state")
         if final_state_response.status_code == 200:
             final_state_data = final_state_response.json()
             print(f"✅ Final session state:")
@@ -9,6 +9,8 @@ import time
 
 BASE_URL = "http://localhost:5000"
 
+SESSION = requests.Session()
+
 def test_session_fixes():
     print("🧪 Testing Session Fixes and Repetition Counting")
     print("=" * 50)
@@ -16,7 +18,7 @@ def test_session_fixes():
     # Test 1: Health check
     print("\n1. Testing health endpoint...")
     try:
-        response = requests.get(f"{BASE_URL}/health")
+        response = SESSION.get(f"{BASE_URL}/health")
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Health check passed")
@@ -31,7 +33,7 @@ def test_session_fixes():
     # Test 2: Get session state
     print("\n2. Testing session state endpoint...")
     try:
-        response = requests.get(f"{BASE_URL}/session_state")
+        response = SESSION.get(f"{BASE_URL}/session_state")
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Session state retrieved")
@@ -44,7 +46,7 @@ def test_session_fixes():
     # Test 3: Reset session with exercise
     print("\n3. Testing session reset with exercise...")
     try:
-        response = requests.post(f"{BASE_URL}/reset_session", 
+        response = SESSION.post(f"{BASE_URL}/reset_session", 
                                json={"selected_exercise": "bench_press"})
         if response.status_code == 200:
             data = response.json()
@@ -61,7 +63,7 @@ def test_session_fixes():
         # Simulate bench press joint angles
         joint_angles = [120.0, 120.0, 90.0, 90.0, 170.0, 170.0, 175.0, 175.0, 175.0]
         
-        response = requests.post(f"{BASE_URL}/predict", 
+        response = SESSION.post(f"{BASE_URL}/predict", 
                                json={
                                    "joint_angles": joint_angles,
                                    "selected_exercise": "bench_press"
@@ -91,7 +93,7 @@ def test_session_fixes():
         ]
         
         for i, angles in enumerate(rep_angles):
-            response = requests.post(f"{BASE_URL}/predict", 
+            response = SESSION.post(f"{BASE_URL}/predict", 
                                    json={
                                        "joint_angles": angles,
                                        "selected_exercise": "bench_press"
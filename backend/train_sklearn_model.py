@@ -5,17 +5,16 @@ This script creates a Random Forest classifier to replace the TensorFlow BiLSTM
 """
 
 import os
+import zlib
 import numpy as np
-import pandas as pd
 import joblib
-import pickle
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.neural_network import MLPClassifier
 from sklearn.svm import SVC
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-import matplotlib.pyplot as plt
-import seaborn as sns
+from model_bundle import BUNDLE_COMPRESSION, save_model_bundle
 
 # Exercise definitions
 EXERCISES = [
@@ -27,80 +26,122 @@ EXERCISES = [
     'lat_pulldown', 'hip_thrust'
 ]
 
+# Typical joint angles for each exercise, the centre of its synthetic samples
+BASE_ANGLES = {name: np.asarray(angles, dtype=np.float64) for name, angles in {
+    'squats': [120, 120, 150, 150, 90, 90, 90, 90, 175],
+    'push_ups': [90, 90, 80, 80, 160, 160, 170, 170, 178],
+    'bicep_curls': [70, 70, 60, 60, 160, 160, 170, 170, 175],
+    'lunges': [110, 140, 150, 170, 90, 120, 60, 120, 175],
+    'deadlifts': [140, 140, 170, 170, 120, 120, 170, 170, 160],
+    'shoulder_press': [60, 60, 170, 170, 160, 160, 170, 170, 175],
+    'planks': [160, 160, 170, 170, 140, 140, 170, 170, 178],
+    'jumping_jacks': [100, 100, 140, 140, 120, 120, 140, 140, 175],
+    'bench_press': [80, 80, 70, 70, 160, 160, 170, 170, 180],
+    'pull_ups': [50, 50, 40, 40, 140, 140, 170, 170, 175],
+    'burpees': [100, 100, 120, 120, 100, 100, 120, 120, 170],
+    'mountain_climbers': [120, 120, 150, 150, 90, 90, 60, 150, 170],
+    'dips': [90, 90, 70, 70, 150, 150, 170, 170, 175],
+    'overhead_press': [50, 50, 170, 170, 160, 160, 170, 170, 175],
+    'rows': [110, 110, 90, 90, 140, 140, 170, 170, 175],
+    'calf_raises': [170, 170, 170, 170, 160, 160, 160, 160, 175],
+    'high_knees': [120, 120, 150, 150, 100, 100, 60, 60, 175],
+    'butt_kicks': [130, 130, 140, 140, 110, 110, 45, 45, 178],
+    'wall_sits': [140, 140, 160, 160, 120, 120, 90, 90, 180],
+    'tricep_dips': [90, 90, 60, 60, 150, 150, 170, 170, 175],
+    'lat_pulldown': [70, 70, 50, 50, 140, 140, 170, 170, 175],
+    'hip_thrust': [110, 110, 170, 170, 90, 90, 170, 170, 160]
+}.items()}
+# Base angles for exercises without a profile
+DEFAULT_BASE_ANGLES = np.array([120, 120, 150, 150, 120, 120, 120, 120, 175], dtype=np.float64)
+
+# Classifier to train: random_forest (default; the servers compile it with the Numba
+# forest walker), mlp (smallest file, one small matmul per prediction) or hist_gradient_boosting
+MODEL_TYPE = os.getenv('MODEL_TYPE', 'random_forest')
+
+# Forest training workers: one per physical core (SMT siblings add contention, not speed)
+TRAINING_JOBS = joblib.cpu_count(only_physical_cores=True)
+
+def build_model(model_type):
+    """
+    Create the untrained classifier for MODEL_TYPE
+    Every exercise gets the same number of samples, so no class weighting is needed
+    """
+    if model_type == 'mlp':
+        return MLPClassifier(
+            hidden_layer_sizes=(64, 32),
+            max_iter=500,
+            early_stopping=True,
+            random_state=42
+        )
+    if model_type == 'hist_gradient_boosting':
+        # Multiclass boosting grows one tree per class per iteration
+        return HistGradientBoostingClassifier(
+            max_iter=150,
+            max_depth=6,
+            learning_rate=0.1,
+            random_state=42
+        )
+    if model_type != 'random_forest':
+        raise ValueError(f"Unknown MODEL_TYPE: {model_type}")
+    return RandomForestClassifier(
+        n_estimators=200,
+        max_depth=15,
+        min_samples_split=5,
+        min_samples_leaf=2,
+        random_state=42,
+        n_jobs=TRAINING_JOBS
+    )
+
 def generate_exercise_data(exercise_name, n_samples=100):
     """Generate synthetic joint angle data for a specific exercise"""
-    np.random.seed(hash(exercise_name) % 2**32)  # Consistent seed per exercise
-    
-    # Define typical angle ranges for different exercises
-    angle_profiles = {
-        'squats': [120, 120, 150, 150, 90, 90, 90, 90, 175],
-        'push_ups': [90, 90, 80, 80, 160, 160, 170, 170, 178],
-        'bicep_curls': [70, 70, 60, 60, 160, 160, 170, 170, 175],
-        'lunges': [110, 140, 150, 170, 90, 120, 60, 120, 175],
-        'deadlifts': [140, 140, 170, 170, 120, 120, 170, 170, 160],
-        'shoulder_press': [60, 60, 170, 170, 160, 160, 170, 170, 175],
-        'planks': [160, 160, 170, 170, 140, 140, 170, 170, 178],
-        'jumping_jacks': [100, 100, 140, 140, 120, 120, 140, 140, 175],
-        'bench_press': [80, 80, 70, 70, 160, 160, 170, 170, 180],
-        'pull_ups': [50, 50, 40, 40, 140, 140, 170, 170, 175],
-        'burpees': [100, 100, 120, 120, 100, 100, 120, 120, 170],
-        'mountain_climbers': [120, 120, 150, 150, 90, 90, 60, 150, 170],
-        'dips': [90, 90, 70, 70, 150, 150, 170, 170, 175],
-        'overhead_press': [50, 50, 170, 170, 160, 160, 170, 170, 175],
-        'rows': [110, 110, 90, 90, 140, 140, 170, 170, 175],
-        'calf_raises': [170, 170, 170, 170, 160, 160, 160, 160, 175],
-        'high_knees': [120, 120, 150, 150, 100, 100, 60, 60, 175],
-        'butt_kicks': [130, 130, 140, 140, 110, 110, 45, 45, 178],
-        'wall_sits': [140, 140, 160, 160, 120, 120, 90, 90, 180],
-        'tricep_dips': [90, 90, 60, 60, 150, 150, 170, 170, 175],
-        'lat_pulldown': [70, 70, 50, 50, 140, 140, 170, 170, 175],
-        'hip_thrust': [110, 110, 170, 170, 90, 90, 170, 170, 160]
-    }
-    
-    # Get base angles for this exercise or use default
-    base_angles = angle_profiles.get(exercise_name, [120, 120, 150, 150, 120, 120, 120, 120, 175])
-    
-    # Generate variations around base angles
-    samples = []
-    for _ in range(n_samples):
-        # Add random variations (±20 degrees)
-        sample = []
-        for base_angle in base_angles:
-            variation = np.random.normal(0, 15)  # Standard deviation of 15 degrees
-            angle = max(0, min(180, base_angle + variation))  # Clamp to [0, 180]
-            sample.append(angle)
-        samples.append(sample)
-    
-    return np.array(samples)
+    # Consistent seed per exercise (str hash() is randomized per process, crc32 is not);
+    # a local generator leaves the global NumPy random state untouched
+    rng = np.random.default_rng(zlib.crc32(exercise_name.encode()))
+    
+    base_angles = BASE_ANGLES.get(exercise_name, DEFAULT_BASE_ANGLES)
+    
+    # Generate variations around base angles in one draw
+    # (standard deviation of 15 degrees), clamped to [0, 180]
+    variations = rng.normal(0, 15, size=(n_samples, len(base_angles)))
+    # float32 like the servers' joint angles: half the memory traffic, and
+    # 15 degree noise needs nothing finer
+    return np.clip(base_angles + variations, 0, 180).astype(np.float32)
+
+def create_features_batch(angles_2d):
+    """
+    Create feature matrix from an (n_samples, 9) joint angle matrix (same features as in app.py)
+    Returns an (n_samples, 45) float32 array, the dtype the servers build their features in
+    """
+    angles_2d = np.asarray(angles_2d, dtype=np.float32)
+    radians = np.radians(angles_2d)
+    
+    return np.concatenate([
+        angles_2d,                                          # Raw joint angles (9 features)
+        angles_2d / 180.0,                                  # Normalized angles (9 features)
+        np.sin(radians),                                    # Trigonometric features (18 features)
+        np.cos(radians),
+        angles_2d.mean(axis=1, keepdims=True),              # Statistical features (5 features)
+        angles_2d.std(axis=1, keepdims=True),
+        angles_2d.min(axis=1, keepdims=True),
+        angles_2d.max(axis=1, keepdims=True),
+        np.median(angles_2d, axis=1, keepdims=True),
+        np.abs(angles_2d[:, 0:8:2] - angles_2d[:, 1:8:2]),  # Angle differences (4 features)
+    ], axis=1)
+
+# Column names of create_features_batch's output, in order
+FEATURE_NAMES = np.array(
+    [f'raw_angle_{i}' for i in range(9)] +
+    [f'norm_angle_{i}' for i in range(9)] +
+    [f'sin_angle_{i}' for i in range(9)] +
+    [f'cos_angle_{i}' for i in range(9)] +
+    ['mean', 'std', 'min', 'max', 'median'] +
+    [f'diff_{i}' for i in range(4)],
+    dtype=object
+)
 
 def create_features(angles_array):
     """Create feature vector from joint angles (same as in app.py)"""
-    features = []
-    
-    # Raw joint angles (9 features)
-    features.extend(angles_array)
-    
-    # Normalized angles (9 features)
-    normalized = angles_array / 180.0
-    features.extend(normalized)
-    
-    # Trigonometric features (18 features)
-    features.extend(np.sin(np.radians(angles_array)))
-    features.extend(np.cos(np.radians(angles_array)))
-    
-    # Statistical features (5 features)
-    features.append(np.mean(angles_array))
-    features.append(np.std(angles_array))
-    features.append(np.min(angles_array))
-    features.append(np.max(angles_array))
-    features.append(np.median(angles_array))
-    
-    # Angle differences (4 features)
-    for i in range(4):
-        if i * 2 + 1 < len(angles_array):
-            features.append(abs(angles_array[i * 2] - angles_array[i * 2 + 1]))
-    
-    return np.array(features)
+    return create_features_batch(np.asarray(angles_array)[np.newaxis])[0]
 
 def main():
     print("🏋️  Training scikit-learn model for exercise classification...")
@@ -110,63 +151,59 @@ def main():
     
     # Generate training data
     print("📊 Generating synthetic training data...")
-    X = []
+    angles = []
     y = []
     
     for exercise in EXERCISES:
         print(f"   Generating data for: {exercise}")
         exercise_data = generate_exercise_data(exercise, n_samples=200)
-        
-        # Create features for each sample
-        for sample in exercise_data:
-            features = create_features(sample)
-            X.append(features)
-            y.append(exercise)
-    
-    X = np.array(X)
+        angles.append(exercise_data)
+        y.extend([exercise] * len(exercise_data))
+    
+    angles = np.vstack(angles)
     y = np.array(y)
     
-    print(f"✅ Generated {len(X)} samples with {X.shape[1]} features each")
+    print(f"✅ Generated {len(angles)} samples")
     print(f"📝 Exercises: {list(set(y))}")
     
     # Create label encoder
     label_encoder = LabelEncoder()
     y_encoded = label_encoder.fit_transform(y)
     
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
+    # Split the raw angles, then build features for each half - the full
+    # feature matrix is never materialized
+    angles_train, angles_test, y_train, y_test = train_test_split(
+        angles, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
     )
+    X_train = create_features_batch(angles_train)
+    X_test = create_features_batch(angles_test)
+    print(f"🔢 {X_train.shape[1]} features per sample")
     
-    # Scale features
+    # Scale features in place (same arithmetic as scaler.transform, without the copies)
     print("🔧 Scaling features...")
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    scaler = StandardScaler().fit(X_train)
+    # float32 statistics keep the scaled features (and scaler.transform output) float32
+    scaler.mean_ = scaler.mean_.astype(np.float32)
+    scaler.scale_ = scaler.scale_.astype(np.float32)
+    for features in (X_train, X_test):
+        features -= scaler.mean_
+        features /= scaler.scale_
     
-    # Train Random Forest model
-    print("🌳 Training Random Forest classifier...")
-    rf_model = RandomForestClassifier(
-        n_estimators=200,
-        max_depth=15,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=42,
-        class_weight='balanced',
-        n_jobs=-1
-    )
+    # Train classifier
+    print(f"🌳 Training {MODEL_TYPE} classifier...")
+    model = build_model(MODEL_TYPE)
     
-    rf_model.fit(X_train_scaled, y_train)
+    model.fit(X_train, y_train)
     
     # Evaluate model
     print("📊 Evaluating model...")
-    y_pred = rf_model.predict(X_test_scaled)
+    y_pred = model.predict(X_test)
     accuracy = accuracy_score(y_test, y_pred)
     
     print(f"✅ Test Accuracy: {accuracy:.3f}")
     
     # Cross-validation
-    cv_scores = cross_val_score(rf_model, X_train_scaled, y_train, cv=5)
+    cv_scores = cross_val_score(model, X_train, y_train, cv=5)
     print(f"📈 Cross-validation accuracy: {cv_scores.mean():.3f} (+/- {cv_scores.std() * 2:.3f})")
     
     # Classification report
@@ -177,34 +214,20 @@ def main():
     # Save models
     print("💾 Saving models...")
     
-    # Save Random Forest model
-    joblib.dump(rf_model, 'model/exercise_classifier.joblib')
-    print("   ✅ Random Forest model saved to model/exercise_classifier.joblib")
-    
-    # Save scaler
-    joblib.dump(scaler, 'model/feature_scaler.joblib')
-    print("   ✅ Feature scaler saved to model/feature_scaler.joblib")
-    
-    # Save label encoder
-    with open('model/label_encoder.pkl', 'wb') as f:
-        pickle.dump(label_encoder, f)
-    print("   ✅ Label encoder saved to model/label_encoder.pkl")
-    
-    # Feature importance
-    print("\n🎯 Top 10 Most Important Features:")
-    feature_names = (['raw_angle_' + str(i) for i in range(9)] +
-                    ['norm_angle_' + str(i) for i in range(9)] +
-                    ['sin_angle_' + str(i) for i in range(9)] +
-                    ['cos_angle_' + str(i) for i in range(9)] +
-                    ['mean', 'std', 'min', 'max', 'median'] +
-                    ['diff_' + str(i) for i in range(4)])
-    
-    feature_importance = pd.DataFrame({
-        'feature': feature_names,
-        'importance': rf_model.feature_importances_
-    }).sort_values('importance', ascending=False)
-    
-    print(feature_importance.head(10).to_string(index=False))
+    # Classifier, scaler and label encoder in one compressed file (several times
+    # smaller on disk, one file to read at server startup)
+    save_model_bundle('model/exercise_classifier_bundle.joblib', model, scaler, label_encoder,
+                      compress=BUNDLE_COMPRESSION)
+    print(f"   ✅ {MODEL_TYPE} model, feature scaler and label encoder saved to model/exercise_classifier_bundle.joblib")
+    
+    # Feature importance (tree ensembles only)
+    if hasattr(model, 'feature_importances_'):
+        print("\n🎯 Top 10 Most Important Features:")
+        importances = model.feature_importances_
+        top = np.argpartition(-importances, 10)[:10]
+        top = top[np.argsort(-importances[top])]
+        for name, importance in zip(FEATURE_NAMES[top], importances[top]):
+            print(f"   {name:<12} {importance:.4f}")
     
     print("\n🎉 Model training completed successfully!")
     print("🚀 You can now run the Flask app with the new scikit-learn model.")